@@ -1,17 +1,23 @@
 from typing import Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Response
 from fastapi.exceptions import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.logger import logger
 from app.deps.auth import check_and_get_current_role
-from app.deps.sql import get_db
+from app.deps.sql import get_db, get_read_db
 from app.models.user import User, UserRole
 from app.repositories.course import CourseRepository
+from app.repositories.student_schedule import StudentScheduleRepository
+from app.schemas.course import CourseBatchStatusRequest
+from app.services.seat_reconciler import reconcile_seat_counters
 
 router = APIRouter()
 get_current_admin = check_and_get_current_role(role=UserRole.admin)
+get_current_admin_readonly = check_and_get_current_role(
+    role=UserRole.admin, read_only=True
+)
 
 
 @router.post("/set_status", tags=["admin", "course"])
@@ -22,28 +28,114 @@ async def set_course_status(
     current_user: User = Depends(get_current_admin),
     db: AsyncSession = Depends(get_db),
 ):
-    logger.info(f"收到管理员设置课程状态请求: {course_no} 来自: {current_user.name}")
+    logger.info("收到管理员设置课程状态请求: %s 来自: %s", course_no, current_user.name)
 
     repo = CourseRepository(db)
     course = await repo.set_course_status(course_no, status, reason)
 
-    logger.info(f"管理员设置课程({course.course_name})状态请求成功")
+    logger.info("管理员设置课程(%s)状态请求成功", course.course_name)
     return {"msg": "Course status updated successfully", "course_no": course.course_no}
 
 
-@router.post("/get_pending", tags=["admin", "course"])
-async def get_pending_courses(
+@router.post("/batch_set_status", tags=["admin", "course"])
+async def batch_set_course_status(
+    request: CourseBatchStatusRequest,
     current_user: User = Depends(get_current_admin),
     db: AsyncSession = Depends(get_db),
 ):
-    logger.info(f"收到管理员获取待审核课程请求: 来自: {current_user.name}")
+    logger.info(
+        "收到管理员批量设置课程状态请求: %s 门课程 来自: %s",
+        len(request.course_nos),
+        current_user.name,
+    )
 
     repo = CourseRepository(db)
-    pending_courses = await repo.get_pending_courses()
+    count = await repo.set_courses_status(
+        request.course_nos, request.status, request.reason
+    )
+
+    logger.info("管理员批量设置课程状态请求成功，共更新 %s 门课程", count)
+    return {"msg": "Course status updated successfully", "count": count}
+
+
+@router.post("/get_pending", tags=["admin", "course"])
+async def get_pending_courses(
+    response: Response,
+    cursor: Optional[int] = None,
+    limit: int = Query(default=100, ge=1, le=500),
+    dept_no: Optional[str] = None,
+    major_no: Optional[str] = None,
+    teacher: Optional[int] = None,
+    current_user: User = Depends(get_current_admin_readonly),
+    db: AsyncSession = Depends(get_read_db),
+):
+    logger.info("收到管理员获取待审核课程请求: 来自: %s", current_user.name)
+
+    repo = CourseRepository(db)
+    pending_courses = await repo.get_pending_courses(
+        cursor=cursor,
+        limit=limit,
+        dept_no=dept_no,
+        major_no=major_no,
+        teacher=teacher,
+    )
 
     if not pending_courses:
         logger.warning("没有待审核的课程")
         raise HTTPException(status_code=404, detail="No pending courses found")
 
+    # 当前页已满，说明可能还有下一页
+    if len(pending_courses) == limit:
+        response.headers["X-Next-Cursor"] = str(pending_courses[-1].id)
+
     logger.info("管理员获取待审核课程请求成功")
     return pending_courses
+
+
+@router.post("/rollover", tags=["admin", "course"])
+async def rollover_courses(
+    source_term: str,
+    target_term: str,
+    current_user: User = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db),
+):
+    logger.info(
+        "收到管理员学期课程滚动请求: %s -> %s 来自: %s",
+        source_term,
+        target_term,
+        current_user.name,
+    )
+
+    repo = CourseRepository(db)
+    count = await repo.rollover_courses(source_term, target_term)
+
+    logger.info("管理员学期课程滚动请求成功，共复制 %s 门课程", count)
+    return {"msg": "Courses rolled over successfully", "count": count}
+
+
+@router.post("/reconcile_seats", tags=["admin", "course"])
+async def reconcile_seats(
+    current_user: User = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db),
+):
+    logger.info("收到管理员校准选课人数请求: 来自: %s", current_user.name)
+
+    report = await reconcile_seat_counters(db)
+
+    logger.info("管理员校准选课人数请求成功，修正了 %s 门课程", report.drifted)
+    return report.to_json()
+
+
+@router.post("/rebuild_schedules", tags=["admin", "course"])
+async def rebuild_schedules(
+    term: str,
+    current_user: User = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db),
+):
+    logger.info("收到管理员重建学期课程表请求: %s 来自: %s", term, current_user.name)
+
+    count = await StudentScheduleRepository(db).rebuild_term(term)
+    await db.commit()
+
+    logger.info("管理员重建学期课程表请求成功，共写入 %s 条记录", count)
+    return {"msg": "Schedules rebuilt successfully", "count": count}
@@ -5,12 +5,15 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.logger import logger
 from app.deps.auth import check_and_get_current_role
-from app.deps.sql import get_db
+from app.deps.sql import get_db, get_read_db
 from app.models.user import User, UserRole
 from app.repositories.major import MajorRepository
 
 router = APIRouter()
 get_current_admin = check_and_get_current_role(role=UserRole.admin)
+get_current_admin_readonly = check_and_get_current_role(
+    role=UserRole.admin, read_only=True
+)
 
 
 @router.post("/add", tags=["admin", "major"])
@@ -20,18 +23,18 @@ async def add_major(
     current_user: Annotated[User, Depends(get_current_admin)],
     db: AsyncSession = Depends(get_db),
 ):
-    logger.info(f"收到添加专业请求: {major_name} 来自: {current_user.name}")
+    logger.info("收到添加专业请求: %s 来自: %s", major_name, current_user.name)
 
     repo = MajorRepository(db)
     major = await repo.create_major(major_name, dept_no)
 
     if not major:
-        logger.warning(f"院系编号: {dept_no} 不存在，返回 404")
+        logger.warning("院系编号: %s 不存在，返回 404", dept_no)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="dept_no is invalid"
         )
 
-    logger.info(f"添加专业({major.major_name})请求成功")
+    logger.info("添加专业(%s)请求成功", major.major_name)
     return {"msg": "Major created successfully", "major_no": major.major_no}
 
 
@@ -43,35 +46,35 @@ async def edit_major(
     current_user: User = Depends(get_current_admin),
     db: AsyncSession = Depends(get_db),
 ):
-    logger.info(f"收到编辑专业请求: {major_name} 来自: {current_user.name}")
+    logger.info("收到编辑专业请求: %s 来自: %s", major_name, current_user.name)
 
     repo = MajorRepository(db)
     major = await repo.edit_major(major_no, major_name, dept_no)
 
     if not major:
-        logger.warning(f"专业(院系): {major_no}({dept_no}) 不存在，返回 404")
+        logger.warning("专业(院系): %s(%s) 不存在，返回 404", major_no, dept_no)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Major not found or dept_no is invalid.",
         )
 
-    logger.info(f"编辑专业({major.major_name})请求成功")
+    logger.info("编辑专业(%s)请求成功", major.major_name)
     return {"msg": "Major updated successfully", "major_no": major.major_no}
 
 
 @router.post("/info", tags=["admin", "major"])
 async def get_major_info(
     major_no: str,
-    current_user: Annotated[User, Depends(get_current_admin)],
-    db: AsyncSession = Depends(get_db),
+    current_user: Annotated[User, Depends(get_current_admin_readonly)],
+    db: AsyncSession = Depends(get_read_db),
 ):
-    logger.info(f"收到获取专业信息请求: {major_no} 来自: {current_user.name}")
+    logger.info("收到获取专业信息请求: %s 来自: %s", major_no, current_user.name)
 
     repo = MajorRepository(db)
     major = await repo.get_by_major_no(major_no)
 
     if not major:
-        logger.warning(f"专业: {major_no} 不存在，返回 404")
+        logger.warning("专业: %s 不存在，返回 404", major_no)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Major not found"
         )
@@ -86,14 +89,14 @@ async def delete_major(
     current_user: Annotated[User, Depends(get_current_admin)],
     db: AsyncSession = Depends(get_db),
 ):
-    logger.info(f"收到删除专业请求: {major_no} 来自: {current_user.name}")
+    logger.info("收到删除专业请求: %s 来自: %s", major_no, current_user.name)
 
     repo = MajorRepository(db)
     if not await repo.delete_major(major_no):
-        logger.warning(f"专业: {major_no} 不存在，返回 404")
+        logger.warning("专业: %s 不存在，返回 404", major_no)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Major not found"
         )
 
-    logger.info(f"删除专业({major_no})请求成功")
+    logger.info("删除专业(%s)请求成功", major_no)
     return {"msg": "Major deleted successfully"}
@@ -0,0 +1,92 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import PlainTextResponse
+
+from app.core.cache import get_cache_stats
+from app.core.config import config
+from app.core.logger import logger
+from app.core.profiler import get_profile, start_profiling, stop_profiling
+from app.core.sql import get_pool_stats
+from app.deps.auth import check_and_get_current_role
+from app.models.user import User, UserRole
+
+router = APIRouter()
+get_current_admin = check_and_get_current_role(role=UserRole.admin)
+
+
+@router.post("/pool_stats", tags=["admin", "system"])
+async def pool_stats(current_user: User = Depends(get_current_admin)):
+    logger.info("收到管理员查询连接池状态请求: 来自: %s", current_user.name)
+
+    return get_pool_stats()
+
+
+@router.post("/cache_stats", tags=["admin", "system"])
+async def cache_stats(current_user: User = Depends(get_current_admin)):
+    logger.info("收到管理员查询缓存状态请求: 来自: %s", current_user.name)
+
+    return get_cache_stats()
+
+
+@router.post("/profiler/start", tags=["admin", "system"])
+async def profiler_start(
+    request: Request,
+    route: Optional[str] = None,
+    sample_rate: float = Query(default=1.0, gt=0, le=1),
+    duration: int = Query(default=300, ge=1, le=3600),
+    current_user: User = Depends(get_current_admin),
+):
+    """
+    开启采样分析，所有进程生效，到期后自动关闭
+
+    :param route: 只采样该路由（路由模板，如 `/api/student/select`），为空时不限路由
+    :param sample_rate: 请求的采样比例
+    :param duration: 持续时间（秒）
+    """
+    logger.info(
+        "收到管理员开启采样分析请求: 路由: %s, 比例: %s, 持续: %s 秒, 来自: %s",
+        route,
+        sample_rate,
+        duration,
+        current_user.name,
+    )
+
+    if config.profiler_interval_ms <= 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Profiler is disabled"
+        )
+    if route is not None and route not in {
+        getattr(r, "path", None) for r in request.app.routes
+    }:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown route {route}"
+        )
+
+    settings = await start_profiling(route, sample_rate, duration)
+    return {"msg": "Profiler started", "until": settings.until}
+
+
+@router.post("/profiler/stop", tags=["admin", "system"])
+async def profiler_stop(current_user: User = Depends(get_current_admin)):
+    logger.info("收到管理员关闭采样分析请求: 来自: %s", current_user.name)
+
+    await stop_profiling()
+    return {"msg": "Profiler stopped"}
+
+
+@router.post("/profiler/profile", tags=["admin", "system"])
+async def profiler_profile(
+    route: Optional[str] = None, current_user: User = Depends(get_current_admin)
+):
+    """
+    下载折叠格式的调用栈，可用于 flamegraph.pl、speedscope 等工具生成火焰图
+
+    :param route: 只返回该路由的调用栈
+    """
+    logger.info("收到管理员下载采样结果请求: 来自: %s", current_user.name)
+
+    return PlainTextResponse(
+        await get_profile(route),
+        headers={"Content-Disposition": 'attachment; filename="profile.folded"'},
+    )
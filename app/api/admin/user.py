@@ -1,18 +1,33 @@
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import config
 from app.core.logger import logger
+from app.core.redis import get_redis_client
 from app.deps.auth import check_and_get_current_role
-from app.deps.sql import get_db
+from app.deps.sql import get_db, get_read_db
 from app.models.user import User, UserRole
 from app.repositories.user import UserRepository
-from app.schemas.admin import EditRequest, RegisterRequest, RegisterResponse
-from app.services.auth_service import generate_random_password, get_password_hash
+from app.schemas.admin import (
+    CohortEditRequest,
+    EditRequest,
+    RegisterRequest,
+    RegisterResponse,
+)
+from app.services.auth_service import (
+    generate_random_password,
+    get_password_hash_async,
+)
+from app.services.token_blacklist import revoke_user_tokens
 
 router = APIRouter()
 get_current_admin = check_and_get_current_role(role=UserRole.admin)
+get_current_admin_readonly = check_and_get_current_role(
+    role=UserRole.admin, read_only=True
+)
 
 
 @router.post("/register", tags=["admin"])
@@ -21,11 +36,11 @@ async def register(
     current_user: Annotated[User, Depends(get_current_admin)],
     db: AsyncSession = Depends(get_db),
 ):
-    logger.info(f"收到注册请求: {request.name} 来自: {current_user.name}")
+    logger.info("收到注册请求: %s 来自: %s", request.name, current_user.name)
 
     repo = UserRepository(db)
     random_password = generate_random_password()
-    hash_password = get_password_hash(random_password)
+    hash_password = await get_password_hash_async(random_password)
 
     if new_user := await repo.create_user(
         name=request.name,
@@ -46,7 +61,7 @@ async def register(
         }
 
     logger.warning(
-        f"指定的院系/专业不存在 {request.major_no}({request.dept_no})，抛出 404"
+        "指定的院系/专业不存在 %s(%s)，抛出 404", request.major_no, request.dept_no
     )
     raise HTTPException(
         status_code=status.HTTP_400_BAD_REQUEST,
@@ -60,15 +75,15 @@ async def batch_register(
     current_user: Annotated[User, Depends(get_current_admin)],
     db: AsyncSession = Depends(get_db),
 ):
-    logger.info(f"收到批量注册请求, 来自: {current_user.name}")
+    logger.info("收到批量注册请求, 来自: %s", current_user.name)
 
     repo = UserRepository(db)
     register_responses: list[RegisterResponse] = []
 
     for request in requests:
-        logger.info(f"处理注册: {request.name} ...")
+        logger.info("处理注册: %s ...", request.name)
         random_password = generate_random_password()
-        hash_password = get_password_hash(random_password)
+        hash_password = await get_password_hash_async(random_password)
         if not (
             new_user := await repo.create_user(
                 name=request.name,
@@ -81,7 +96,9 @@ async def batch_register(
             )
         ):
             logger.warning(
-                f"指定的院系/专业不存在 {request.major_no}({request.dept_no})，抛出 404"
+                "指定的院系/专业不存在 %s(%s)，抛出 404",
+                request.major_no,
+                request.dept_no,
             )
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -108,12 +125,12 @@ async def edit_info(
     user: Annotated[User, Depends(get_current_admin)],
     db: AsyncSession = Depends(get_db),
 ):
-    logger.info(f"收到编辑用户请求: {request.name} 来自: {user.name}")
+    logger.info("收到编辑用户请求: %s 来自: %s", request.name, user.name)
 
     repo = UserRepository(db)
 
     if not (target_user := await repo.get_by_name(request.username)):
-        logger.warning(f"用户 {request.name} 不存在，抛出 404")
+        logger.warning("用户 %s 不存在，抛出 404", request.name)
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="No such user.")
 
     if not await repo.edit_info(
@@ -127,7 +144,7 @@ async def edit_info(
         class_number=request.class_number,
     ):
         logger.warning(
-            f"指定的院系/专业不存在 {request.major_no}({request.dept_no})，抛出 404"
+            "指定的院系/专业不存在 %s(%s)，抛出 404", request.major_no, request.dept_no
         )
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -138,18 +155,66 @@ async def edit_info(
     return {"msg": "User updated successfully"}
 
 
+@router.post("/cohort_edit", tags=["admin"])
+async def cohort_edit(
+    request: CohortEditRequest,
+    user: Annotated[User, Depends(get_current_admin)],
+    redis: Annotated[Redis, Depends(get_redis_client)],
+    db: AsyncSession = Depends(get_db),
+):
+    logger.info("收到批量编辑用户请求: %s 来自: %s", request, user.name)
+
+    if all(
+        value is None
+        for value in (
+            request.session,
+            request.dept_no,
+            request.major_no,
+            request.class_number,
+        )
+    ):
+        logger.warning("批量编辑用户请求缺少过滤条件，抛出 400")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="At least one of session, dept_no, major_no, class_number must be provided",
+        )
+
+    repo = UserRepository(db)
+    usernames = await repo.update_cohort(
+        session=request.session,
+        dept_no=request.dept_no,
+        major_no=request.major_no,
+        class_number=request.class_number,
+        status=request.status,
+        new_major_no=request.new_major_no,
+        new_class_number=request.new_class_number,
+    )
+
+    if usernames is None:
+        logger.warning("指定的专业不存在 %s，抛出 400", request.new_major_no)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="new_major_no is invalid.",
+        )
+
+    await revoke_user_tokens(redis, usernames, config.expire_minutes * 60)
+
+    logger.info("批量编辑用户请求处理成功，共影响 %s 个用户", len(usernames))
+    return {"msg": "Users updated successfully", "count": len(usernames)}
+
+
 @router.delete("/delete", tags=["admin"])
 async def delete_user(
     username: str,
     user: Annotated[User, Depends(get_current_admin)],
     db: AsyncSession = Depends(get_db),
 ):
-    logger.info(f"收到删除用户请求: {username} 来自: {user.name}")
+    logger.info("收到删除用户请求: %s 来自: %s", username, user.name)
 
     repo = UserRepository(db)
 
     if not (target_user := await repo.get_by_name(username)):
-        logger.warning(f"用户 {username} 不存在，抛出 404")
+        logger.warning("用户 %s 不存在，抛出 404", username)
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="No such user.")
 
     await repo.delete_user(target_user)
@@ -161,14 +226,14 @@ async def delete_user(
 @router.post("/info", tags=["admin"])
 async def get_user_info(
     username: str,
-    user: Annotated[User, Depends(get_current_admin)],
-    db: AsyncSession = Depends(get_db),
+    user: Annotated[User, Depends(get_current_admin_readonly)],
+    db: AsyncSession = Depends(get_read_db),
 ):
-    logger.info(f"收到获取用户信息请求: {username} 来自: {user.name}")
+    logger.info("收到获取用户信息请求: %s 来自: %s", username, user.name)
     repo = UserRepository(db)
 
     if not (target_user := await repo.get_by_name(username)):
-        logger.warning(f"用户 {username} 不存在，抛出 404")
+        logger.warning("用户 %s 不存在，抛出 404", username)
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="No such user.")
 
     target_user.password = ""
@@ -28,26 +28,28 @@ router = APIRouter()
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)
 ):
-    logger.info(f"收到登录请求: {form_data.username}")
+    logger.info("收到登录请求: %s", form_data.username)
 
     repo = UserRepository(db)
     user = await authenticate_user(repo, form_data.username, form_data.password)
 
     if not user:
-        logger.warning(f"用户 {form_data.username} 不存在或密码错误，抛出 401")
+        logger.warning("用户 %s 不存在或密码错误，抛出 401", form_data.username)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    logger.debug(f"为用户 {form_data.username} 创建 access_token ...")
+    logger.debug("为用户 %s 创建 access_token ...", form_data.username)
     access_token_expires = timedelta(minutes=config.expire_minutes)
     access_token = create_access_token(
         payload=Payload(sub=user.username), expires_delta=access_token_expires
     )
 
-    logger.info(f"用户 {form_data.username} 登录成功, 密钥后五位 {access_token[-5:]}")
+    logger.info(
+        "用户 %s 登录成功, 密钥后五位 %s", form_data.username, access_token[-5:]
+    )
     return {"access_token": access_token, "token_type": "bearer"}
 
 
@@ -57,7 +59,7 @@ async def logout(
     redis: Annotated[Redis, Depends(get_redis_client)],
     token: str = Depends(oauth2_scheme),
 ):
-    logger.info(f"收到登出请求: {current_user.name}")
+    logger.info("收到登出请求: %s", current_user.name)
 
     payload = jwt.decode(token, config.secret_key, algorithms=config.algorithm)
     jti = payload.get("jti")
@@ -65,8 +67,8 @@ async def logout(
     now = int(time.time())
     ttl = exp - now
 
-    logger.debug(f"将 jti {jti[-5:]} 加入到 redis 黑名单中...")
+    logger.debug("将 jti %s 加入到 redis 黑名单中...", jti[-5:])
     await add_token_to_blacklist(redis, jti, ttl)
 
-    logger.info(f"用户 {current_user.name} 登出成功，jti 已禁用")
+    logger.info("用户 %s 登出成功，jti 已禁用", current_user.name)
     return {"msg": "Logged out"}
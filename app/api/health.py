@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends, status
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.deps.sql import get_db
+from app.services.health import check_readiness
+
+router = APIRouter()
+
+
+@router.get("/healthz", tags=["health"])
+async def healthz():
+    """
+    存活检查，不访问任何依赖
+    """
+    return {"status": "ok"}
+
+
+@router.get("/readyz", tags=["health"])
+async def readyz(db: AsyncSession = Depends(get_db)):
+    """
+    就绪检查，未就绪时返回 503
+    """
+    ready, detail = await check_readiness(db)
+    return JSONResponse(
+        {"status": "ready" if ready else "not_ready", **detail},
+        status_code=(
+            status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE
+        ),
+    )
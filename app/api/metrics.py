@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Depends, Response
+from prometheus_client import CONTENT_TYPE_LATEST
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.metrics import render_metrics
+from app.deps.sql import get_read_db
+from app.repositories.course import CourseRepository
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics(db: AsyncSession = Depends(get_read_db)):
+    seats = await CourseRepository(db).get_open_course_seats()
+    return Response(render_metrics(seats), media_type=CONTENT_TYPE_LATEST)
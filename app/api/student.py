@@ -1,31 +1,36 @@
 from typing import Annotated, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import config
 from app.core.logger import logger
 from app.core.redis import get_redis_client
 from app.deps.auth import check_and_get_current_role, oauth2_scheme
-from app.deps.sql import get_db
+from app.deps.sql import get_db, get_read_db
 from app.models.user import User, UserRole
 from app.repositories.course import CourseRepository
 from app.repositories.selection import SelectionRepository
 from app.repositories.user import UserRepository
-from app.services.auth_service import get_password_hash, verify_password
+from app.services.auth_service import get_password_hash_async, verify_password_async
+from app.services.schedule_cache import cache_schedule, get_cached_schedule
 
 from .auth import logout
 
 router = APIRouter()
 check_and_get_current_student = check_and_get_current_role(UserRole.student)
+check_and_get_current_student_readonly = check_and_get_current_role(
+    UserRole.student, read_only=True
+)
 
 
 @router.post("/info", tags=["student"])
 async def get_info(
-    current_user: Annotated[User, Depends(check_and_get_current_student)],
-    db: AsyncSession = Depends(get_db),
+    current_user: Annotated[User, Depends(check_and_get_current_student_readonly)],
+    db: AsyncSession = Depends(get_read_db),
 ):
-    logger.info(f"收到学生获取消息请求: {current_user.name}")
+    logger.info("收到学生获取消息请求: %s", current_user.name)
     current_user.password = ""  # Remove password from the response
     logger.info("获取消息请求处理成功")
     return current_user
@@ -41,7 +46,7 @@ async def edit_info(
     class_number: Optional[int] = None,
     db: AsyncSession = Depends(get_db),
 ):
-    logger.info(f"收到学生编辑消息请求: {user.name}")
+    logger.info("收到学生编辑消息请求: %s", user.name)
 
     repo = UserRepository(db)
     await repo.edit_info(
@@ -66,14 +71,14 @@ async def change_password(
     db: AsyncSession = Depends(get_db),
     token: str = Depends(oauth2_scheme),
 ):
-    logger.info(f"收到学生编辑密码请求: {user.name}")
+    logger.info("收到学生编辑密码请求: %s", user.name)
 
-    if not verify_password(old_password, user.password):
+    if not await verify_password_async(old_password, user.password):
         logger.warning("学生输入的原始密码有误，抛出 400")
         raise HTTPException(status_code=400, detail="Incorrect password")
 
     repo = UserRepository(db)
-    await repo.change_password(user, get_password_hash(new_password))
+    await repo.change_password(user, await get_password_hash_async(new_password))
     await logout(user, redis, token)
 
     logger.info("学生编辑密码请求成功，用户已登出")
@@ -83,10 +88,15 @@ async def change_password(
 @router.post("/schedule", tags=["student"])
 async def get_schedule(
     term: str,
-    current_user: Annotated[User, Depends(check_and_get_current_student)],
-    db: AsyncSession = Depends(get_db),
+    current_user: Annotated[User, Depends(check_and_get_current_student_readonly)],
+    redis: Annotated[Redis, Depends(get_redis_client)],
+    db: AsyncSession = Depends(get_read_db),
 ):
-    logger.info(f"收到学生获取课程表请求: {current_user.name}")
+    logger.info("收到学生获取课程表请求: %s", current_user.name)
+
+    if payload := await get_cached_schedule(redis, current_user.id, term):
+        logger.info("学生获取课程表请求成功（缓存）")
+        return Response(content=payload, media_type="application/json")
 
     repo = UserRepository(db)
     schedule = await repo.get_schedule(current_user, term)
@@ -94,8 +104,11 @@ async def get_schedule(
         logger.warning("该学生没课，查什么查，返回404")
         raise HTTPException(status_code=404, detail="Schedule not found")
 
+    payload = await cache_schedule(
+        redis, current_user, term, schedule, config.schedule_cache_ttl
+    )
     logger.info("学生获取课程表请求成功")
-    return schedule
+    return Response(content=payload, media_type="application/json")
 
 
 @router.post("/select", tags=["student"])
@@ -104,7 +117,7 @@ async def select_course(
     current_user: Annotated[User, Depends(check_and_get_current_student)],
     db: AsyncSession = Depends(get_db),
 ):
-    logger.info(f"收到学生选课请求: {current_user.name}, 课程编号: {course_no}")
+    logger.info("收到学生选课请求: %s, 课程编号: %s", current_user.name, course_no)
 
     repo = SelectionRepository(db)
     selection = await repo.create_selection(current_user.id, course_no)
@@ -121,7 +134,10 @@ async def deselect_course(
     db: AsyncSession = Depends(get_db),
 ):
     logger.info(
-        f"收到学生退选请求: {current_user.name}, 课程编号: {course_no}, 选课ID: {selection_id}"
+        "收到学生退选请求: %s, 课程编号: %s, 选课ID: %s",
+        current_user.name,
+        course_no,
+        selection_id,
     )
 
     repo = SelectionRepository(db)
@@ -133,17 +149,17 @@ async def deselect_course(
         )
 
     if course_no:
-        logger.info(f"收到学生退课请求: {current_user.name}, 课程编号: {course_no}")
+        logger.info("收到学生退课请求: %s, 课程编号: %s", current_user.name, course_no)
         course = await CourseRepository(db).get_by_course_no(course_no)
         if not course:
-            logger.warning(f"课程编号: {course_no} 不存在，抛出 404")
+            logger.warning("课程编号: %s 不存在，抛出 404", course_no)
             raise HTTPException(status_code=404, detail="Course not found")
 
         selection = await repo.get_selection_by_student_and_course(
             current_user.id, course.id
         )
         if not selection:
-            logger.warning(f"学生没有选中课程编号: {course_no}，抛出 404")
+            logger.warning("学生没有选中课程编号: %s，抛出 404", course_no)
             raise HTTPException(status_code=404, detail="Selection not found")
         selection_id = selection.id
 
@@ -161,10 +177,10 @@ async def deselect_course(
 @router.post("/electives", tags=["student"])
 async def get_elective_courses(
     term: str,
-    current_user: Annotated[User, Depends(check_and_get_current_student)],
-    db: AsyncSession = Depends(get_db),
+    current_user: Annotated[User, Depends(check_and_get_current_student_readonly)],
+    db: AsyncSession = Depends(get_read_db),
 ):
-    logger.info(f"收到学生获取可选课程列表请求: {current_user.name}")
+    logger.info("收到学生获取可选课程列表请求: %s", current_user.name)
 
     repo = SelectionRepository(db)
     courses = await repo.get_available_courses(current_user.id, term)
@@ -5,13 +5,16 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.logger import logger
 from app.deps.auth import check_and_get_current_role
-from app.deps.sql import get_db
+from app.deps.sql import get_db, get_read_db
 from app.models.user import User, UserRole
 from app.repositories.course import CourseRepository
 from app.schemas.course import CourseCreateRequest, CourseUpdateRequest
 
 router = APIRouter()
 check_and_get_current_teacher = check_and_get_current_role(role=UserRole.teacher)
+check_and_get_current_teacher_readonly = check_and_get_current_role(
+    role=UserRole.teacher, read_only=True
+)
 
 
 @router.post("/add", tags=["course"])
@@ -20,7 +23,7 @@ async def add_course(
     current_user: Annotated[User, Depends(check_and_get_current_teacher)],
     db: AsyncSession = Depends(get_db),
 ):
-    logger.info(f"收到教师添加课程({course.course_name})请求: {current_user.name}")
+    logger.info("收到教师添加课程(%s)请求: %s", course.course_name, current_user.name)
 
     repo = CourseRepository(db)
     result = await repo.create_course(
@@ -35,22 +38,40 @@ async def add_course(
         max_students=course.max_students,
     )
 
-    logger.info(f"教师添加课程({course.course_name})请求成功")
+    logger.info("教师添加课程(%s)请求成功", course.course_name)
     return {"msg": "Course created successfully", "course_no": result.course_no}
 
 
+@router.post("/batch_add", tags=["course"])
+async def batch_add_courses(
+    courses: list[CourseCreateRequest],
+    current_user: Annotated[User, Depends(check_and_get_current_teacher)],
+    db: AsyncSession = Depends(get_db),
+):
+    logger.info("收到教师批量添加课程(%s 门)请求: %s", len(courses), current_user.name)
+
+    repo = CourseRepository(db)
+    course_nos = await repo.create_courses(
+        teacher=current_user.id,
+        courses=[course.model_dump() for course in courses],
+    )
+
+    logger.info("教师批量添加课程(%s 门)请求成功", len(course_nos))
+    return {"msg": "Courses created successfully", "course_nos": course_nos}
+
+
 @router.post("/info", tags=["course"])
 async def get_course_info(
     course_no: str,
-    current_user: Annotated[User, Depends(check_and_get_current_teacher)],
-    db: AsyncSession = Depends(get_db),
+    current_user: Annotated[User, Depends(check_and_get_current_teacher_readonly)],
+    db: AsyncSession = Depends(get_read_db),
 ):
-    logger.info(f"收到教师获取课程消息请求: {current_user.name}")
+    logger.info("收到教师获取课程消息请求: %s", current_user.name)
 
     repo = CourseRepository(db)
     course = await repo.get_by_course_no(course_no)
     if not course:
-        logger.warning(f"课程: {course_no} 不存在，返回 404")
+        logger.warning("课程: %s 不存在，返回 404", course_no)
         raise HTTPException(status_code=404, detail="Course not found")
 
     logger.info("教师获取课程消息请求成功")
@@ -63,7 +84,7 @@ async def edit_course(
     current_user: Annotated[User, Depends(check_and_get_current_teacher)],
     db: AsyncSession = Depends(get_db),
 ):
-    logger.info(f"收到教师编辑课程消息请求: {current_user.name}")
+    logger.info("收到教师编辑课程消息请求: %s", current_user.name)
 
     repo = CourseRepository(db)
     result = await repo.edit_course(
@@ -95,11 +116,11 @@ async def delete_course(
     current_user: Annotated[User, Depends(check_and_get_current_teacher)],
     db: AsyncSession = Depends(get_db),
 ):
-    logger.info(f"收到教师删除课程请求: {current_user.name}")
+    logger.info("收到教师删除课程请求: %s", current_user.name)
 
     repo = CourseRepository(db)
     if not await repo.delete_course(course_no):
-        logger.warning(f"课程: {course_no} 不存在，返回 404")
+        logger.warning("课程: %s 不存在，返回 404", course_no)
         raise HTTPException(
             status_code=404,
             detail="Incorrect course_no",
@@ -115,7 +136,7 @@ async def submit_course_review(
     current_user: Annotated[User, Depends(check_and_get_current_teacher)],
     db: AsyncSession = Depends(get_db),
 ):
-    logger.info(f"收到教师申请修改课程状态请求: {current_user.name}")
+    logger.info("收到教师申请修改课程状态请求: %s", current_user.name)
 
     repo = CourseRepository(db)
     await repo.submit_course_review(course_no)
@@ -0,0 +1,681 @@
+"""
+仓库查询的两级缓存
+
+第一级为进程内 LRU，第二级为 Redis。每个命名空间（表）在 Redis 中维护一个版本号，缓存条目记录写入时的版本号，
+版本号与当前不一致的条目视为失效:
+
+- 新增、批量修改等影响范围不确定的操作递增版本号，使整个命名空间失效（包括记录不存在的负缓存）
+- 修改、删除单个对象时只删除对应条目
+
+修改、删除单个对象时写入墓碑（tombstone）而不是直接删除条目。回源前读取的条目原值与写入时的当前值比较，
+不一致（期间被失效）时放弃写入，避免回源读到的旧值在失效之后覆盖缓存
+
+失效后通过 Redis pub/sub 通知其他进程清理进程内缓存；消息丢失时，进程内条目最长在 `cache_local_ttl` 秒后过期。
+Redis 不可用时直接查询数据库
+
+热点条目过期或失效时避免大量请求同时回源:
+
+- 同一进程内相同的查询合并为一次，其余请求等待正在进行的查询（single-flight）
+- 进程之间通过 Redis 短锁只让一个请求回源，其余请求在条目过期后的 `stale_ttl` 内返回旧值，
+  没有旧值时等待持锁者写入缓存
+"""
+
+import asyncio
+import enum
+import functools
+import inspect
+import json
+import secrets
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from contextlib import suppress
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Optional
+
+from redis.exceptions import RedisError
+from sqlalchemy import DateTime, Enum, Numeric
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.config import config
+from app.core.logger import logger
+from app.core.metrics import CACHE_ERRORS, CACHE_LOOKUPS
+from app.core.redis import get_shared_redis_client
+from app.core.sql import Base
+
+CACHE_PREFIX = "cache:"
+VERSION_PREFIX = "cache_version:"
+LOCK_PREFIX = "cache_lock:"
+EVICTION_CHANNEL = "cache_eviction"
+LIST_SUFFIX = ":list"
+LOCK_POLL_INTERVAL = 0.02
+TOMBSTONE_TTL = 60
+"""墓碑的有效期（秒），回源耗时超过该时间且期间条目被失效时仍可能写入旧值"""
+
+_STORE_SCRIPT = """
+local current = redis.call('GET', KEYS[1]) or ''
+if current ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+"""条目的当前值与回源前读取的值一致时才写入"""
+
+UNCACHEABLE = object()
+"""`dump` 返回该值时不写入缓存"""
+
+
+@dataclass
+class CacheStats:
+    """
+    单个命名空间的缓存统计
+    """
+
+    local_hits: int = 0
+    """进程内缓存命中次数"""
+    redis_hits: int = 0
+    """Redis 缓存命中次数"""
+    misses: int = 0
+    """未命中、查询数据库的次数"""
+    stale_hits: int = 0
+    """条目过期、其他进程正在回源时返回旧值的次数"""
+    coalesced: int = 0
+    """合并到进程内正在进行的相同查询的次数"""
+    lock_waits: int = 0
+    """等待其他进程回源后命中 Redis 的次数（已计入 `redis_hits`）"""
+    errors: int = 0
+    """读写 Redis 失败的次数"""
+    total_ms: float = 0.0
+    """查询的累计耗时（毫秒），包括未命中时查询数据库"""
+    max_ms: float = 0.0
+    """单次查询的最大耗时（毫秒）"""
+    load_ms: float = 0.0
+    """未命中时查询数据库的累计耗时（毫秒）"""
+
+    @property
+    def lookups(self) -> int:
+        return (
+            self.local_hits
+            + self.redis_hits
+            + self.stale_hits
+            + self.coalesced
+            + self.misses
+        )
+
+    def record(self, elapsed_ms: float):
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def to_json(self):
+        stats = asdict(self)
+        lookups = self.lookups
+        stats["hit_ratio"] = (
+            round((lookups - self.misses) / lookups, 4) if lookups else 0.0
+        )
+        stats["avg_ms"] = round(self.total_ms / lookups, 3) if lookups else 0.0
+        for key in ("total_ms", "max_ms", "load_ms"):
+            stats[key] = round(stats[key], 3)
+        return stats
+
+
+@dataclass
+class _LocalEntry:
+    value: Any
+    version: int
+    expires_at: float
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+_LOADED_FROM_CACHE = object()
+
+
+class TwoTierCache:
+    """
+    进程内 LRU + Redis 的两级缓存
+
+    :param max_entries: 进程内缓存的最大条目数
+    :param local_ttl: 进程内条目的最长有效期（秒）
+    :param lock_ttl: 回源锁的有效期（秒），未获得锁的请求最多等待该时间
+    """
+
+    def __init__(
+        self, max_entries: int = 1024, local_ttl: float = 5.0, lock_ttl: float = 2.0
+    ):
+        self.max_entries = max_entries
+        self.local_ttl = local_ttl
+        self.lock_ttl = lock_ttl
+        self.stats: dict[str, CacheStats] = {}
+        self._local: OrderedDict[tuple[str, str], _LocalEntry] = OrderedDict()
+        self._versions: dict[str, int] = {}
+        self._inflight: dict[tuple[str, str], asyncio.Future] = {}
+
+    def _stats(self, namespace: str) -> CacheStats:
+        if (stats := self.stats.get(namespace)) is None:
+            stats = self.stats[namespace] = CacheStats()
+        return stats
+
+    def _count(self, namespace: str, field: str):
+        stats = self._stats(namespace)
+        setattr(stats, field, getattr(stats, field) + 1)
+        if field == "errors":
+            CACHE_ERRORS.labels(namespace).inc()
+        elif field != "lock_waits":
+            CACHE_LOOKUPS.labels(namespace, field).inc()
+
+    def _set_version(self, namespace: str, version: int):
+        if self._versions.get(namespace) != version:
+            self._versions[namespace] = version
+            self.evict_local(namespace)
+
+    def evict_local(self, namespace: Optional[str] = None, key: Optional[str] = None):
+        """
+        清理进程内缓存
+
+        :param namespace: 命名空间，不指定时清理全部
+        :param key: 键，不指定时清理整个命名空间
+        """
+        if namespace is None:
+            self._local.clear()
+        elif key is not None:
+            self._local.pop((namespace, key), None)
+        else:
+            for local_key in [k for k in self._local if k[0] == namespace]:
+                del self._local[local_key]
+
+    def _get_local(self, namespace: str, key: str) -> Optional[_LocalEntry]:
+        local_key = (namespace, key)
+        if (entry := self._local.get(local_key)) is None:
+            return None
+        if (
+            entry.version != self._versions.get(namespace)
+            or entry.expires_at <= time.monotonic()
+        ):
+            del self._local[local_key]
+            return None
+        self._local.move_to_end(local_key)
+        return entry
+
+    def _put_local(
+        self, namespace: str, key: str, value: Any, version: int, ttl: float
+    ):
+        local_key = (namespace, key)
+        self._local[local_key] = _LocalEntry(
+            value, version, time.monotonic() + min(ttl, self.local_ttl)
+        )
+        self._local.move_to_end(local_key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+    async def get_or_load(
+        self,
+        namespace: str,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        *,
+        ttl: int,
+        negative_ttl: int = 0,
+        stale_ttl: int = 0,
+        dump: Callable[[Any], Any] = _identity,
+        load: Callable[[Any], Any] = _identity,
+    ) -> Any:
+        """
+        依次查询进程内缓存、Redis，均未命中时调用 `loader` 并写入两级缓存
+
+        同一进程内并发的相同查询只调用一次 `loader`，其余请求通过 `load` 由同一份结果各自还原
+
+        :param namespace: 命名空间
+        :param key: 键
+        :param loader: 加载函数，返回 None 表示记录不存在
+        :param ttl: 缓存时间（秒）
+        :param negative_ttl: 记录不存在时的缓存时间（秒），0 表示不缓存
+        :param stale_ttl: 条目过期后仍可在其他请求回源期间返回旧值的时间（秒）
+        :param dump: 将加载结果转换为可 JSON 序列化的值，返回 `UNCACHEABLE` 时不写入缓存
+        :param load: 将缓存值还原为结果
+        """
+        stats = self._stats(namespace)
+        start = time.perf_counter()
+        try:
+            if (entry := self._get_local(namespace, key)) is not None:
+                self._count(namespace, "local_hits")
+                return load(entry.value)
+
+            flight_key = (namespace, key)
+            if (flight := self._inflight.get(flight_key)) is not None:
+                value = await asyncio.shield(flight)
+                if value is UNCACHEABLE:
+                    # 结果无法共享（加载失败或对象有未提交的修改），自行查询
+                    return await loader()
+                self._count(namespace, "coalesced")
+                return load(value)
+
+            flight = self._inflight[flight_key] = (
+                asyncio.get_running_loop().create_future()
+            )
+            value = UNCACHEABLE
+            try:
+                value, result = await self._load(
+                    namespace, key, loader, ttl, negative_ttl, stale_ttl, dump
+                )
+            finally:
+                del self._inflight[flight_key]
+                flight.set_result(value)
+            return load(value) if result is _LOADED_FROM_CACHE else result
+        finally:
+            stats.record((time.perf_counter() - start) * 1000)
+
+    @staticmethod
+    def _parse(payload: Optional[str], version: int) -> Optional[dict]:
+        if payload is None:
+            return None
+        cached = json.loads(payload)
+        return cached if cached.get("v") == version and "exp" in cached else None
+
+    async def _load(
+        self,
+        namespace: str,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: int,
+        negative_ttl: int,
+        stale_ttl: int,
+        dump: Callable[[Any], Any],
+    ) -> tuple[Any, Any]:
+        """
+        查询 Redis，未命中时获取回源锁后调用 `loader`
+
+        Redis 中的版本号与条目在一次 pipeline 往返中读取
+
+        :return: (可共享的缓存值, 结果)，结果来自缓存时为 `_LOADED_FROM_CACHE`
+        """
+        stats = self._stats(namespace)
+        entry_key = f"{CACHE_PREFIX}{namespace}:{key}"
+        version: Optional[int] = None
+        payload: Optional[str] = None
+        lock = None
+        try:
+            client = get_shared_redis_client()
+            async with client.pipeline(transaction=False) as pipe:
+                pipe.get(VERSION_PREFIX + namespace)
+                pipe.get(entry_key)
+                raw_version, payload = await pipe.execute()
+            version = int(raw_version or 0)
+            self._set_version(namespace, version)
+
+            stale = None
+            if (cached := self._parse(payload, version)) is not None:
+                if (remaining := cached["exp"] - time.time()) > 0:
+                    self._count(namespace, "redis_hits")
+                    self._put_local(namespace, key, cached["value"], version, remaining)
+                    return cached["value"], _LOADED_FROM_CACHE
+                stale = cached
+
+            lock_key = f"{LOCK_PREFIX}{namespace}:{key}"
+            lock = client.lock(lock_key, timeout=self.lock_ttl, blocking=False)
+            if not await lock.acquire():
+                lock = None
+                if stale is not None:
+                    self._count(namespace, "stale_hits")
+                    return stale["value"], _LOADED_FROM_CACHE
+                if (
+                    cached := await self._wait_for(entry_key, lock_key, version)
+                ) is not None:
+                    self._count(namespace, "redis_hits")
+                    self._count(namespace, "lock_waits")
+                    return cached["value"], _LOADED_FROM_CACHE
+        except RedisError as e:
+            self._count(namespace, "errors")
+            logger.warning("读取缓存 %s:%s 失败，直接查询数据库: %s", namespace, key, e)
+
+        try:
+            self._count(namespace, "misses")
+            load_start = time.perf_counter()
+            result = await loader()
+            stats.load_ms += (time.perf_counter() - load_start) * 1000
+
+            value = dump(result) if result is not None else None
+            if version is not None and value is not UNCACHEABLE:
+                if value is not None:
+                    await self._store(
+                        namespace, key, payload, value, version, ttl, stale_ttl
+                    )
+                elif negative_ttl > 0:
+                    await self._store(
+                        namespace, key, payload, None, version, negative_ttl, 0
+                    )
+            return value, result
+        finally:
+            if lock is not None:
+                with suppress(RedisError):
+                    await lock.release()
+
+    async def _wait_for(
+        self, entry_key: str, lock_key: str, version: int
+    ) -> Optional[dict]:
+        """
+        其他进程持有回源锁时轮询等待其写入缓存，锁释放或超时仍未写入时返回 None
+        """
+        client = get_shared_redis_client()
+        deadline = time.monotonic() + self.lock_ttl
+        while time.monotonic() < deadline:
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+            async with client.pipeline(transaction=False) as pipe:
+                pipe.get(entry_key)
+                pipe.exists(lock_key)
+                payload, locked = await pipe.execute()
+            cached = self._parse(payload, version)
+            if cached is not None and cached["exp"] > time.time():
+                return cached
+            if not locked:
+                return None
+        return None
+
+    async def _store(
+        self,
+        namespace: str,
+        key: str,
+        expected: Optional[str],
+        value: Any,
+        version: int,
+        ttl: int,
+        stale_ttl: int,
+    ):
+        """
+        写入两级缓存，条目在回源期间被修改（失效或其他进程写入）时放弃写入
+
+        :param expected: 回源前读取的条目原值，不存在时为 None
+        """
+        entry = {"v": version, "exp": time.time() + ttl, "value": value}
+        try:
+            stored = await get_shared_redis_client().eval(  # type: ignore
+                _STORE_SCRIPT,
+                1,
+                f"{CACHE_PREFIX}{namespace}:{key}",
+                expected or "",
+                json.dumps(entry, ensure_ascii=False),
+                str(ttl + stale_ttl),
+            )
+        except RedisError as e:
+            self._count(namespace, "errors")
+            logger.warning("写入缓存 %s:%s 失败: %s", namespace, key, e)
+            return
+        if stored:
+            self._put_local(namespace, key, value, version, ttl)
+
+    async def invalidate(self, namespace: str, *keys: str):
+        """
+        使缓存失效并通知其他进程
+
+        :param namespace: 命名空间
+        :param keys: 失效的键，不指定时递增版本号使整个命名空间失效
+        """
+        client = get_shared_redis_client()
+        try:
+            if keys:
+                tombstone = json.dumps({"tombstone": secrets.token_hex(8)})
+                async with client.pipeline(transaction=False) as pipe:
+                    for key in keys:
+                        pipe.set(
+                            f"{CACHE_PREFIX}{namespace}:{key}",
+                            tombstone,
+                            ex=TOMBSTONE_TTL,
+                        )
+                    pipe.publish(
+                        EVICTION_CHANNEL,
+                        json.dumps({"namespace": namespace, "keys": keys}),
+                    )
+                    await pipe.execute()
+                for key in keys:
+                    self.evict_local(namespace, key)
+                return
+
+            version = await client.incr(VERSION_PREFIX + namespace)
+            self._set_version(namespace, version)
+            await client.publish(
+                EVICTION_CHANNEL,
+                json.dumps({"namespace": namespace, "version": version}),
+            )
+        except RedisError as e:
+            self._count(namespace, "errors")
+            self.evict_local(namespace)
+            logger.warning("缓存 %s 失效失败，将在过期后自动刷新: %s", namespace, e)
+
+    def handle_eviction(self, data: str):
+        """
+        处理其他进程（或本进程）发布的失效消息
+        """
+        message = json.loads(data)
+        namespace = message["namespace"]
+        if "version" in message:
+            if message["version"] > self._versions.get(namespace, -1):
+                self._set_version(namespace, message["version"])
+        else:
+            for key in message["keys"]:
+                self.evict_local(namespace, key)
+
+    def get_stats(self) -> dict:
+        return {
+            "local_entries": len(self._local),
+            "namespaces": {
+                namespace: stats.to_json() for namespace, stats in self.stats.items()
+            },
+        }
+
+
+repository_cache = TwoTierCache(
+    config.cache_local_max_entries, config.cache_local_ttl, config.cache_lock_ttl
+)
+
+_list_namespaces: set[str] = set()
+"""缓存了对象列表的命名空间，命名空间内的任何失效都会使其列表缓存整体失效"""
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, enum.Enum):
+        return value.name
+    return value
+
+
+def _decode(column_type: Any, value: Any) -> Any:
+    if value is None:
+        return None
+    if isinstance(column_type, DateTime):
+        return datetime.fromisoformat(value)
+    if isinstance(column_type, Enum) and column_type.enum_class is not None:
+        return column_type.enum_class[value]
+    if isinstance(column_type, Numeric):
+        return Decimal(value) if column_type.asdecimal else float(value)
+    return value
+
+
+def dump_row(instance: Any) -> Any:
+    """
+    将 ORM 对象的列属性转换为可 JSON 序列化的字典，有未提交修改的对象不缓存
+    """
+    state = sa_inspect(instance)
+    if state.modified:
+        return UNCACHEABLE
+    return {
+        attr.key: _encode(getattr(instance, attr.key))
+        for attr in state.mapper.column_attrs
+    }
+
+
+def load_row(model: type[Base], session: AsyncSession, row: Optional[dict]) -> Any:
+    """
+    由缓存的列属性还原 ORM 对象
+
+    会话中已有同一对象时直接返回会话中的对象，否则返回游离（detached）对象，
+    不会加入会话，因此缓存中的旧值不会被当前会话写回数据库
+    """
+    if row is None:
+        return None
+
+    mapper = sa_inspect(model)
+    values = {
+        attr.key: _decode(attr.columns[0].type, row.get(attr.key))
+        for attr in mapper.column_attrs
+    }
+    identity_key = mapper.identity_key_from_primary_key(
+        tuple(
+            values[mapper.get_property_by_column(column).key]
+            for column in mapper.primary_key
+        )
+    )
+    if (existing := session.sync_session.identity_map.get(identity_key)) is not None:
+        return existing
+
+    instance = mapper.class_manager.new_instance()
+    for key, value in values.items():
+        set_committed_value(instance, key, value)
+    make_transient_to_detached(instance)
+    return instance
+
+
+def dump_rows(instances: list) -> Any:
+    rows = [dump_row(instance) for instance in instances]
+    return UNCACHEABLE if any(row is UNCACHEABLE for row in rows) else rows
+
+
+def load_rows(model: type[Base], session: AsyncSession, rows: list[dict]) -> list:
+    return [load_row(model, session, row) for row in rows]
+
+
+def cached(
+    model: type[Base],
+    ttl: int = 60,
+    negative_ttl: int = 10,
+    stale_ttl: int = 0,
+    many: bool = False,
+):
+    """
+    缓存仓库中按唯一键查询单个 ORM 对象（或对象列表）的只读方法
+
+    被装饰的方法签名为 `(self, key)`，仓库需有 `session` 属性。命中缓存时返回的对象不在会话中，
+    需要修改对象的代码应直接查询数据库
+
+    :param model: ORM 模型，以表名作为命名空间
+    :param ttl: 缓存时间（秒）
+    :param negative_ttl: 记录不存在时的缓存时间（秒），0 表示不缓存
+    :param stale_ttl: 过期后仍可在其他请求回源期间返回旧值的时间（秒），只适用于过期，不适用于失效
+    :param many: 方法返回对象列表，缓存在 `<表名>:list` 命名空间，该模型的失效默认会使其整体失效
+    """
+    namespace = model.__tablename__
+    if many:
+        _list_namespaces.add(namespace)
+        namespace += LIST_SUFFIX
+    dump: Callable[[Any], Any] = dump_rows if many else dump_row
+    load: Callable[[type[Base], AsyncSession, Any], Any] = (
+        load_rows if many else load_row
+    )
+
+    def decorator(method):
+        @functools.wraps(method)
+        async def wrapper(self, key):
+            if not config.cache_enabled:
+                return await method(self, key)
+
+            return await repository_cache.get_or_load(
+                namespace,
+                str(key),
+                lambda: method(self, key),
+                ttl=ttl,
+                negative_ttl=negative_ttl,
+                stale_ttl=stale_ttl,
+                dump=dump,
+                load=functools.partial(load, model, self.session),
+            )
+
+        return wrapper
+
+    return decorator
+
+
+async def invalidate_cache(model: type[Base], *keys: Any, lists: bool = True):
+    """
+    使模型的缓存失效
+
+    :param model: ORM 模型
+    :param keys: 失效的键，不指定时使整个命名空间失效
+    :param lists: 是否同时使该模型的列表缓存失效。只改变计数等列表可容忍短暂过期的字段时传 False，
+        列表在自身的缓存时间后刷新
+    """
+    if not config.cache_enabled:
+        return
+
+    namespace = model.__tablename__
+    await repository_cache.invalidate(namespace, *map(str, keys))
+    if lists and namespace in _list_namespaces:
+        await repository_cache.invalidate(namespace + LIST_SUFFIX)
+
+
+def invalidates(model: type[Base], key: Optional[str] = None, lists: bool = True):
+    """
+    被装饰的方法返回（事务已提交）后使模型的缓存失效
+
+    :param model: ORM 模型
+    :param key: 作为缓存键的参数名，参数值为列表时失效多个键；不指定时使整个命名空间失效
+    :param lists: 是否同时使该模型的列表缓存失效，见 `invalidate_cache`
+    """
+
+    def decorator(method):
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        async def wrapper(*args, **kwargs):
+            result = await method(*args, **kwargs)
+            if key is None:
+                await invalidate_cache(model, lists=lists)
+            else:
+                value = signature.bind(*args, **kwargs).arguments[key]
+                keys = value if isinstance(value, (list, tuple, set)) else [value]
+                if keys:
+                    await invalidate_cache(model, *keys, lists=lists)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+async def run_cache_eviction_listener(cache: TwoTierCache = repository_cache):
+    """
+    订阅缓存失效消息并清理进程内缓存，直到任务被取消
+
+    每次（重新）订阅成功后清空进程内缓存，避免断线期间错过的消息导致读到旧值
+    """
+    logger.info("缓存失效订阅任务已启动")
+    while True:
+        pubsub = get_shared_redis_client().pubsub()
+        try:
+            await pubsub.subscribe(EVICTION_CHANNEL)
+            cache.evict_local()
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    cache.handle_eviction(message["data"])
+        except asyncio.CancelledError:
+            raise
+        except RedisError as e:
+            logger.warning("缓存失效订阅断开，1 秒后重试: %s", e)
+            await asyncio.sleep(1)
+        finally:
+            await pubsub.aclose()
+
+
+def get_cache_stats() -> dict:
+    """
+    获取仓库缓存各命名空间的命中率与耗时
+    """
+    return repository_cache.get_stats()
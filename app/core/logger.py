@@ -1,32 +1,227 @@
+import atexit
+import copy
+import gzip
 import logging
+import os
+import queue
+import re
+import shutil
 import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from logging.handlers import BaseRotatingHandler, QueueHandler, QueueListener
 from pathlib import Path
+from typing import Optional
 
 import colorlog
 
 from .config import config
+from .request_context import request_id
 
-LOG_PATH = Path("./logs")
-LOG_PATH.mkdir(exist_ok=True)
+LOG_PATH = Path(config.log_dir)
+LOG_PATH.mkdir(parents=True, exist_ok=True)
+
+PROCESS_SUFFIX = f".{os.getpid()}" if config.log_file_per_process else ""
+"""多个 worker 进程各自写入带进程号的日志文件，互不交错，也不会同时轮转同一个文件"""
+
+_DATED_LOG = re.compile(r"^(\d{4}-\d{2}-\d{2})(\..+)?\.log(\.gz)?$")
+
+log_archiver = ThreadPoolExecutor(max_workers=1, thread_name_prefix="log-archiver")
+"""压缩轮转后的日志与清理过期日志的后台线程"""
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    将日志记录放入有界队列，由 `QueueListener` 的后台线程格式化并写入控制台与文件，请求处理中不做文件 I/O
+
+    调用方线程只合并消息参数（参数可能是之后会被修改的对象），时间、颜色等格式化留给后台线程。
+    队列已满时按策略丢弃新记录（之后补记一条丢弃数量的告警）或阻塞等待
+
+    :param log_queue: 有界队列
+    :param block: 队列已满时是否阻塞等待，否则丢弃
+    """
+
+    def __init__(self, log_queue: queue.Queue, block: bool = False):
+        super().__init__(log_queue)
+        self.log_queue = log_queue
+        self.block = block
+        self.dropped = 0
+        self._unreported = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        record.request_id = request_id.get() or "-"
+        if record.exc_info:
+            # 异常的 traceback 引用调用栈，在当前线程转为文本
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        if self.block:
+            self.log_queue.put(record)
+            return
+
+        try:
+            self.log_queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            self._unreported += 1
+            return
+
+        if self._unreported:
+            notice = logging.makeLogRecord(
+                {
+                    "name": record.name,
+                    "levelno": logging.WARNING,
+                    "levelname": "WARNING",
+                    "msg": f"日志队列已满，丢弃了 {self._unreported} 条日志",
+                    "request_id": "-",
+                }
+            )
+            try:
+                self.log_queue.put_nowait(notice)
+                self._unreported = 0
+            except queue.Full:
+                pass
+
+
+def _compress(path: Path):
+    try:
+        with open(path, "rb") as src, gzip.open(f"{path}.gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        path.unlink()
+    except OSError as e:
+        # 不写入应用日志，避免归档线程的错误再经队列写入日志文件、触发轮转
+        if logging.lastResort:
+            logging.lastResort.handle(
+                logging.makeLogRecord(
+                    {
+                        "levelno": logging.WARNING,
+                        "levelname": "WARNING",
+                        "msg": f"压缩日志 {path} 失败: {e}",
+                    }
+                )
+            )
+
+
+def _remove_expired(directory: Path, backup_days: int):
+    expire_before = (date.today() - timedelta(days=backup_days)).isoformat()
+    for path in directory.iterdir():
+        if (match := _DATED_LOG.match(path.name)) and match.group(1) < expire_before:
+            try:
+                path.unlink()
+            except OSError:  # 其他进程已删除
+                pass
+
+
+class DailyRotatingFileHandler(BaseRotatingHandler):
+    """
+    按天与大小轮转的日志文件处理器
+
+    当前文件为 `<目录>/<日期><后缀>.log`。跨天后写入新日期的文件；同一天内超过 `max_bytes` 时
+    将当前文件重命名为 `<日期><后缀>.<序号>.log`。轮转出的文件在后台线程压缩为 `.gz`，
+    同时删除超过 `backup_days` 天的日志
+
+    :param directory: 日志目录
+    :param suffix: 文件名后缀（如进程号）
+    :param max_bytes: 单个文件的最大字节数，0 表示只按天轮转
+    :param backup_days: 日志保留天数，0 表示不删除
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        suffix: str = "",
+        max_bytes: int = 0,
+        backup_days: int = 0,
+    ):
+        self.directory = directory
+        self.suffix = suffix
+        self.max_bytes = max_bytes
+        self.backup_days = backup_days
+        self._date = date.today()
+        self._next_rollover = self._midnight()
+        super().__init__(self._path(), "a", encoding="utf-8", delay=True)
+
+    def _path(self, index: Optional[int] = None) -> Path:
+        name = f"{self._date.isoformat()}{self.suffix}"
+        if index is not None:
+            name += f".{index}"
+        return self.directory / f"{name}.log"
+
+    def _midnight(self) -> float:
+        return datetime.combine(
+            self._date + timedelta(days=1), datetime.min.time()
+        ).timestamp()
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if time.time() >= self._next_rollover:
+            return True
+        if self.max_bytes <= 0:
+            return False
+        if self.stream is None:
+            self.stream = self._open()
+        message = f"{self.format(record)}\n"
+        return self.stream.tell() + len(message.encode("utf-8")) > self.max_bytes
+
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None  # type: ignore
+
+        finished = Path(self.baseFilename)
+        if time.time() >= self._next_rollover:
+            self._date = date.today()
+            self._next_rollover = self._midnight()
+            self.baseFilename = os.path.abspath(self._path())
+        else:
+            index = 1
+            while (
+                self._path(index).exists() or Path(f"{self._path(index)}.gz").exists()
+            ):
+                index += 1
+            finished = finished.rename(self._path(index))
+
+        if finished.exists():
+            log_archiver.submit(_compress, finished)
+        if self.backup_days > 0:
+            log_archiver.submit(_remove_expired, self.directory, self.backup_days)
+
+
+def _queue_handler(*handlers: logging.Handler) -> BoundedQueueHandler:
+    """
+    创建写入有界队列的处理器，`handlers` 由后台线程执行，进程退出时写完队列中剩余的日志
+    """
+    log_queue: queue.Queue = queue.Queue(maxsize=config.log_queue_size)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return BoundedQueueHandler(log_queue, block=config.log_queue_full_policy == "block")
 
 
 def init_logger():
     # 创建logger对象
     logger = logging.getLogger("app")
-    logger.setLevel(logging.DEBUG)
 
     # 创建控制台日志处理器
     console_handler = logging.StreamHandler()
     console_handler.setLevel(config.log_level)
 
     # 创建文件日志处理器
-    file_handler = logging.FileHandler(
-        f'logs/{time.strftime("%Y-%m-%d", time.localtime())}.log', encoding="utf-8"
+    file_handler = DailyRotatingFileHandler(
+        LOG_PATH,
+        suffix=PROCESS_SUFFIX,
+        max_bytes=config.log_max_bytes,
+        backup_days=config.log_backup_days,
     )
-    file_handler.setLevel(logging.DEBUG)
+    file_handler.setLevel(config.file_log_level)
     file_handler.setFormatter(
         logging.Formatter(
-            "[%(asctime)s] [%(name)s] [%(levelname)s] %(funcName)s: %(message)s"
+            "[%(asctime)s] [%(name)s] [%(levelname)s] [%(request_id)s] "
+            "%(funcName)s: %(message)s"
         )
     )
 
@@ -50,10 +245,44 @@ def init_logger():
         logger.removeHandler(handler)
     logger.propagate = False
 
-    # 添加处理器对象
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
+    # 控制台与文件处理器由后台线程执行，请求只把记录放入队列
+    # logger 取两者中较低的等级，两者都不输出的记录在调用处丢弃，不会被格式化
+    logger.setLevel(min(console_handler.level, file_handler.level))
+    logger.addHandler(_queue_handler(console_handler, file_handler))
     return logger
 
 
+def _json_file_logger(name: str, subdir: str) -> logging.Logger:
+    """
+    每行一条 JSON 记录的日志，写入日志目录下的子目录，与应用日志一样按天与大小轮转并经队列写入
+
+    :param name: logger 名称
+    :param subdir: 日志目录下的子目录
+    """
+    json_logger = logging.getLogger(name)
+    json_logger.setLevel(logging.INFO)
+    json_logger.propagate = False
+
+    for handler in list(json_logger.handlers):
+        json_logger.removeHandler(handler)
+
+    directory = LOG_PATH / subdir
+    directory.mkdir(exist_ok=True)
+    file_handler = DailyRotatingFileHandler(
+        directory,
+        suffix=PROCESS_SUFFIX,
+        max_bytes=config.log_max_bytes,
+        backup_days=config.log_backup_days,
+    )
+    file_handler.setFormatter(logging.Formatter("%(message)s"))
+    json_logger.addHandler(_queue_handler(file_handler))
+    return json_logger
+
+
 logger = init_logger()
+slow_query_logger = _json_file_logger("app.slow_query", "slow_query")
+"""慢查询日志"""
+access_logger = _json_file_logger("app.access", "access")
+"""访问日志"""
+trace_logger = _json_file_logger("app.trace", "trace")
+"""追踪日志，每行一个 span"""
@@ -0,0 +1,116 @@
+"""
+Prometheus 指标
+
+多个 worker 进程运行时，启动前设置环境变量 `PROMETHEUS_MULTIPROC_DIR` 指向一个空目录，
+各进程把指标写入该目录下的 mmap 文件，`/metrics` 由处理抓取请求的进程汇总所有进程的数据输出。
+计数器与直方图按进程求和，Gauge 按各自的 `multiprocess_mode` 汇总
+"""
+
+import os
+from collections.abc import Iterable
+
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "请求耗时",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "正在处理的请求数", multiprocess_mode="livesum"
+)
+
+DB_POOL_WAIT = Histogram(
+    "db_pool_checkout_seconds",
+    "从连接池获取连接的耗时（_count 为检出次数）",
+    ["pool"],
+    buckets=FAST_BUCKETS,
+)
+DB_POOL_TIMEOUTS = Counter("db_pool_timeouts_total", "等待连接池超时的次数", ["pool"])
+
+REDIS_COMMAND_LATENCY = Histogram(
+    "redis_command_duration_seconds",
+    "Redis 命令耗时（pipeline 计为一条 PIPELINE）",
+    ["command"],
+    buckets=FAST_BUCKETS,
+)
+
+BCRYPT_QUEUE_DEPTH = Gauge(
+    "bcrypt_queue_depth",
+    "排队与正在执行的 bcrypt 哈希数",
+    multiprocess_mode="livesum",
+)
+
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total",
+    "仓库缓存查询次数，result 为 local_hits/redis_hits/stale_hits/coalesced/misses",
+    ["namespace", "result"],
+)
+CACHE_ERRORS = Counter("cache_errors_total", "读写 Redis 缓存失败的次数", ["namespace"])
+
+ENROLLMENT_SELECTIONS = Counter("enrollment_selections_total", "成功选课次数")
+ENROLLMENT_DESELECTIONS = Counter("enrollment_deselections_total", "成功退课次数")
+ENROLLMENT_FULL_REJECTIONS = Counter(
+    "enrollment_full_rejections_total", "因课程已满被拒绝的选课次数"
+)
+
+
+class _SeatsCollector:
+    """
+    抓取时由数据库查询的各开放课程剩余名额，不写入多进程文件
+    """
+
+    def __init__(self, seats: Iterable[tuple[str, int]]):
+        self.seats = seats
+
+    def collect(self):
+        family = GaugeMetricFamily(
+            "enrollment_seats_remaining",
+            "已发布的公开选修课剩余名额",
+            labels=["course_no"],
+        )
+        for course_no, remaining in self.seats:
+            family.add_metric([course_no], remaining)
+        yield family
+
+
+def is_multiprocess() -> bool:
+    return "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+
+def render_metrics(seats: Iterable[tuple[str, int]]) -> bytes:
+    """
+    输出 Prometheus 文本格式的指标
+
+    :param seats: (课程编号, 剩余名额) 列表
+    """
+    if is_multiprocess():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    seats_registry = CollectorRegistry(auto_describe=False)
+    seats_registry.register(_SeatsCollector(seats))  # type: ignore
+    return generate_latest(registry) + generate_latest(seats_registry)
+
+
+def mark_process_dead():
+    """
+    进程退出时清理其 live* 模式的 Gauge
+    """
+    if is_multiprocess():
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,284 @@
+"""
+按请求的采样分析器
+
+管理员开启后，在限定时间内对指定路由或按比例抽取的请求采样: 后台线程每隔 `profiler_interval_ms` 毫秒
+检查被采样请求所在的任务，任务正在执行时记录事件循环线程的调用栈，挂起时记录其协程链（以 `[await]` 结尾），
+因此结果同时反映 CPU 耗时与等待数据库、Redis 的时间。
+
+请求结束后调用栈以折叠格式（`帧;帧;... 次数`，可直接用于 flamegraph.pl、speedscope 等工具）累加到 Redis，
+多个进程的结果汇总在一起。开关通过 Redis 保存并经 pub/sub 通知其他进程。
+未开启时采样线程不运行，中间件只检查一次开关
+"""
+
+import asyncio
+import functools
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from types import FrameType
+from typing import Any, Optional
+
+from redis.exceptions import RedisError
+
+from app.core.config import config
+from app.core.logger import logger
+from app.core.redis import get_shared_redis_client
+
+SETTINGS_KEY = "profiler:settings"
+STACKS_KEY = "profiler:stacks"
+PROFILER_CHANNEL = "profiler"
+
+_SEARCH_PATHS = sorted(
+    {os.path.abspath(path) + os.sep for path in sys.path if path}, key=len, reverse=True
+)
+
+
+@functools.lru_cache(maxsize=4096)
+def _short_path(filename: str) -> str:
+    for prefix in _SEARCH_PATHS:
+        if filename.startswith(prefix):
+            return filename[len(prefix) :]
+    return filename
+
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{_short_path(code.co_filename)}:{code.co_qualname}"
+
+
+@dataclass
+class ProfilerSettings:
+    """
+    采样设置
+    """
+
+    route: Optional[str] = None
+    """只采样该路由（路由模板，如 `/api/student/select`），为空时不限路由"""
+    sample_rate: float = 1.0
+    """（符合路由的）请求的采样比例"""
+    until: float = 0.0
+    """自动关闭的时间（Unix 时间戳）"""
+
+    def dumps(self) -> str:
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def loads(cls, data: Optional[str]) -> Optional["ProfilerSettings"]:
+        return cls(**json.loads(data)) if data else None
+
+
+class SamplingProfiler:
+    """
+    进程内的采样分析器
+
+    :param interval: 采样间隔（秒）
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.settings: Optional[ProfilerSettings] = None
+        self._tasks: dict[asyncio.Task, Counter[str]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread_id = 0
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.settings is not None
+
+    def apply(self, settings: Optional[ProfilerSettings]):
+        """
+        应用采样设置，在事件循环中调用；开启时启动采样线程，关闭后采样线程自行退出
+
+        :param settings: 采样设置，为空时关闭
+        """
+        if settings is not None and settings.until <= time.time():
+            settings = None
+        self.settings = settings
+        if settings is None:
+            return
+
+        self._loop = asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name="profiler", daemon=True
+            )
+            self._thread.start()
+
+    def should_sample(self) -> bool:
+        """
+        是否采样当前请求，设置过期后关闭
+        """
+        if (settings := self.settings) is None:
+            return False
+        if settings.until <= time.time():
+            self.settings = None
+            return False
+        return random.random() < settings.sample_rate
+
+    def matches(self, route: Optional[str]) -> bool:
+        settings = self.settings
+        return settings is not None and settings.route in (None, route)
+
+    @contextmanager
+    def track(self, samples: Counter[str]) -> Iterator[None]:
+        """
+        在代码块内采样当前任务
+
+        :param samples: 累加采样结果，折叠格式调用栈 -> 采样次数
+        """
+        task = asyncio.current_task()
+        assert task is not None
+        self._tasks[task] = samples
+        try:
+            yield
+        finally:
+            self._tasks.pop(task, None)
+
+    def _run(self):
+        while self.settings is not None:
+            time.sleep(self.interval)
+            if not self._tasks:
+                continue
+
+            frame = sys._current_frames().get(self._thread_id)
+            current = asyncio.current_task(self._loop)
+            for task, samples in list(self._tasks.items()):
+                stack = self._sample(task, frame if task is current else None)
+                if stack:
+                    samples[stack] += 1
+
+    @staticmethod
+    def _sample(task: asyncio.Task, frame: Optional[FrameType]) -> str:
+        """
+        获取任务的折叠格式调用栈
+
+        :param task: 被采样的任务
+        :param frame: 任务正在执行时为事件循环线程的当前帧，挂起时为空
+        """
+        coro = task.get_coro()
+        root = getattr(coro, "cr_frame", None)
+        names = []
+        if frame is not None:
+            while frame is not None:
+                names.append(_frame_name(frame))
+                if frame is root:
+                    break
+                frame = frame.f_back
+            names.reverse()
+        else:
+            awaiting: Optional[Any] = coro
+            while awaiting is not None:
+                if (coro_frame := getattr(awaiting, "cr_frame", None)) is None:
+                    coro_frame = getattr(awaiting, "gi_frame", None)
+                if coro_frame is None:
+                    break
+                names.append(_frame_name(coro_frame))
+                awaiting = getattr(awaiting, "cr_await", None) or getattr(
+                    awaiting, "gi_yieldfrom", None
+                )
+            if names:
+                names.append("[await]")
+        return ";".join(names)
+
+
+request_profiler = SamplingProfiler(config.profiler_interval_ms / 1000)
+
+
+async def save_samples(route: str, samples: Counter[str]):
+    """
+    把一个请求的采样结果累加到 Redis
+
+    :param route: 请求方法与路由，作为调用栈的根
+    :param samples: 折叠格式调用栈 -> 采样次数
+    """
+    try:
+        async with get_shared_redis_client().pipeline(transaction=False) as pipe:
+            for stack, count in samples.items():
+                pipe.hincrby(STACKS_KEY, f"{route};{stack}", count)
+            await pipe.execute()
+    except RedisError as e:
+        logger.warning("保存采样结果失败: %s", e)
+
+
+async def start_profiling(
+    route: Optional[str], sample_rate: float, duration: int
+) -> ProfilerSettings:
+    """
+    开启采样并清空之前的结果，所有进程生效
+
+    :param route: 只采样该路由，为空时不限路由
+    :param sample_rate: 采样比例
+    :param duration: 持续时间（秒），到期后自动关闭
+    """
+    settings = ProfilerSettings(
+        route=route, sample_rate=sample_rate, until=time.time() + duration
+    )
+    client = get_shared_redis_client()
+    async with client.pipeline(transaction=True) as pipe:
+        pipe.delete(STACKS_KEY)
+        pipe.set(SETTINGS_KEY, settings.dumps(), ex=duration)
+        pipe.publish(PROFILER_CHANNEL, settings.dumps())
+        await pipe.execute()
+    request_profiler.apply(settings)
+    return settings
+
+
+async def stop_profiling():
+    """
+    关闭采样，保留已有结果，所有进程生效
+    """
+    client = get_shared_redis_client()
+    async with client.pipeline(transaction=True) as pipe:
+        pipe.delete(SETTINGS_KEY)
+        pipe.publish(PROFILER_CHANNEL, "")
+        await pipe.execute()
+    request_profiler.apply(None)
+
+
+async def get_profile(route: Optional[str] = None) -> str:
+    """
+    获取汇总后的折叠格式调用栈
+
+    :param route: 只返回该路由（路由模板）的调用栈
+    """
+    stacks: dict[str, str] = await get_shared_redis_client().hgetall(STACKS_KEY)  # type: ignore
+    lines = [
+        f"{stack} {count}"
+        for stack, count in sorted(stacks.items())
+        if route is None or stack.split(";", 1)[0].split(" ", 1)[-1] == route
+    ]
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+async def run_profiler_listener(profiler: SamplingProfiler = request_profiler):
+    """
+    订阅采样开关消息，直到任务被取消
+
+    每次（重新）订阅成功后从 Redis 读取当前设置，避免断线期间错过消息
+    """
+    logger.info("采样分析订阅任务已启动")
+    while True:
+        client = get_shared_redis_client()
+        pubsub = client.pubsub()
+        try:
+            await pubsub.subscribe(PROFILER_CHANNEL)
+            profiler.apply(ProfilerSettings.loads(await client.get(SETTINGS_KEY)))
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    profiler.apply(ProfilerSettings.loads(message["data"]))
+        except asyncio.CancelledError:
+            raise
+        except RedisError as e:
+            logger.warning("采样分析订阅断开，1 秒后重试: %s", e)
+            await asyncio.sleep(1)
+        finally:
+            await pubsub.aclose()
@@ -0,0 +1,91 @@
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+@dataclass
+class QueryStats:
+    """
+    一个请求（或一段代码）内执行的 SQL 统计
+    """
+
+    count: int = 0
+    """执行的语句数（executemany 计为一条）"""
+    total_ms: float = 0.0
+    """数据库累计耗时（毫秒）"""
+    slowest_ms: float = 0.0
+    """最慢语句的耗时（毫秒）"""
+    slowest_statement: Optional[str] = None
+    """最慢的语句"""
+    statements: Counter = field(default_factory=Counter)
+    """每种语句（参数化后的 SQL）的执行次数"""
+
+    def record(self, statement: str, elapsed_ms: float):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.statements[statement] += 1
+        if elapsed_ms >= self.slowest_ms:
+            self.slowest_ms = elapsed_ms
+            self.slowest_statement = statement
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """
+        执行次数超过 `threshold` 的语句，通常意味着在循环中逐条查询（N+1）
+
+        :return: (语句, 次数) 列表，按次数降序
+        """
+        return [(s, n) for s, n in self.statements.most_common() if n > threshold]
+
+
+_collectors: ContextVar[tuple[QueryStats, ...]] = ContextVar(
+    "query_collectors", default=()
+)
+"""当前上下文中生效的统计对象，嵌套统计时每层都会记录"""
+
+
+@contextmanager
+def collect_queries() -> Iterator[QueryStats]:
+    """
+    统计代码块内当前上下文执行的 SQL
+
+    上下文变量会随 SQLAlchemy 的 greenlet 与线程池传递，因此依赖项与仓库中的查询都会被计入
+    """
+    stats = QueryStats()
+    token = _collectors.set(_collectors.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _collectors.reset(token)
+
+
+def instrument_engine(engine: AsyncEngine):
+    """
+    为引擎注册语句计时事件
+
+    没有统计对象时只多一次上下文变量读取
+    """
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        if _collectors.get():
+            context._query_start = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        start = getattr(context, "_query_start", None)
+        if start is None:
+            return
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        for stats in _collectors.get():
+            stats.record(statement, elapsed_ms)
@@ -1,19 +1,104 @@
+import asyncio
+import time
 from collections.abc import AsyncGenerator
+from typing import Optional
+from weakref import WeakKeyDictionary
 
 import redis.asyncio as redis
+from opentelemetry.trace import SpanKind
+from redis.asyncio.client import Pipeline
 
 from app.core.logger import logger
+from app.core.metrics import REDIS_COMMAND_LATENCY
+from app.core.request_context import record_redis_command
+from app.core.tracing import tracer
 
 from .config import config
 
+_shared_clients: "WeakKeyDictionary[asyncio.AbstractEventLoop, redis.Redis]" = (
+    WeakKeyDictionary()
+)
 
-async def get_redis_client() -> AsyncGenerator[redis.Redis, None]:
-    logger.info("初始化 Redis 实例...")
 
-    client = redis.Redis(
+class InstrumentedPipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True):
+        start = time.perf_counter()
+        try:
+            with tracer.start_as_current_span(
+                "redis PIPELINE",
+                kind=SpanKind.CLIENT,
+                attributes={
+                    "db.system": "redis",
+                    "db.operation.name": "PIPELINE",
+                    "db.operation.batch.size": len(self.command_stack),
+                },
+            ):
+                return await super().execute(raise_on_error)
+        finally:
+            elapsed = time.perf_counter() - start
+            record_redis_command(elapsed * 1000)
+            REDIS_COMMAND_LATENCY.labels("PIPELINE").observe(elapsed)
+
+
+class InstrumentedRedis(redis.Redis):
+    """
+    记录每条命令（pipeline 计为一条）耗时并创建 span 的 Redis 客户端
+    """
+
+    async def execute_command(self, *args, **options):
+        command = str(args[0]).upper()
+        start = time.perf_counter()
+        try:
+            with tracer.start_as_current_span(
+                f"redis {command}",
+                kind=SpanKind.CLIENT,
+                attributes={"db.system": "redis", "db.operation.name": command},
+            ):
+                return await super().execute_command(*args, **options)
+        finally:
+            elapsed = time.perf_counter() - start
+            record_redis_command(elapsed * 1000)
+            REDIS_COMMAND_LATENCY.labels(command).observe(elapsed)
+
+    def pipeline(
+        self, transaction: bool = True, shard_hint: Optional[str] = None
+    ) -> Pipeline:
+        return InstrumentedPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
+
+
+def create_redis_client() -> redis.Redis:
+    return InstrumentedRedis(
         host=config.redis_host, port=config.redis_port, decode_responses=True
     )
+
+
+async def get_redis_client() -> AsyncGenerator[redis.Redis, None]:
+    logger.info("初始化 Redis 实例...")
+
+    client = create_redis_client()
     try:
         yield client
     finally:
         await client.aclose()
+
+
+def get_shared_redis_client() -> redis.Redis:
+    """
+    获取当前事件循环共享的 Redis 客户端（自带连接池），供缓存等请求依赖之外的场景使用
+
+    连接池绑定创建它的事件循环，因此按事件循环分别创建
+    """
+    loop = asyncio.get_running_loop()
+    if (client := _shared_clients.get(loop)) is None:
+        client = _shared_clients[loop] = create_redis_client()
+    return client
+
+
+async def close_shared_redis_client():
+    """
+    关闭当前事件循环共享的 Redis 客户端
+    """
+    if (client := _shared_clients.pop(asyncio.get_running_loop(), None)) is not None:
+        await client.aclose()
@@ -0,0 +1,76 @@
+"""
+请求上下文: 请求 ID 以及请求内鉴权、Redis 等环节的耗时，供访问日志使用
+
+上下文变量在访问日志中间件中设置，依赖项、仓库与 Redis 客户端在同一个上下文中累加耗时
+"""
+
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+"""当前请求的 ID，不在请求中时为 None"""
+
+
+@dataclass
+class RequestTimings:
+    """
+    一个请求内各环节的耗时
+    """
+
+    auth_ms: float = 0.0
+    """鉴权依赖的耗时（毫秒），包括其中的数据库与 Redis 查询"""
+    redis_ms: float = 0.0
+    """Redis 命令（pipeline 计为一条）的累计耗时（毫秒）"""
+    redis_commands: int = 0
+    """执行的 Redis 命令数"""
+    role: Optional[str] = None
+    """鉴权通过的用户角色"""
+
+
+_timings: ContextVar[Optional[RequestTimings]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+@contextmanager
+def track_request(rid: str) -> Iterator[RequestTimings]:
+    """
+    在代码块内设置请求 ID 并统计各环节耗时
+
+    :param rid: 请求 ID
+    """
+    timings = RequestTimings()
+    id_token = request_id.set(rid)
+    timings_token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(timings_token)
+        request_id.reset(id_token)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _timings.get()
+
+
+def record_redis_command(elapsed_ms: float):
+    if (timings := _timings.get()) is not None:
+        timings.redis_ms += elapsed_ms
+        timings.redis_commands += 1
+
+
+@contextmanager
+def measure_auth() -> Iterator[None]:
+    """
+    统计鉴权耗时
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if (timings := _timings.get()) is not None:
+            timings.auth_ms += (time.perf_counter() - start) * 1000
@@ -0,0 +1,204 @@
+import asyncio
+import contextvars
+import json
+import re
+import sys
+import time
+from datetime import datetime
+from types import FrameType
+from typing import Any, Optional
+
+from greenlet import getcurrent
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.logger import logger, slow_query_logger
+
+REDACTED = "***"
+SENSITIVE_NAME = re.compile(r"pass|pwd|token|secret|hash", re.IGNORECASE)
+"""参数名匹配时隐藏参数值"""
+SENSITIVE_VALUE = re.compile(r"^\$2[aby]?\$")
+"""bcrypt 哈希值"""
+MAX_VALUE_LENGTH = 64
+EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE")
+
+_explaining: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "slow_query_explaining", default=False
+)
+
+
+def _redact_value(name: Optional[str], value: Any) -> Any:
+    if name and SENSITIVE_NAME.search(name):
+        return REDACTED
+    if isinstance(value, (bytes, bytearray)):
+        return f"<{len(value)} bytes>"
+    if isinstance(value, str):
+        if SENSITIVE_VALUE.match(value):
+            return REDACTED
+        if len(value) > MAX_VALUE_LENGTH:
+            return value[:MAX_VALUE_LENGTH] + "..."
+    return value
+
+
+def redact_parameters(parameters: Any, context=None) -> Any:
+    """
+    隐藏慢查询日志中的敏感参数，截断过长的值
+
+    位置参数通过编译结果还原参数名；executemany 只保留第一组参数与总组数
+    """
+    if isinstance(parameters, list):
+        if not parameters:
+            return parameters
+        return {
+            "first": redact_parameters(parameters[0], context),
+            "count": len(parameters),
+        }
+    if isinstance(parameters, dict):
+        return {key: _redact_value(key, value) for key, value in parameters.items()}
+
+    names = getattr(getattr(context, "compiled", None), "positiontup", None) or []
+    return [
+        _redact_value(names[i] if i < len(names) else None, value)
+        for i, value in enumerate(parameters or ())
+    ]
+
+
+def find_caller() -> Optional[str]:
+    """
+    查找发起当前语句的仓库方法
+
+    异步会话在子 greenlet 中执行语句，调用方的协程栈位于父 greenlet 中
+    """
+    frames = [sys._getframe(1)]
+    parent = getcurrent().parent
+    if parent is not None and parent.gr_frame is not None:
+        frames.append(parent.gr_frame)
+
+    fallback = None
+    for start in frames:
+        frame: Optional[FrameType] = start
+        while frame is not None:
+            filename = frame.f_code.co_filename.replace("\\", "/")
+            if "/app/repositories/" in filename:
+                return f"{frame.f_globals.get('__name__')}.{frame.f_code.co_qualname}"
+            if (
+                fallback is None
+                and "/app/" in filename
+                and "/app/core/" not in filename
+            ):
+                fallback = (
+                    f"{frame.f_globals.get('__name__')}.{frame.f_code.co_qualname}"
+                )
+            frame = frame.f_back
+    return fallback
+
+
+class SlowQueryLog:
+    """
+    慢查询日志
+
+    耗时超过阈值的语句连同脱敏后的参数、调用方仓库方法与执行计划写入 `logs/slow_query` 目录。
+    执行计划在事件循环中另起连接异步获取（SQLite 使用 EXPLAIN QUERY PLAN），不阻塞当前请求；
+    同一语句在 `explain_interval` 秒内只获取一次执行计划。低于阈值的语句只多两次计时
+    """
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        threshold_ms: float,
+        explain: bool = True,
+        explain_interval: float = 60.0,
+        max_pending: int = 4,
+    ):
+        self.engine = engine
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self.explain_interval = explain_interval
+        self.max_pending = max_pending
+
+        self._pending: set[asyncio.Task] = set()
+        self._explained_at: dict[str, float] = {}
+
+        event.listen(engine.sync_engine, "before_cursor_execute", self._before)
+        event.listen(engine.sync_engine, "after_cursor_execute", self._after)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        context._slow_query_start = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, "_slow_query_start", None)
+        if start is None:
+            return
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if elapsed_ms < self.threshold_ms or _explaining.get():
+            return
+
+        record = {
+            "time": datetime.now().isoformat(timespec="milliseconds"),
+            "elapsed_ms": round(elapsed_ms, 3),
+            "caller": find_caller(),
+            "database": conn.engine.url.render_as_string(),
+            "statement": statement,
+            "parameters": redact_parameters(parameters, context),
+        }
+        logger.warning("慢查询 %.1f ms: %s", elapsed_ms, record["caller"])
+
+        if not self._should_explain(statement, executemany):
+            self.write(record)
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.write(record)
+            return
+
+        # 使用空的上下文，执行计划查询不计入当前请求的 SQL 统计
+        task = loop.create_task(
+            self._explain_and_write(record, statement, parameters),
+            context=contextvars.Context(),
+        )
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    def _should_explain(self, statement: str, executemany: bool) -> bool:
+        if not self.explain or executemany or len(self._pending) >= self.max_pending:
+            return False
+        if not statement.lstrip().upper().startswith(EXPLAINABLE):
+            return False
+
+        now = time.monotonic()
+        if (
+            now - self._explained_at.get(statement, -self.explain_interval)
+            < self.explain_interval
+        ):
+            return False
+        if len(self._explained_at) > 1000:
+            self._explained_at.clear()
+        self._explained_at[statement] = now
+        return True
+
+    async def _explain_and_write(self, record: dict, statement: str, parameters):
+        _explaining.set(True)
+        prefix = (
+            "EXPLAIN QUERY PLAN "
+            if self.engine.dialect.name == "sqlite"
+            else "EXPLAIN "
+        )
+        try:
+            async with self.engine.connect() as conn:
+                result = await conn.exec_driver_sql(prefix + statement, parameters)
+                record["plan"] = [dict(row._mapping) for row in result]
+        except Exception as e:
+            record["plan_error"] = str(e)
+        self.write(record)
+
+    def write(self, record: dict):
+        slow_query_logger.info(json.dumps(record, ensure_ascii=False, default=str))
+
+    async def drain(self):
+        """
+        等待尚未完成的执行计划查询
+        """
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
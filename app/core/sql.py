@@ -1,32 +1,566 @@
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
-from sqlalchemy.orm import DeclarativeBase
+import asyncio
+import itertools
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+from redis.exceptions import RedisError
+from sqlalchemy import Delete, Insert, Update, event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import DeclarativeBase, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 from app.core.config import config
 from app.core.logger import logger
+from app.core.metrics import DB_POOL_TIMEOUTS, DB_POOL_WAIT
+from app.core.query_stats import instrument_engine
+from app.core.redis import get_shared_redis_client
+from app.core.slow_query import SlowQueryLog
+from app.core.tracing import trace_engine
+from app.migrations import current_version, head_revision, upgrade
+
+request_subject: ContextVar[Optional[str]] = ContextVar("request_subject", default=None)
+"""当前请求的登录用户名，由鉴权依赖写入，用于读写分离中的读己之写"""
+
+READ_YOUR_WRITES_PREFIX = "read_your_writes:"
+"""用户最近写入的 Redis 键前缀，各 worker 进程据此将该用户的读请求路由到主库"""
 
 
 class Base(DeclarativeBase):
     pass
 
 
-_engine = create_async_engine(config.db_url, echo=False, pool_pre_ping=True)
-async_session = async_sessionmaker(_engine, expire_on_commit=False)
+def enable_sqlite_foreign_keys(engine: AsyncEngine):
+    """
+    为 SQLite 连接开启外键约束
+
+    SQLite 默认不执行外键约束（包括 ON DELETE CASCADE/SET NULL），需要在每个连接上单独开启
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragma(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
+@dataclass
+class PoolStats:
+    """
+    连接池获取连接的累计统计
+    """
+
+    checkouts: int = 0
+    """成功获取连接的次数"""
+    timeouts: int = 0
+    """等待连接超时的次数"""
+    wait_total_ms: float = 0.0
+    """获取连接的累计耗时（毫秒），包括排队等待、新建连接与探活"""
+    wait_max_ms: float = 0.0
+    """单次获取连接的最大耗时（毫秒）"""
+    pings: int = 0
+    """检出时执行的探活次数"""
+    stale: int = 0
+    """探活失败而被替换的连接数"""
+
+    def to_json(self):
+        stats = asdict(self)
+        stats["wait_avg_ms"] = (
+            round(self.wait_total_ms / self.checkouts, 3) if self.checkouts else 0.0
+        )
+        stats["wait_total_ms"] = round(self.wait_total_ms, 3)
+        stats["wait_max_ms"] = round(self.wait_max_ms, 3)
+        return stats
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    记录获取连接耗时的连接池
+
+    统计数据在 `dispose()` 重建连接池后保留
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+        self.metrics_label = "db"
+        """Prometheus 指标中的连接池标签"""
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            DB_POOL_TIMEOUTS.labels(self.metrics_label).inc()
+            raise
+
+        elapsed = (time.perf_counter() - start) * 1000
+        self.stats.checkouts += 1
+        self.stats.wait_total_ms += elapsed
+        self.stats.wait_max_ms = max(self.stats.wait_max_ms, elapsed)
+        DB_POOL_WAIT.labels(self.metrics_label).observe(elapsed / 1000)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        pool.metrics_label = self.metrics_label
+        return pool
+
+
+def enable_idle_pre_ping(engine: AsyncEngine, idle_seconds: float):
+    """
+    仅对空闲超过 `idle_seconds` 的连接在检出时探活
+
+    相比 `pool_pre_ping=True` 每次检出都多一次往返，繁忙时连接几乎不会空闲，可以省去绝大多数探活；
+    探活失败时抛出 `DisconnectionError`，由连接池丢弃该连接并重新获取
+
+    :param engine: 数据库引擎
+    :param idle_seconds: 空闲阈值（秒）
+    """
+
+    @event.listens_for(engine.sync_engine, "checkin")
+    def _record_checkin(dbapi_connection, connection_record):
+        connection_record.info["checkin_at"] = time.monotonic()
+
+    @event.listens_for(engine.sync_engine, "checkout")
+    def _ping_idle(dbapi_connection, connection_record, connection_proxy):
+        checkin_at = connection_record.info.get("checkin_at")
+        if checkin_at is None or time.monotonic() - checkin_at < idle_seconds:
+            return
+
+        stats: Optional[PoolStats] = getattr(engine.pool, "stats", None)
+        if stats:
+            stats.pings += 1
+        try:
+            engine.dialect.do_ping(dbapi_connection)
+        except Exception as e:
+            if stats:
+                stats.stale += 1
+            raise exc.DisconnectionError() from e
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and (
+        parsed.database in (None, "", ":memory:")
+        or parsed.query.get("mode") == "memory"
+    )
+
+
+slow_query_logs: list[SlowQueryLog] = []
+"""各引擎的慢查询日志，关闭数据库前等待未完成的执行计划查询"""
+
+
+def create_db_engine(url: str) -> AsyncEngine:
+    """
+    创建数据库引擎（主库与只读副本共用同一套参数）
+
+    连接池参数与探活策略取自 `config.db_pool_*`；内存 SQLite 只能使用单连接的 `StaticPool`，不设置连接池大小
+    """
+    options: dict = {
+        "pool_recycle": config.db_pool_recycle,
+        "pool_pre_ping": config.db_pool_pre_ping == "always",
+    }
+    if not _is_memory_sqlite(url):
+        options.update(
+            poolclass=InstrumentedQueuePool,
+            pool_size=config.db_pool_size,
+            max_overflow=config.db_max_overflow,
+            pool_timeout=config.db_pool_timeout,
+        )
+
+    engine = create_async_engine(url, echo=False, **options)
+    if isinstance(engine.pool, InstrumentedQueuePool):
+        engine.pool.metrics_label = (
+            f"{engine.url.host}/{engine.url.database}"
+            if engine.url.host
+            else str(engine.url.database)
+        )
+    enable_sqlite_foreign_keys(engine)
+    instrument_engine(engine)
+    if config.tracing_enabled:
+        trace_engine(engine)
+    if config.db_slow_query_ms > 0:
+        slow_query_logs.append(
+            SlowQueryLog(
+                engine, config.db_slow_query_ms, explain=config.db_slow_query_explain
+            )
+        )
+    if config.db_pool_pre_ping == "idle":
+        enable_idle_pre_ping(engine, config.db_pool_ping_idle_seconds)
+    return engine
+
+
+def pool_status(engine: AsyncEngine) -> dict:
+    """
+    获取引擎连接池的实时状态
+
+    :param engine: 数据库引擎
+
+    :return: 连接池大小、已检出/空闲/溢出连接数，以及 `PoolStats` 累计统计
+    """
+    pool = engine.pool
+    status: dict = {
+        "url": engine.url.render_as_string(),
+        "pool": type(pool).__name__,
+    }
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    if isinstance(pool, InstrumentedQueuePool):
+        status.update(pool.stats.to_json())
+    return status
+
+
+async def warm_up_pool(engine: AsyncEngine, count: int) -> int:
+    """
+    并发建立 `count` 个连接后归还连接池，避免首批请求承担建连耗时
+
+    :param engine: 数据库引擎
+    :param count: 预热连接数，不超过连接池常驻连接数
+
+    :return: 成功建立的连接数
+    """
+    if isinstance(engine.pool, QueuePool):
+        count = min(count, engine.pool.size())
+    if count <= 0:
+        return 0
+
+    connections = [engine.connect() for _ in range(count)]
+    results = await asyncio.gather(
+        *(connection.start() for connection in connections), return_exceptions=True
+    )
+    for connection in connections:
+        if connection.sync_connection is not None:
+            await connection.close()
+
+    errors = [result for result in results if isinstance(result, BaseException)]
+    if errors:
+        logger.warning(
+            "连接池预热失败 %s 个连接 (%s): %s",
+            len(errors),
+            engine.url.render_as_string(),
+            errors[0],
+        )
+    return count - len(errors)
+
+
+class ReplicaRouter:
+    """
+    只读副本路由器
+
+    为只读会话挑选一个健康的副本；副本出错后在一段时间内不再参与路由，
+    用户写入后的短时间窗口内，该用户的读请求仍然路由到主库（读己之写）。
+    写入时间同时记录在本进程与 Redis 中，多个 worker 进程之间共享
+    """
+
+    def __init__(
+        self,
+        primary: AsyncEngine,
+        replicas: list[AsyncEngine],
+        strategy: str = "round_robin",
+        sticky_seconds: float = 5.0,
+        retry_seconds: float = 30.0,
+    ):
+        self.primary = primary
+        self.replicas = replicas
+        self.strategy = strategy
+        self.sticky_seconds = sticky_seconds
+        self.retry_seconds = retry_seconds
+
+        self._cycle = itertools.cycle(range(len(replicas))) if replicas else None
+        self._last_write: dict[str, float] = {}
+        self._unhealthy_until: dict[AsyncEngine, float] = {}
+        self._by_sync_engine = {replica.sync_engine: replica for replica in replicas}
+        self._publishing: set[asyncio.Task] = set()
+        self._sessionmaker = self.sessionmaker()
+
+        for replica in replicas:
+            event.listen(replica.sync_engine, "handle_error", self._on_replica_error)
+
+    def _on_replica_error(self, context):
+        if context.is_disconnect or isinstance(
+            context.sqlalchemy_exception, (exc.OperationalError, exc.InterfaceError)
+        ):
+            replica = self._by_sync_engine.get(context.engine)
+            if replica is not None:
+                self.mark_unhealthy(replica)
+
+    def mark_unhealthy(self, replica: AsyncEngine):
+        """
+        标记副本不可用，在 `retry_seconds` 内不再路由到该副本，已标记时不重复记录
+        """
+        if replica not in self.healthy_replicas():
+            return
+        logger.warning(
+            "只读副本 %s 不可用，%s 秒内回退到其他副本或主库",
+            replica.url.render_as_string(),
+            self.retry_seconds,
+        )
+        self._unhealthy_until[replica] = time.monotonic() + self.retry_seconds
+
+    def healthy_replicas(self) -> list[AsyncEngine]:
+        now = time.monotonic()
+        return [
+            replica
+            for replica in self.replicas
+            if self._unhealthy_until.get(replica, 0) <= now
+        ]
+
+    def mark_write(self, subject: Optional[str]):
+        """
+        记录用户的写入时间，并在后台写入 Redis
+        """
+        if not subject or not self.replicas:
+            return
+
+        now = time.monotonic()
+        self._last_write[subject] = now
+
+        # 惰性清理过期记录，避免字典无限增长
+        if len(self._last_write) > 10000:
+            expired_before = now - self.sticky_seconds
+            self._last_write = {
+                key: value
+                for key, value in self._last_write.items()
+                if value > expired_before
+            }
+
+        # 在会话提交的同步回调中调用，不能等待 Redis
+        try:
+            task = asyncio.get_running_loop().create_task(self.publish_write(subject))
+        except RuntimeError:  # 没有运行中的事件循环
+            return
+        self._publishing.add(task)
+        task.add_done_callback(self._publishing.discard)
+
+    async def publish_write(self, subject: str):
+        """
+        在 Redis 中记录用户的写入，`sticky_seconds` 后过期
+        """
+        try:
+            await get_shared_redis_client().set(
+                f"{READ_YOUR_WRITES_PREFIX}{subject}",
+                1,
+                px=max(1, int(self.sticky_seconds * 1000)),
+            )
+        except RedisError as e:
+            logger.warning("记录用户写入时间失败: %s", e)
+
+    async def is_sticky(self, subject: Optional[str]) -> bool:
+        """
+        用户是否处于写入后的读己之写窗口内，先查本进程的记录，再查其他进程写入 Redis 的记录
+        """
+        if not subject or not self.replicas:
+            return False
+        last_write = self._last_write.get(subject)
+        if (
+            last_write is not None
+            and time.monotonic() - last_write < self.sticky_seconds
+        ):
+            return True
+        try:
+            return bool(
+                await get_shared_redis_client().exists(
+                    f"{READ_YOUR_WRITES_PREFIX}{subject}"
+                )
+            )
+        except RedisError as e:
+            logger.warning("查询用户写入时间失败，读请求使用主库: %s", e)
+            return True
+
+    def choose(self) -> AsyncEngine:
+        """
+        为只读会话选择一个健康的副本，没有健康的副本时使用主库
+        """
+        healthy = self.healthy_replicas()
+        if not healthy:
+            return self.primary
+
+        if self.strategy == "least_loaded":
+            return min(healthy, key=lambda replica: replica.pool.checkedout())  # type: ignore
+
+        assert self._cycle is not None
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self._cycle)]
+            if replica in healthy:
+                return replica
+        return self.primary  # pragma: no cover
+
+    @asynccontextmanager
+    async def session(
+        self, subject: Optional[str] = None
+    ) -> AsyncIterator[AsyncSession]:
+        """
+        打开只读会话并立即建立连接
+
+        用户处于读己之写窗口内时使用主库；副本连接失败时标记该副本不可用，改用主库重试一次，
+        请求不会因副本故障而失败
+
+        :param subject: 当前请求的用户名
+        """
+        engine = self.primary if await self.is_sticky(subject) else self.choose()
+        session = self._sessionmaker(info={"engine": engine})
+        try:
+            await session.connection()
+        except (exc.OperationalError, exc.InterfaceError) as e:
+            await session.close()
+            if engine is self.primary:
+                raise
+            self.mark_unhealthy(engine)
+            logger.warning("只读副本连接失败，改用主库重试: %s", e.orig)
+            session = self._sessionmaker(info={"engine": self.primary})
+
+        async with session:
+            yield session
+
+    def sessionmaker(self) -> async_sessionmaker[AsyncSession]:
+        """
+        创建绑定到此路由器的只读会话工厂
+        """
+        return async_sessionmaker(
+            class_=AsyncSession,
+            sync_session_class=RoutingSession,
+            expire_on_commit=False,
+            info={"router": self},
+        )
+
+    async def dispose(self):
+        for replica in self.replicas:
+            await replica.dispose()
+
+
+class RoutingSession(Session):
+    """
+    只读路由会话
+
+    使用 `ReplicaRouter.session` 打开时已选定引擎，否则在首次执行语句时选择，并在整个会话生命周期内保持不变；
+    意外的写操作始终发往主库
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        router: ReplicaRouter = self.info["router"]
+        if self._flushing or isinstance(clause, (Insert, Update, Delete)):
+            return router.primary.sync_engine
+
+        if (engine := self.info.get("engine")) is None:
+            engine = self.info["engine"] = router.choose()
+        return engine.sync_engine
+
+
+class PrimarySession(Session):
+    """
+    主库会话，提交写入后记录当前用户的写入时间
+    """
+
+
+@event.listens_for(PrimarySession, "after_flush")
+def _record_flush(session, flush_context):
+    session.info["has_writes"] = True
+
+
+@event.listens_for(PrimarySession, "do_orm_execute")
+def _record_dml(orm_execute_state):
+    if (
+        orm_execute_state.is_insert
+        or orm_execute_state.is_update
+        or orm_execute_state.is_delete
+    ):
+        orm_execute_state.session.info["has_writes"] = True
+
+
+@event.listens_for(PrimarySession, "after_commit")
+def _record_commit(session):
+    if session.info.pop("has_writes", False):
+        replica_router.mark_write(request_subject.get())
+
+
+_engine = create_db_engine(config.db_url)
+async_session = async_sessionmaker(
+    _engine, sync_session_class=PrimarySession, expire_on_commit=False
+)
 async_session_maker = async_sessionmaker(
-    bind=_engine, class_=AsyncSession, expire_on_commit=False
+    bind=_engine,
+    class_=AsyncSession,
+    sync_session_class=PrimarySession,
+    expire_on_commit=False,
+)
+
+replica_router = ReplicaRouter(
+    _engine,
+    [create_db_engine(url) for url in config.db_replica_urls],
+    strategy=config.db_replica_strategy,
+    sticky_seconds=config.db_read_your_writes_seconds,
+    retry_seconds=config.db_replica_retry_seconds,
 )
 
 
 async def load_db():
     """
-    初始化表
+    检查数据库版本，落后时按 `config.db_auto_migrate` 自动迁移或拒绝启动
+
+    启动时只执行一次版本查询，表结构的创建与变更由 `app.migrations` 中的迁移脚本完成
+    """
+    version, head = await current_version(_engine), head_revision()
+    if version == head:
+        logger.info("数据库版本: %s", version)
+        return
+    if version > head:
+        logger.warning("数据库版本 %s 高于代码中的最新版本 %s", version, head)
+        return
+    if not config.db_auto_migrate:
+        raise RuntimeError(
+            f"数据库版本 {version} 落后于 {head}，请执行 python -m app.migrations upgrade"
+        )
+
+    logger.info("数据库版本 %s 落后于 %s，执行迁移...", version, head)
+    await upgrade(_engine)
+
+
+async def warm_up_db():
+    """
+    按 `config.db_pool_warmup` 预热主库与只读副本的连接池
+    """
+    if config.db_pool_warmup <= 0:
+        return
+
+    for engine in [_engine, *replica_router.replicas]:
+        warmed = await warm_up_pool(engine, config.db_pool_warmup)
+        logger.info("已预热 %s 个数据库连接: %s", warmed, engine.url.render_as_string())
+
+
+def get_pool_stats() -> dict:
+    """
+    获取主库与只读副本连接池的实时状态
     """
-    logger.info("初始化数据库表...")
-    async with _engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    return {
+        "primary": pool_status(_engine),
+        "replicas": [pool_status(replica) for replica in replica_router.replicas],
+    }
 
 
 async def close_db():
     """
     关闭数据库连接
     """
+    for slow_query_log in slow_query_logs:
+        await slow_query_log.drain()
+    await replica_router.dispose()
     await _engine.dispose()
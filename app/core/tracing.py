@@ -0,0 +1,142 @@
+"""
+分布式追踪（OpenTelemetry）
+
+请求的 span 从请求头（W3C `traceparent`）继承上游的追踪上下文，其下依次为鉴权依赖、仓库方法、SQL 语句与 Redis 命令的 span。
+没有上游采样决定的请求按 `tracing_sample_rate` 采样，未采样的请求只创建不记录的空 span。
+
+采样的 span 由后台线程批量导出，每行一条 JSON 写入 `logs/trace` 目录（与访问日志一样轮转）；
+测试中可以向 `tracer_provider` 添加内存导出器收集 span
+"""
+
+import functools
+import inspect
+from collections.abc import Sequence
+from typing import Optional
+
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    SpanExporter,
+    SpanExportResult,
+)
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import config
+from app.core.logger import trace_logger
+
+MAX_STATEMENT_LENGTH = 2000
+
+
+class LogSpanExporter(SpanExporter):
+    """
+    把 span 以单行 JSON 写入追踪日志
+    """
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        for span in spans:
+            trace_logger.info(span.to_json(indent=None))
+        return SpanExportResult.SUCCESS
+
+
+def init_tracing() -> Optional[TracerProvider]:
+    """
+    初始化全局 TracerProvider，未启用追踪时返回 None，所有 span 均为空操作
+    """
+    if not config.tracing_enabled:
+        return None
+
+    provider = TracerProvider(
+        resource=Resource.create(
+            {"service.name": config.title, "service.version": config.version}
+        ),
+        sampler=ParentBased(TraceIdRatioBased(config.tracing_sample_rate)),
+    )
+    provider.add_span_processor(BatchSpanProcessor(LogSpanExporter()))
+    trace.set_tracer_provider(provider)
+    return provider
+
+
+tracer_provider = init_tracing()
+tracer = trace.get_tracer("app")
+
+
+def shutdown_tracing():
+    """
+    导出剩余的 span
+    """
+    if tracer_provider is not None:
+        tracer_provider.shutdown()
+
+
+def traced(name: str):
+    """
+    为异步函数创建 span
+
+    :param name: span 名称
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with tracer.start_as_current_span(name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def traced_methods(cls):
+    """
+    为类的公开异步方法创建 span，span 名称为 `类名.方法名`
+    """
+    for name, attr in list(vars(cls).items()):
+        if not name.startswith("_") and inspect.iscoroutinefunction(attr):
+            setattr(cls, name, traced(f"{cls.__name__}.{name}")(attr))
+    return cls
+
+
+def trace_engine(engine: AsyncEngine):
+    """
+    为引擎执行的每条 SQL 语句创建 span
+    """
+    database = engine.url.database
+    system = engine.dialect.name
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        operation = statement.split(None, 1)[0].upper() if statement else "SQL"
+        context._span = tracer.start_span(
+            f"{operation} {database}",
+            kind=SpanKind.CLIENT,
+            attributes={
+                "db.system": system,
+                "db.namespace": str(database),
+                "db.operation.name": operation,
+                "db.query.text": statement[:MAX_STATEMENT_LENGTH],
+            },
+        )
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        if (span := getattr(context, "_span", None)) is not None:
+            span.end()
+            context._span = None
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def _handle_error(exception_context):
+        context = exception_context.execution_context
+        if (span := getattr(context, "_span", None)) is not None:
+            span.record_exception(exception_context.original_exception)
+            span.set_status(Status(StatusCode.ERROR))
+            span.end()
+            context._span = None
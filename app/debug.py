@@ -31,4 +31,4 @@ if __name__ == "__main__":
 
     user = asyncio.run(create_a_debug_admin())
     logger.info("成功创建了一个测试账号✨")
-    logger.info(f"账号: {user.username}, 密码: {ADMIN_PWD}")
+    logger.info("账号: %s, 密码: %s", user.username, ADMIN_PWD)
@@ -11,21 +11,20 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import config
 from app.core.logger import logger
 from app.core.redis import get_redis_client
+from app.core.request_context import current_timings, measure_auth
+from app.core.sql import request_subject
+from app.core.tracing import traced, tracer
 from app.models.user import User, UserRole
 from app.repositories.user import UserRepository
 from app.schemas.auth import Payload
-from app.services.token_blacklist import is_token_blacklisted
+from app.services.token_blacklist import is_token_revoked
 
-from .sql import get_db
+from .sql import get_db, get_read_db
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="./login")
 
 
-async def get_current_user(
-    db: Annotated[AsyncSession, Depends(get_db)],
-    token: Annotated[str, Depends(oauth2_scheme)],
-    redis: Annotated[Redis, Depends(get_redis_client)],
-) -> User:
+async def _authenticate(db: AsyncSession, token: str, redis: Redis) -> User:
     logger.debug("尝试鉴权已登录用户...")
 
     credentials_exception = HTTPException(
@@ -35,14 +34,15 @@ async def get_current_user(
     )
 
     try:
-        payload_dict = jwt.decode(
-            token, config.secret_key, algorithms=[config.algorithm]
-        )
+        with tracer.start_as_current_span("jwt.decode"):
+            payload_dict = jwt.decode(
+                token, config.secret_key, algorithms=[config.algorithm]
+            )
         payload = Payload(**payload_dict)
         if (
             (payload.sub is None or payload.exp is None)
             or payload.exp < datetime.timestamp(datetime.now())
-            or await is_token_blacklisted(redis, payload.jti)
+            or await is_token_revoked(redis, payload.jti, payload.sub, payload.iat)
         ):
             logger.warning("用户鉴权失败，用户可能没有设置密钥体或密钥过期")
             raise credentials_exception
@@ -55,6 +55,7 @@ async def get_current_user(
         logger.warning("用户鉴权失败，用户使用了无效的 jwt")
         raise credentials_exception
 
+    request_subject.set(payload.sub)
     repo = UserRepository(db)
     user = await repo.get_by_name(payload.sub)
 
@@ -62,15 +63,39 @@ async def get_current_user(
         logger.warning("用户鉴权失败，尝试登录的用户不存在或已被禁用")
         raise credentials_exception
 
-    logger.debug(f"鉴权成功: 登录用户 {user.name}")
+    logger.debug("鉴权成功: 登录用户 %s", user.name)
+    return user
+
+
+@traced("get_current_user")
+async def get_current_user(
+    db: Annotated[AsyncSession, Depends(get_db)],
+    token: Annotated[str, Depends(oauth2_scheme)],
+    redis: Annotated[Redis, Depends(get_redis_client)],
+) -> User:
+    with measure_auth():
+        user = await _authenticate(db, token, redis)
+
+    if (timings := current_timings()) is not None:
+        timings.role = user.role.value
     return user
 
 
 def check_and_get_current_role(
-    role: UserRole,
+    role: UserRole, read_only: bool = False
 ) -> Callable[..., Coroutine[None, None, User]]:
+    """
+    校验当前用户角色
+
+    :param role: 要求的用户角色
+    :param read_only: 是否为只读接口。只读接口通过 `get_read_db` 查询用户，
+                      接口内也应使用同一个 `get_read_db` 会话
+    """
+    db_dependency = get_read_db if read_only else get_db
+
+    @traced(f"check_and_get_current_role({role.value})")
     async def wrapper(
-        db: Annotated[AsyncSession, Depends(get_db)],
+        db: Annotated[AsyncSession, Depends(db_dependency)],
         token: Annotated[str, Depends(oauth2_scheme)],
         redis: Annotated[Redis, Depends(get_redis_client)],
     ) -> User:
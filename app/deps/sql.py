@@ -1,10 +1,38 @@
 from collections.abc import AsyncGenerator
+from typing import Optional
 
+import jwt
+from fastapi import Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.sql import async_session
+from app.core.sql import async_session, replica_router
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with async_session() as session:
         yield session
+
+
+def _token_subject(request: Request) -> Optional[str]:
+    """
+    读取请求令牌中的用户名，只用于选择读库，不校验签名（鉴权由鉴权依赖完成）
+    """
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        payload = jwt.decode(token, options={"verify_signature": False})
+    except jwt.InvalidTokenError:
+        return None
+    subject = payload.get("sub")
+    return subject if isinstance(subject, str) else None
+
+
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    只读会话，按配置路由到只读副本
+
+    鉴权依赖本身也使用该会话，会话打开时还不知道已验证的用户，按令牌中的用户名判断读己之写
+    """
+    async with replica_router.session(_token_subject(request)) as session:
+        yield session
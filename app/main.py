@@ -1,12 +1,31 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI
 
-from app.api import auth, student, teacher
-from app.api.admin import course, department, major, user
+from app.api import auth, health, metrics, student, teacher
+from app.api.admin import course, department, major, system, user
+from app.core.cache import run_cache_eviction_listener
 from app.core.config import config
 from app.core.logger import logger
-from app.core.sql import close_db, load_db
+from app.core.metrics import mark_process_dead
+from app.core.profiler import run_profiler_listener
+from app.core.redis import close_shared_redis_client
+from app.core.sql import close_db, load_db, warm_up_db
+from app.core.tracing import shutdown_tracing
+from app.middleware.access_log import AccessLogMiddleware
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.profiler import ProfilerMiddleware
+from app.middleware.query_stats import QueryStatsMiddleware
+from app.middleware.schedule_cache import ScheduleCacheMiddleware
+from app.middleware.tracing import TracingMiddleware
+from app.services.health import (
+    Phase,
+    health_state,
+    install_drain_handler,
+    run_loop_lag_monitor,
+)
+from app.services.seat_reconciler import run_seat_reconciler
 
 logger.info("初始化 Server...")
 
@@ -15,16 +34,70 @@ logger.info("初始化 Server...")
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await load_db()
+    await warm_up_db()
+
+    reconciler = None
+    if config.seat_reconcile_interval > 0:
+        reconciler = asyncio.create_task(
+            run_seat_reconciler(config.seat_reconcile_interval)
+        )
+
+    eviction_listener = None
+    if config.cache_enabled:
+        eviction_listener = asyncio.create_task(run_cache_eviction_listener())
+
+    profiler_listener = None
+    if config.profiler_interval_ms > 0:
+        profiler_listener = asyncio.create_task(run_profiler_listener())
+
+    loop_lag_monitor = asyncio.create_task(run_loop_lag_monitor())
+    restore_sigterm = None
+    if config.health_drain_seconds > 0:
+        restore_sigterm = install_drain_handler(config.health_drain_seconds)
+    health_state.mark_ready()
+
     yield
+    if restore_sigterm:
+        restore_sigterm()
+    if health_state.phase != Phase.draining:
+        health_state.mark_draining()
     logger.info("正在退出...")
+    for task in (reconciler, eviction_listener, profiler_listener, loop_lag_monitor):
+        if task:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+    await close_shared_redis_client()
     await close_db()  # type:ignore
+    mark_process_dead()
+    shutdown_tracing()
     logger.info("已安全退出")
 
 
 app = FastAPI(title=config.title, version=config.version, lifespan=lifespan)
 
+if config.schedule_cache_ttl > 0:
+    app.add_middleware(ScheduleCacheMiddleware)
+if config.db_query_stats:
+    app.add_middleware(
+        QueryStatsMiddleware, n_plus_one_threshold=config.db_n_plus_one_threshold
+    )
+if config.profiler_interval_ms > 0:
+    app.add_middleware(ProfilerMiddleware)
+if config.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+if config.tracing_enabled:
+    app.add_middleware(TracingMiddleware)
+if config.access_log:
+    app.add_middleware(
+        AccessLogMiddleware,
+        sample_rate=config.access_log_sample_rate,
+        slow_ms=config.access_log_slow_ms,
+    )
+
 
 # 注册 API 路由
+app.include_router(health.router)
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(student.router, prefix="/api/student", tags=["student"])
 app.include_router(teacher.router, prefix="/api/course", tags=["course"])
@@ -34,11 +107,14 @@ app.include_router(
 )
 app.include_router(major.router, prefix="/api/admin/major", tags=["admin", "major"])
 app.include_router(course.router, prefix="/api/admin/course", tags=["admin", "course"])
+app.include_router(system.router, prefix="/api/admin/system", tags=["admin", "system"])
+if config.metrics_enabled:
+    app.include_router(metrics.router)
 
 
 if __name__ == "__main__":
     import uvicorn
 
-    logger.info(f"服务器地址: http://{config.host}:{config.port}")
-    logger.info(f"FastAPI 文档地址: http://{config.host}:{config.port}/docs")
+    logger.info("服务器地址: http://%s:%s", config.host, config.port)
+    logger.info("FastAPI 文档地址: http://%s:%s/docs", config.host, config.port)
     uvicorn.run(app, host=config.host, port=config.port)
@@ -0,0 +1,89 @@
+import json
+import random
+import re
+import time
+from uuid import uuid4
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.logger import access_logger
+from app.core.query_stats import QueryStats, collect_queries
+from app.core.request_context import RequestTimings, track_request
+
+_VALID_REQUEST_ID = re.compile(r"^[\w.-]{1,64}$")
+
+
+class AccessLogMiddleware:
+    """
+    结构化访问日志
+
+    为每个请求分配请求 ID（沿用合法的 `X-Request-ID` 请求头）并在响应头中返回，应用日志中同样带有请求 ID。
+    请求结束后写入一行 JSON: 路由、用户角色、状态码、总耗时以及鉴权、数据库与 Redis 的耗时。
+    成功且不慢的请求按 `sample_rate` 采样，记录中的 `sample_rate` 可用于还原总量
+
+    :param sample_rate: 成功且不慢的请求的采样比例
+    :param slow_ms: 耗时超过该值（毫秒）的请求总是记录
+    """
+
+    def __init__(self, app: ASGIApp, sample_rate: float = 1.0, slow_ms: float = 1000.0):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        rid = Headers(scope=scope).get("x-request-id", "")
+        if not _VALID_REQUEST_ID.match(rid):
+            rid = uuid4().hex
+
+        status = 500
+        start = time.perf_counter()
+        with track_request(rid) as timings, collect_queries() as db_stats:
+
+            async def send_with_request_id(message: Message):
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    MutableHeaders(scope=message)["X-Request-ID"] = rid
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_request_id)
+            finally:
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                self.report(scope, rid, status, elapsed_ms, timings, db_stats)
+
+    def report(
+        self,
+        scope: Scope,
+        rid: str,
+        status: int,
+        elapsed_ms: float,
+        timings: RequestTimings,
+        db_stats: QueryStats,
+    ):
+        sampled = status < 400 and elapsed_ms < self.slow_ms
+        if sampled and random.random() >= self.sample_rate:
+            return
+
+        route = scope.get("route")
+        record = {
+            "request_id": rid,
+            "method": scope["method"],
+            "route": getattr(route, "path", None),
+            "path": scope["path"],
+            "status": status,
+            "role": timings.role,
+            "duration_ms": round(elapsed_ms, 3),
+            "auth_ms": round(timings.auth_ms, 3),
+            "db_ms": round(db_stats.total_ms, 3),
+            "db_queries": db_stats.count,
+            "redis_ms": round(timings.redis_ms, 3),
+            "redis_commands": timings.redis_commands,
+            "sample_rate": self.sample_rate if sampled else 1.0,
+        }
+        access_logger.info(json.dumps(record, ensure_ascii=False))
@@ -0,0 +1,41 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import REQUEST_LATENCY, REQUESTS_IN_FLIGHT
+
+
+class MetricsMiddleware:
+    """
+    统计请求耗时与正在处理的请求数
+
+    按路由模板（而非实际路径）统计，避免路径参数导致标签数量无限增长；未匹配路由的请求记为 `unmatched`
+    """
+
+    def __init__(self, app: ASGIApp, metrics_path: str = "/metrics"):
+        self.app = app
+        self.metrics_path = metrics_path
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] == self.metrics_path:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_LATENCY.labels(scope["method"], route, str(status)).observe(
+                time.perf_counter() - start
+            )
@@ -0,0 +1,31 @@
+from collections import Counter
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.profiler import request_profiler, save_samples
+
+
+class ProfilerMiddleware:
+    """
+    对管理员开启采样时选中的请求进行采样分析
+
+    路由在请求处理中才能确定，开启时按比例选中的请求都会采样，结束后只保存符合路由的结果。
+    未开启时只检查一次开关
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not request_profiler.should_sample():
+            await self.app(scope, receive, send)
+            return
+
+        samples: Counter[str] = Counter()
+        try:
+            with request_profiler.track(samples):
+                await self.app(scope, receive, send)
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            if samples and request_profiler.matches(route):
+                await save_samples(f"{scope['method']} {route}", samples)
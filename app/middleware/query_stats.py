@@ -0,0 +1,62 @@
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.logger import logger
+from app.core.query_stats import QueryStats, collect_queries
+
+
+class QueryStatsMiddleware:
+    """
+    统计每个请求执行的 SQL
+
+    在响应头中写入语句数 `X-DB-Queries`、数据库累计耗时 `X-DB-Time` 与最慢语句耗时 `X-DB-Slowest`（毫秒），
+    同一语句执行次数超过阈值时写入 `X-DB-Repeated` 并记录疑似 N+1 查询的告警。
+    使用纯 ASGI 中间件，请求处理与统计在同一个上下文中
+    """
+
+    def __init__(self, app: ASGIApp, n_plus_one_threshold: int = 10):
+        self.app = app
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with collect_queries() as stats:
+
+            async def send_with_stats(message: Message):
+                if message["type"] == "http.response.start":
+                    headers = MutableHeaders(scope=message)
+                    headers["X-DB-Queries"] = str(stats.count)
+                    headers["X-DB-Time"] = f"{stats.total_ms:.3f}"
+                    headers["X-DB-Slowest"] = f"{stats.slowest_ms:.3f}"
+                    repeated = stats.repeated(self.n_plus_one_threshold)
+                    if repeated:
+                        headers["X-DB-Repeated"] = str(repeated[0][1])
+                await send(message)
+
+            await self.app(scope, receive, send_with_stats)
+
+        self.report(scope, stats)
+
+    def report(self, scope: Scope, stats: QueryStats):
+        if not stats.count:
+            return
+
+        request = f"{scope['method']} {scope['path']}"
+        logger.debug(
+            "%s: 执行 %s 条 SQL，共 %.1f ms，最慢 %.1f ms: %s",
+            request,
+            stats.count,
+            stats.total_ms,
+            stats.slowest_ms,
+            stats.slowest_statement,
+        )
+        for statement, times in stats.repeated(self.n_plus_one_threshold):
+            logger.warning(
+                "疑似 N+1 查询: %s 中同一语句执行了 %s 次: %s",
+                request,
+                times,
+                statement,
+            )
@@ -0,0 +1,63 @@
+from typing import Optional
+
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.logger import logger
+from app.core.redis import create_redis_client
+from app.services.schedule_cache import (
+    StaleSchedules,
+    collect_stale_schedules,
+    invalidate_schedules,
+)
+
+
+class ScheduleCacheMiddleware:
+    """
+    在响应发出前删除本次请求已提交的修改所影响的课程表缓存
+
+    仓库只在会话上登记失效范围，事务提交后汇总到请求上下文中，
+    因此客户端收到写请求的响应时，之后的课程表读取不会再命中旧缓存
+    """
+
+    def __init__(self, app: ASGIApp, redis_client: Optional[redis.Redis] = None):
+        self.app = app
+        self.redis_client = redis_client
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with collect_stale_schedules() as stale:
+
+            async def send_after_invalidation(message: Message):
+                if message["type"] == "http.response.start":
+                    await self.invalidate(stale)
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_after_invalidation)
+            finally:
+                # 未发出响应就抛出异常时，已提交的修改同样需要失效
+                await self.invalidate(stale)
+
+    async def invalidate(self, stale: StaleSchedules):
+        if not stale:
+            return
+
+        pending = StaleSchedules()
+        pending.update(stale)
+        stale.clear()
+        # 未指定客户端时与 `get_redis_client` 一样按请求创建，只有写请求才会走到这里
+        client = self.redis_client or create_redis_client()
+        try:
+            count = await invalidate_schedules(client, pending)
+        except RedisError as e:
+            logger.warning("课程表缓存失效失败，将在过期后自动刷新: %s", e)
+            return
+        finally:
+            if client is not self.redis_client:
+                await client.aclose()
+        logger.debug("课程表缓存失效: %s, 共删除 %s 条", pending, count)
@@ -0,0 +1,15 @@
+from app.migrations.runner import (
+    current_version,
+    downgrade,
+    head_revision,
+    load_migrations,
+    upgrade,
+)
+
+__all__ = [
+    "current_version",
+    "downgrade",
+    "head_revision",
+    "load_migrations",
+    "upgrade",
+]
@@ -0,0 +1,58 @@
+"""
+数据库迁移命令行
+
+用法:
+    python -m app.migrations current            查看当前版本
+    python -m app.migrations history            查看所有迁移
+    python -m app.migrations upgrade [版本]     升级到指定版本（默认最新）
+    python -m app.migrations downgrade <版本>   回退到指定版本（0 表示删除所有表）
+"""
+
+import argparse
+import asyncio
+
+from app.core.logger import logger
+from app.core.sql import _engine as engine
+from app.core.sql import close_db
+from app.migrations import (
+    current_version,
+    downgrade,
+    head_revision,
+    load_migrations,
+    upgrade,
+)
+
+
+async def main(args: argparse.Namespace):
+    try:
+        if args.command == "current":
+            version = await current_version(engine)
+            logger.info("数据库当前版本: %s，最新版本: %s", version, head_revision())
+        elif args.command == "history":
+            version = await current_version(engine)
+            for migration in load_migrations():
+                mark = "*" if migration.revision == version else " "
+                logger.info(
+                    "%s %04d %s", mark, migration.revision, migration.description
+                )
+        elif args.command == "upgrade":
+            version = await upgrade(engine, args.revision)
+            logger.info("数据库已升级到版本 %s", version)
+        else:
+            version = await downgrade(engine, args.revision)
+            logger.info("数据库已回退到版本 %s", version)
+    finally:
+        await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m app.migrations")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("current", help="查看当前版本")
+    commands.add_parser("history", help="查看所有迁移")
+    upgrade_parser = commands.add_parser("upgrade", help="升级到指定版本（默认最新）")
+    upgrade_parser.add_argument("revision", type=int, nargs="?")
+    downgrade_parser = commands.add_parser("downgrade", help="回退到指定版本")
+    downgrade_parser.add_argument("revision", type=int)
+
+    asyncio.run(main(parser.parse_args()))
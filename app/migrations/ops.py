@@ -0,0 +1,140 @@
+"""
+迁移脚本使用的 DDL 辅助函数，屏蔽 MySQL 与 SQLite 的差异
+"""
+
+from typing import Sequence
+
+from sqlalchemy import Connection, Table, inspect
+from sqlalchemy.schema import AddConstraint, CreateColumn, CreateTable
+
+
+def _quote(conn: Connection, name: str) -> str:
+    return conn.dialect.identifier_preparer.quote(name)
+
+
+def has_index(conn: Connection, table: str, name: str) -> bool:
+    return name in {index["name"] for index in inspect(conn).get_indexes(table)}
+
+
+def create_index(
+    conn: Connection,
+    name: str,
+    table: str,
+    columns: Sequence[str],
+    unique: bool = False,
+):
+    """
+    创建索引，已存在时跳过
+
+    MySQL 上使用 `ALGORITHM=INPLACE, LOCK=NONE` 在线建索引，建索引期间不阻塞读写
+
+    :param name: 索引名
+    :param table: 表名
+    :param columns: 索引列
+    :param unique: 是否唯一索引
+    """
+    if has_index(conn, table, name):
+        return
+
+    sql = (
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX {_quote(conn, name)} "
+        f"ON {_quote(conn, table)} ({', '.join(_quote(conn, c) for c in columns)})"
+    )
+    if conn.dialect.name == "mysql":
+        sql += " ALGORITHM=INPLACE LOCK=NONE"
+    conn.exec_driver_sql(sql)
+
+
+def drop_index(conn: Connection, name: str, table: str):
+    """
+    删除索引，不存在时跳过
+    """
+    if not has_index(conn, table, name):
+        return
+
+    if conn.dialect.name == "mysql":
+        conn.exec_driver_sql(
+            f"DROP INDEX {_quote(conn, name)} ON {_quote(conn, table)}"
+        )
+    else:
+        conn.exec_driver_sql(f"DROP INDEX {_quote(conn, name)}")
+
+
+def rebuild_foreign_keys(conn: Connection, table: Table):
+    """
+    按 `table` 的定义重建表的外键约束以及外键列的可空性
+
+    - MySQL: 先删除现有外键（约束名由数据库自动生成，通过 Inspector 读取），再修改列定义并添加新外键
+    - SQLite: 不支持修改约束，按新定义建表、复制数据后替换旧表并恢复原有索引
+
+    :param table: 目标表定义，引用的表需在同一个 MetaData 中
+    """
+    if conn.dialect.name == "sqlite":
+        _rebuild_sqlite_table(conn, table)
+        return
+
+    name = _quote(conn, table.name)
+    for foreign_key in inspect(conn).get_foreign_keys(table.name):
+        if foreign_key["name"]:
+            conn.exec_driver_sql(
+                f"ALTER TABLE {name} DROP FOREIGN KEY {_quote(conn, foreign_key['name'])}"
+            )
+
+    columns = [
+        str(CreateColumn(column).compile(dialect=conn.dialect))
+        for column in table.columns
+        if column.foreign_keys
+    ]
+    conn.exec_driver_sql(
+        f"ALTER TABLE {name} " + ", ".join(f"MODIFY COLUMN {c}" for c in columns)
+    )
+    for constraint in table.foreign_key_constraints:
+        conn.execute(AddConstraint(constraint))
+
+
+def _rebuild_sqlite_table(conn: Connection, table: Table):
+    """
+    SQLite 官方推荐的重建表流程，调用方需关闭外键约束
+    """
+    inspector = inspect(conn)
+    existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+    existing_indexes = inspector.get_indexes(table.name)
+
+    temp_name = f"_{table.name}_new"
+    temp = table.to_metadata(table.metadata, name=temp_name)
+    try:
+        conn.execute(CreateTable(temp))
+    finally:
+        table.metadata.remove(temp)
+
+    columns = ", ".join(
+        _quote(conn, column.name)
+        for column in table.columns
+        if column.name in existing_columns
+    )
+    conn.exec_driver_sql(
+        f"INSERT INTO {_quote(conn, temp_name)} ({columns}) "
+        f"SELECT {columns} FROM {_quote(conn, table.name)}"
+    )
+    conn.exec_driver_sql(f"DROP TABLE {_quote(conn, table.name)}")
+    conn.exec_driver_sql(
+        f"ALTER TABLE {_quote(conn, temp_name)} RENAME TO {_quote(conn, table.name)}"
+    )
+
+    # 删除旧表时索引一并删除，按原样恢复，再补上新定义中新增的索引
+    for index in existing_indexes:
+        create_index(
+            conn,
+            index["name"],  # type: ignore
+            table.name,
+            index["column_names"],  # type: ignore
+            unique=bool(index["unique"]),
+        )
+    for new_index in table.indexes:
+        create_index(
+            conn,
+            new_index.name,  # type: ignore
+            table.name,
+            [column.name for column in new_index.columns],
+            unique=bool(new_index.unique),
+        )
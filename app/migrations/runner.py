@@ -0,0 +1,220 @@
+import importlib
+import pkgutil
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import cache
+from typing import Callable, Optional
+
+from sqlalchemy import Column, Connection, Integer, MetaData, Table, exc, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.logger import logger
+from app.migrations import versions
+
+VERSION_TABLE = "schema_version"
+"""记录当前数据库版本的表，只有一行"""
+
+MYSQL_LOCK_NAME = "schema_migration"
+MYSQL_LOCK_TIMEOUT = 300
+"""等待其他实例完成迁移的最长时间（秒）"""
+
+_version_metadata = MetaData()
+schema_version = Table(
+    VERSION_TABLE,
+    _version_metadata,
+    Column("version", Integer, nullable=False, comment="数据库版本"),
+)
+
+
+@dataclass
+class Migration:
+    revision: int
+    """版本号，从 1 开始连续递增"""
+    description: str
+    """迁移说明，取自脚本文档字符串的第一行"""
+    upgrade: Callable[[Connection], None]
+    downgrade: Callable[[Connection], None]
+
+
+@cache
+def load_migrations() -> list[Migration]:
+    """
+    加载 `app/migrations/versions` 下的所有迁移脚本
+
+    脚本按文件名排序，每个脚本需定义 `revision`、`upgrade(conn)` 与 `downgrade(conn)`
+
+    :raise RuntimeError: 版本号不连续时抛出此异常
+    """
+    migrations = []
+    for module_info in sorted(
+        pkgutil.iter_modules(versions.__path__), key=lambda m: m.name
+    ):
+        module = importlib.import_module(f"{versions.__name__}.{module_info.name}")
+        migrations.append(
+            Migration(
+                revision=module.revision,
+                description=(module.__doc__ or module_info.name)
+                .strip()
+                .splitlines()[0],
+                upgrade=module.upgrade,
+                downgrade=module.downgrade,
+            )
+        )
+
+    for expected, migration in enumerate(migrations, start=1):
+        if migration.revision != expected:
+            raise RuntimeError(
+                f"迁移脚本版本号不连续: 期望 {expected}，实际为 {migration.revision}"
+            )
+    return migrations
+
+
+def head_revision() -> int:
+    """
+    最新的数据库版本
+    """
+    return len(load_migrations())
+
+
+def _get_version(conn: Connection) -> int:
+    try:
+        version = conn.execute(select(schema_version.c.version)).scalar()
+    except (exc.OperationalError, exc.ProgrammingError):
+        # 版本表不存在: 全新数据库或尚未纳入版本管理
+        conn.rollback()
+        return 0
+    conn.commit()
+    return version or 0
+
+
+def _set_version(conn: Connection, version: int):
+    schema_version.create(conn, checkfirst=True)
+    conn.execute(schema_version.delete())
+    conn.execute(schema_version.insert().values(version=version))
+
+
+@contextmanager
+def _migration_lock(conn: Connection):
+    """
+    多实例同时启动时，MySQL 上通过 GET_LOCK 保证只有一个实例执行迁移
+    """
+    if conn.dialect.name != "mysql":
+        yield
+        return
+
+    acquired = conn.execute(
+        text("SELECT GET_LOCK(:name, :timeout)"),
+        {"name": MYSQL_LOCK_NAME, "timeout": MYSQL_LOCK_TIMEOUT},
+    ).scalar()
+    if acquired != 1:
+        raise RuntimeError("等待数据库迁移锁超时")
+    try:
+        yield
+    finally:
+        conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": MYSQL_LOCK_NAME})
+
+
+def _apply(conn: Connection, step: Callable[[Connection], None], version: int):
+    """
+    在一个事务中执行单个迁移步骤并写入新版本号
+
+    SQLite 重建表时需要关闭外键约束，完成后通过 foreign_key_check 校验数据
+    （MySQL 的 DDL 会隐式提交，失败时只能回滚到上一个已完成的步骤）
+    """
+    sqlite = conn.dialect.name == "sqlite"
+    foreign_keys = False
+    if sqlite:
+        foreign_keys = bool(conn.exec_driver_sql("PRAGMA foreign_keys").scalar())
+        conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+
+    try:
+        step(conn)
+        if sqlite and conn.exec_driver_sql("PRAGMA foreign_key_check").first():
+            raise RuntimeError(f"迁移到版本 {version} 后存在违反外键约束的数据")
+        _set_version(conn, version)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        if foreign_keys:
+            conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+            conn.commit()
+
+
+def _migrate(conn: Connection, target: int, allow_downgrade: bool) -> int:
+    migrations = load_migrations()
+    with _migration_lock(conn):
+        # 加锁后重新读取版本，其他实例可能已经完成迁移
+        current = _get_version(conn)
+        if current > len(migrations):
+            raise RuntimeError(
+                f"数据库版本 {current} 高于代码中的最新版本 {len(migrations)}"
+            )
+
+        if target < current and not allow_downgrade:
+            raise ValueError(
+                f"数据库当前版本 {current} 高于目标版本 {target}，请使用 downgrade"
+            )
+        if target > current and allow_downgrade:
+            raise ValueError(
+                f"数据库当前版本 {current} 低于目标版本 {target}，请使用 upgrade"
+            )
+
+        if target >= current:
+            for migration in migrations[current:target]:
+                logger.info(
+                    "数据库升级到版本 %s: %s", migration.revision, migration.description
+                )
+                _apply(conn, migration.upgrade, migration.revision)
+        else:
+            for migration in reversed(migrations[target:current]):
+                logger.info(
+                    "数据库回退版本 %s: %s", migration.revision, migration.description
+                )
+                _apply(conn, migration.downgrade, migration.revision - 1)
+
+    return target
+
+
+async def current_version(engine: AsyncEngine) -> int:
+    """
+    获取数据库当前版本（单条查询）
+
+    :return: 版本号，未纳入版本管理的数据库为 0
+    """
+    async with engine.connect() as conn:
+        return await conn.run_sync(_get_version)
+
+
+async def upgrade(engine: AsyncEngine, target: Optional[int] = None) -> int:
+    """
+    将数据库升级到指定版本
+
+    :param engine: 数据库引擎
+    :param target: 目标版本，默认为最新版本
+
+    :return: 迁移后的版本
+    """
+    return await _run(engine, head_revision() if target is None else target, False)
+
+
+async def downgrade(engine: AsyncEngine, target: int) -> int:
+    """
+    将数据库回退到指定版本，版本 0 会删除所有表
+
+    :param engine: 数据库引擎
+    :param target: 目标版本
+
+    :return: 迁移后的版本
+    """
+    return await _run(engine, target, True)
+
+
+async def _run(engine: AsyncEngine, target: int, allow_downgrade: bool) -> int:
+    head = head_revision()
+    if not 0 <= target <= head:
+        raise ValueError(f"目标版本 {target} 不存在，最新版本为 {head}")
+
+    async with engine.connect() as conn:
+        return await conn.run_sync(_migrate, target, allow_downgrade)
@@ -0,0 +1,212 @@
+"""
+初始表结构
+
+与 `create_all` 创建的原始表结构一致；已有数据库中存在的表会被跳过，从而纳入版本管理
+"""
+
+from sqlalchemy import (
+    JSON,
+    Boolean,
+    Column,
+    Connection,
+    DateTime,
+    Enum,
+    ForeignKey,
+    Integer,
+    MetaData,
+    Numeric,
+    String,
+    Table,
+    func,
+)
+
+revision = 1
+
+metadata = MetaData()
+
+
+def _timestamps() -> list[Column]:
+    return [
+        Column(
+            "create_time",
+            DateTime,
+            nullable=False,
+            server_default=func.now(),
+            comment="创建时间",
+        ),
+        Column(
+            "update_time",
+            DateTime,
+            nullable=False,
+            server_default=func.now(),
+            comment="更新时间",
+        ),
+    ]
+
+
+department = Table(
+    "department",
+    metadata,
+    Column(
+        "id",
+        Integer,
+        primary_key=True,
+        index=True,
+        autoincrement=True,
+        comment="主键ID",
+    ),
+    Column("dept_no", String(10), unique=True, nullable=False, comment="院系编号"),
+    Column("dept_name", String(50), nullable=False, comment="院系名称"),
+    *_timestamps(),
+)
+
+major = Table(
+    "major",
+    metadata,
+    Column(
+        "id",
+        Integer,
+        primary_key=True,
+        index=True,
+        autoincrement=True,
+        comment="主键ID",
+    ),
+    Column("major_no", String(10), unique=True, nullable=False, comment="专业编号"),
+    Column("major_name", String(25), nullable=False, comment="专业名称"),
+    Column(
+        "dept_no",
+        String(10),
+        ForeignKey("department.dept_no"),
+        nullable=False,
+        comment="院系编号",
+    ),
+    *_timestamps(),
+)
+
+user = Table(
+    "user",
+    metadata,
+    Column(
+        "id",
+        Integer,
+        primary_key=True,
+        index=True,
+        autoincrement=True,
+        comment="主键ID",
+    ),
+    Column("username", String(12), unique=True, nullable=False, comment="用户ID"),
+    Column("password", String(100), nullable=False, comment="密码"),
+    Column(
+        "role",
+        Enum("student", "teacher", "admin", name="userrole"),
+        nullable=False,
+        comment="角色(ADMIN/TEACHER/STUDENT)",
+    ),
+    Column("status", Boolean, nullable=False, comment="状态(正常/禁用)"),
+    Column("name", String(12), nullable=False, comment="姓名"),
+    Column("session", Integer, nullable=False, comment="届号"),
+    Column(
+        "dept_no",
+        String(10),
+        ForeignKey("department.dept_no"),
+        nullable=True,
+        comment="院系ID",
+    ),
+    Column(
+        "major_no",
+        String(10),
+        ForeignKey("major.major_no"),
+        nullable=True,
+        comment="专业ID",
+    ),
+    Column("class_number", Integer, nullable=True, comment="班级ID"),
+    *_timestamps(),
+)
+
+course = Table(
+    "course",
+    metadata,
+    Column(
+        "id",
+        Integer,
+        primary_key=True,
+        index=True,
+        autoincrement=True,
+        comment="主键ID",
+    ),
+    Column("course_no", String(20), unique=True, nullable=False, comment="课程编号"),
+    Column("course_name", String(50), nullable=False, comment="课程名称"),
+    Column("teacher", Integer, ForeignKey("user.id"), nullable=False, comment="教师ID"),
+    Column(
+        "major_no",
+        String(10),
+        ForeignKey("major.major_no"),
+        nullable=False,
+        comment="专业编号",
+    ),
+    Column("session", Integer, nullable=False, comment="年级"),
+    Column(
+        "course_type",
+        Enum("CORE", "ELECTIVE", name="coursetype"),
+        nullable=False,
+        comment="课程类型(0-必修, 1-选修)",
+    ),
+    Column("credit", Numeric, nullable=False, comment="学分"),
+    Column("is_public", Boolean, nullable=False, comment="是否公开"),
+    Column(
+        "status",
+        Integer,
+        nullable=False,
+        comment="课程状态(1-已提交/2-审核通过/3-审核不通过/4-公开/0-隐藏)",
+    ),
+    Column("status_comment", String(100), nullable=True, comment="状态说明"),
+    Column("max_students", Integer, nullable=True, comment="选修课·最大选课人数"),
+    Column("current_students", Integer, nullable=False, comment="选修课·当前已选人数"),
+    Column("course_date", JSON, nullable=False, comment="课程时间"),
+    *_timestamps(),
+)
+
+selection = Table(
+    "selection",
+    metadata,
+    Column(
+        "id",
+        Integer,
+        primary_key=True,
+        index=True,
+        autoincrement=True,
+        comment="选课 ID",
+    ),
+    Column(
+        "student_id",
+        Integer,
+        ForeignKey("user.id"),
+        nullable=False,
+        index=True,
+        comment="选课学生ID",
+    ),
+    Column(
+        "course_id",
+        Integer,
+        ForeignKey("course.id"),
+        nullable=False,
+        index=True,
+        comment="目标课程ID",
+    ),
+    Column(
+        "selection_time",
+        DateTime,
+        nullable=False,
+        server_default=func.now(),
+        comment="选课时间",
+    ),
+    Column("status", Boolean, nullable=False, comment="选课状态: 选中/退选"),
+)
+
+
+def upgrade(conn: Connection):
+    metadata.create_all(conn, checkfirst=True)
+
+
+def downgrade(conn: Connection):
+    metadata.drop_all(conn, checkfirst=True)
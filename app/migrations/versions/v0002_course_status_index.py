@@ -0,0 +1,19 @@
+"""
+为 course.status 添加索引
+
+待审核队列与按状态批量审核都按 status 过滤，MySQL 上在线建索引，不阻塞读写
+"""
+
+from sqlalchemy import Connection
+
+from app.migrations.ops import create_index, drop_index
+
+revision = 2
+
+
+def upgrade(conn: Connection):
+    create_index(conn, "ix_course_status", "course", ["status"])
+
+
+def downgrade(conn: Connection):
+    drop_index(conn, "ix_course_status", "course")
@@ -0,0 +1,46 @@
+"""
+为外键添加 ON DELETE 动作
+
+选课记录随学生/课程级联删除，专业随院系级联删除，用户与课程的院系/专业/教师引用在被删除时置空。
+回退时若存在教师或专业已被置空的课程，会因 NOT NULL 约束失败
+"""
+
+from sqlalchemy import Connection, MetaData
+
+from app.migrations.ops import rebuild_foreign_keys
+from app.migrations.versions import v0001_baseline
+
+revision = 3
+
+ON_DELETE = {
+    ("major", "dept_no"): "CASCADE",
+    ("user", "dept_no"): "SET NULL",
+    ("user", "major_no"): "SET NULL",
+    ("course", "teacher"): "SET NULL",
+    ("course", "major_no"): "SET NULL",
+    ("selection", "student_id"): "CASCADE",
+    ("selection", "course_id"): "CASCADE",
+}
+
+metadata = MetaData()
+for _table in v0001_baseline.metadata.sorted_tables:
+    _table = _table.to_metadata(metadata)
+    for _constraint in _table.foreign_key_constraints:
+        (_column,) = _constraint.column_keys
+        _constraint.ondelete = ON_DELETE[(_table.name, _column)]
+        for _element in _constraint.elements:
+            _element.ondelete = _constraint.ondelete
+        if _constraint.ondelete == "SET NULL":
+            _table.c[_column].nullable = True
+
+TABLES = ["major", "user", "course", "selection"]
+
+
+def upgrade(conn: Connection):
+    for name in TABLES:
+        rebuild_foreign_keys(conn, metadata.tables[name])
+
+
+def downgrade(conn: Connection):
+    for name in TABLES:
+        rebuild_foreign_keys(conn, v0001_baseline.metadata.tables[name])
@@ -0,0 +1,95 @@
+"""
+新增 course_slot 表并从 course.course_date 回填
+
+课程时间以 JSON 存储在 course.course_date 中，无法走索引；course_slot 将其展开为每门课程每个节次一行，
+供按时间段查询课程与冲突检测使用
+"""
+
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Connection,
+    ForeignKey,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    UniqueConstraint,
+    select,
+)
+
+from app.migrations.versions import v0003_foreign_key_actions
+
+revision = 4
+
+BATCH_SIZE = 1000
+
+metadata = MetaData()
+for _table in v0003_foreign_key_actions.metadata.sorted_tables:
+    _table.to_metadata(metadata)
+
+course_slot = Table(
+    "course_slot",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True, comment="主键ID"),
+    Column(
+        "course_id",
+        Integer,
+        ForeignKey("course.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+        comment="课程ID",
+    ),
+    Column("term", String(20), nullable=False, comment="学期"),
+    Column("week_day", Integer, nullable=False, comment="星期"),
+    Column("section", Integer, nullable=False, comment="节次"),
+    Column("start_week", Integer, nullable=False, comment="起始周"),
+    Column("end_week", Integer, nullable=False, comment="结束周"),
+    Column(
+        "is_double_week", Boolean, nullable=False, default=False, comment="是否双周"
+    ),
+    UniqueConstraint("course_id", "term", "week_day", "section", name="uq_course_slot"),
+    Index("ix_course_slot_term_day_section", "term", "week_day", "section"),
+)
+
+
+def _slot_rows(course_id: int, course_date: dict | None) -> list[dict]:
+    # 与 CourseSlotRepository.slot_rows 一致，迁移脚本不依赖应用代码，在此冻结一份
+    if not course_date or not course_date.get("term"):
+        return []
+    if course_date.get("week_day") is None:
+        return []
+
+    start_week = course_date.get("start_week") or 1
+    return [
+        {
+            "course_id": course_id,
+            "term": course_date["term"],
+            "week_day": int(course_date["week_day"]),
+            "section": section,
+            "start_week": start_week,
+            "end_week": course_date.get("end_week") or start_week,
+            "is_double_week": bool(course_date.get("is_double_week")),
+        }
+        for section in sorted({int(s) for s in course_date.get("section") or []})
+    ]
+
+
+def upgrade(conn: Connection):
+    course_slot.create(conn, checkfirst=True)
+
+    course = metadata.tables["course"]
+    rows: list[dict] = []
+    courses = conn.execute(select(course.c.id, course.c.course_date)).all()
+    for course_id, course_date in courses:
+        rows.extend(_slot_rows(course_id, course_date))
+        if len(rows) >= BATCH_SIZE:
+            conn.execute(course_slot.insert(), rows)
+            rows = []
+    if rows:
+        conn.execute(course_slot.insert(), rows)
+
+
+def downgrade(conn: Connection):
+    course_slot.drop(conn, checkfirst=True)
@@ -0,0 +1,110 @@
+"""
+新增 student_schedule 表并回填所有学生的课程表
+
+课程表原先在每次请求时按专业、年级与 JSON 中的学期现算；物化后按 (学生, 学期) 走索引查找
+"""
+
+from sqlalchemy import (
+    Column,
+    ColumnElement,
+    CompoundSelect,
+    Connection,
+    ForeignKey,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    UniqueConstraint,
+    and_,
+    func,
+    select,
+    union,
+)
+
+from app.migrations.versions import v0004_course_slot
+
+revision = 5
+
+metadata = MetaData()
+for _table in v0004_course_slot.metadata.sorted_tables:
+    _table.to_metadata(metadata)
+
+student_schedule = Table(
+    "student_schedule",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True, comment="主键ID"),
+    Column(
+        "student_id",
+        Integer,
+        ForeignKey("user.id", ondelete="CASCADE"),
+        nullable=False,
+        comment="学生ID",
+    ),
+    Column(
+        "course_id",
+        Integer,
+        ForeignKey("course.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+        comment="课程ID",
+    ),
+    Column("term", String(20), nullable=False, comment="学期"),
+    UniqueConstraint("student_id", "course_id", name="uq_student_schedule"),
+    Index("ix_student_schedule_student_term", "student_id", "term"),
+)
+
+
+def schedule_query(conn: Connection) -> CompoundSelect:
+    """
+    由专业年级的核心课与选中的选修课计算课程表条目 (student_id, course_id, term)
+    """
+    user = metadata.tables["user"]
+    course = metadata.tables["course"]
+    selection = metadata.tables["selection"]
+    term: ColumnElement = (
+        course.c.course_date.op("->>")("$.term")
+        if conn.dialect.name == "mysql"
+        else func.json_extract(course.c.course_date, "$.term")
+    )
+
+    core = (
+        select(
+            user.c.id.label("student_id"),
+            course.c.id.label("course_id"),
+            term.label("term"),
+        )
+        .join(
+            course,
+            and_(
+                course.c.major_no == user.c.major_no,
+                course.c.session == user.c.session,
+            ),
+        )
+        .where(
+            user.c.role == "student",
+            course.c.status == 4,
+            course.c.is_public.is_(True),
+            course.c.course_type == "CORE",
+            term.is_not(None),
+        )
+    )
+    elective = (
+        select(selection.c.student_id, selection.c.course_id, term.label("term"))
+        .join(course, course.c.id == selection.c.course_id)
+        .where(selection.c.status.is_(True), term.is_not(None))
+    )
+    return union(core, elective)
+
+
+def upgrade(conn: Connection):
+    student_schedule.create(conn, checkfirst=True)
+    conn.execute(
+        student_schedule.insert().from_select(
+            ["student_id", "course_id", "term"], schedule_query(conn)
+        )
+    )
+
+
+def downgrade(conn: Connection):
+    student_schedule.drop(conn, checkfirst=True)
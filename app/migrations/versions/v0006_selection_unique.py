@@ -0,0 +1,109 @@
+"""
+为选课记录添加 (student_id, course_id) 唯一索引
+
+同一学生与课程只保留一条选课记录，退选后再选恢复原记录，并发的重复选课由数据库拒绝。
+建索引前删除已有的重复记录：每组保留最新的选中记录，没有选中记录时保留最新的退选记录。
+删除后重新统计受影响课程的已选人数（重复选中会多计），并按保留的记录重建受影响的课程表条目
+"""
+
+from sqlalchemy import Connection, and_, delete, func, select, tuple_, update
+
+from app.migrations.ops import create_index, drop_index
+from app.migrations.versions import v0005_student_schedule
+
+revision = 6
+
+INDEX_NAME = "uq_student_course"
+BATCH_SIZE = 1000
+
+course = v0005_student_schedule.metadata.tables["course"]
+selection = v0005_student_schedule.metadata.tables["selection"]
+student_schedule = v0005_student_schedule.student_schedule
+
+
+def upgrade(conn: Connection):
+    pairs = (
+        select(selection.c.student_id, selection.c.course_id)
+        .group_by(selection.c.student_id, selection.c.course_id)
+        .having(func.count() > 1)
+        .subquery()
+    )
+    rows = conn.execute(
+        select(selection.c.id, selection.c.student_id, selection.c.course_id)
+        .join(
+            pairs,
+            and_(
+                selection.c.student_id == pairs.c.student_id,
+                selection.c.course_id == pairs.c.course_id,
+            ),
+        )
+        .order_by(
+            selection.c.student_id,
+            selection.c.course_id,
+            selection.c.status.desc(),
+            selection.c.id.desc(),
+        )
+    )
+    duplicates = []
+    affected: set[tuple[int, int]] = set()
+    previous = None
+    for selection_id, student_id, course_id in rows:
+        if (student_id, course_id) == previous:
+            duplicates.append(selection_id)
+            affected.add((student_id, course_id))
+        previous = (student_id, course_id)
+    for start in range(0, len(duplicates), BATCH_SIZE):
+        conn.execute(
+            delete(selection).where(
+                selection.c.id.in_(duplicates[start : start + BATCH_SIZE])
+            )
+        )
+    _repair(conn, sorted(affected))
+
+    create_index(
+        conn, INDEX_NAME, "selection", ["student_id", "course_id"], unique=True
+    )
+
+
+def _repair(conn: Connection, pairs: list[tuple[int, int]]):
+    """
+    重新统计受影响课程的已选人数，并重建受影响的 (学生, 课程) 的课程表条目
+
+    :param pairs: 删除了重复记录的 (student_id, course_id)
+    """
+    course_ids = sorted({course_id for _, course_id in pairs})
+    for start in range(0, len(course_ids), BATCH_SIZE):
+        conn.execute(
+            update(course)
+            .where(course.c.id.in_(course_ids[start : start + BATCH_SIZE]))
+            .values(
+                current_students=select(func.count(selection.c.id))
+                .where(
+                    selection.c.course_id == course.c.id, selection.c.status.is_(True)
+                )
+                .scalar_subquery()
+            )
+        )
+
+    schedule = v0005_student_schedule.schedule_query(conn).subquery()
+    for start in range(0, len(pairs), BATCH_SIZE):
+        batch = pairs[start : start + BATCH_SIZE]
+        conn.execute(
+            delete(student_schedule).where(
+                tuple_(student_schedule.c.student_id, student_schedule.c.course_id).in_(
+                    batch
+                )
+            )
+        )
+        conn.execute(
+            student_schedule.insert().from_select(
+                ["student_id", "course_id", "term"],
+                select(schedule).where(
+                    tuple_(schedule.c.student_id, schedule.c.course_id).in_(batch)
+                ),
+            )
+        )
+
+
+def downgrade(conn: Connection):
+    drop_index(conn, INDEX_NAME, "selection")
@@ -1,5 +1,6 @@
 import enum
 from datetime import datetime
+from typing import Optional
 
 import sqlalchemy
 from sqlalchemy import (
@@ -45,11 +46,17 @@ class Course(Base):
         String(50), nullable=False, comment="课程名称"
     )
 
-    teacher: Mapped[int] = mapped_column(
-        Integer, ForeignKey("user.id"), comment="教师ID"
+    teacher: Mapped[Optional[int]] = mapped_column(
+        Integer,
+        ForeignKey("user.id", ondelete="SET NULL"),
+        nullable=True,
+        comment="教师ID",
     )
-    major_no: Mapped[str] = mapped_column(
-        String(10), ForeignKey("major.major_no"), comment="专业编号"
+    major_no: Mapped[Optional[str]] = mapped_column(
+        String(10),
+        ForeignKey("major.major_no", ondelete="SET NULL"),
+        nullable=True,
+        comment="专业编号",
     )
     session: Mapped[int] = mapped_column(Integer, nullable=False, comment="年级")
     course_type: Mapped[CourseType] = mapped_column(
@@ -60,6 +67,7 @@ class Course(Base):
     status: Mapped[int] = mapped_column(
         Integer,
         default=0,
+        index=True,
         comment="课程状态(1-已提交/2-审核通过/3-审核不通过/4-公开/0-隐藏)",
     )
     status_comment: Mapped[str] = mapped_column(
@@ -92,5 +100,8 @@ class Course(Base):
     )
 
     student_selections = relationship(
-        "Selection", back_populates="course", cascade="all, delete-orphan"
+        "Selection",
+        back_populates="course",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
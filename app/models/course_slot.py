@@ -0,0 +1,39 @@
+from sqlalchemy import Boolean, ForeignKey, Index, Integer, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.sql import Base
+
+
+class CourseSlot(Base):
+    """
+    课程时间段
+
+    `Course.course_date` 的规范化投影，每门课程每个节次一行，由 `CourseSlotRepository` 在课程增改时同步维护
+    """
+
+    __tablename__ = "course_slot"
+    __table_args__ = (
+        UniqueConstraint(
+            "course_id", "term", "week_day", "section", name="uq_course_slot"
+        ),
+        Index("ix_course_slot_term_day_section", "term", "week_day", "section"),
+    )
+
+    id: Mapped[int] = mapped_column(
+        Integer, primary_key=True, autoincrement=True, comment="主键ID"
+    )
+    course_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("course.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+        comment="课程ID",
+    )
+    term: Mapped[str] = mapped_column(String(20), nullable=False, comment="学期")
+    week_day: Mapped[int] = mapped_column(Integer, nullable=False, comment="星期")
+    section: Mapped[int] = mapped_column(Integer, nullable=False, comment="节次")
+    start_week: Mapped[int] = mapped_column(Integer, nullable=False, comment="起始周")
+    end_week: Mapped[int] = mapped_column(Integer, nullable=False, comment="结束周")
+    is_double_week: Mapped[bool] = mapped_column(
+        Boolean, nullable=False, default=False, comment="是否双周"
+    )
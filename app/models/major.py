@@ -20,7 +20,10 @@ class Major(Base):
         String(25), nullable=False, comment="专业名称"
     )
     dept_no: Mapped[str] = mapped_column(
-        String(10), ForeignKey("department.dept_no"), nullable=False, comment="院系编号"
+        String(10),
+        ForeignKey("department.dept_no", ondelete="CASCADE"),
+        nullable=False,
+        comment="院系编号",
     )
 
     create_time: Mapped[datetime] = mapped_column(
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, UniqueConstraint
+from sqlalchemy import Boolean, DateTime, ForeignKey, Index, Integer
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 
@@ -7,23 +7,27 @@ from app.core.sql import Base
 from .course import Course
 from .user import User
 
-__table_args__ = (
-    UniqueConstraint("student_id", "course_id", name="uq_student_course"),
-)
-
 
 class Selection(Base):
     __tablename__ = "selection"
+    __table_args__ = (
+        # 每个学生与课程只有一条选课记录，退选后再选恢复原记录
+        Index("uq_student_course", "student_id", "course_id", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(
         Integer, primary_key=True, index=True, autoincrement=True, comment="选课 ID"
     )
     student_id: Mapped[int] = mapped_column(
-        Integer, ForeignKey("user.id"), nullable=False, index=True, comment="选课学生ID"
+        Integer,
+        ForeignKey("user.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+        comment="选课学生ID",
     )
     course_id: Mapped[int] = mapped_column(
         Integer,
-        ForeignKey("course.id"),
+        ForeignKey("course.id", ondelete="CASCADE"),
         nullable=False,
         index=True,
         comment="目标课程ID",
@@ -0,0 +1,37 @@
+from sqlalchemy import ForeignKey, Index, Integer, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.sql import Base
+
+
+class StudentSchedule(Base):
+    """
+    学生课程表
+
+    必修课（按专业、年级）与已选选修课的物化投影，每个学生每门课程一行，
+    由 `StudentScheduleRepository` 在选课、课程与学生信息变更时增量维护
+    """
+
+    __tablename__ = "student_schedule"
+    __table_args__ = (
+        UniqueConstraint("student_id", "course_id", name="uq_student_schedule"),
+        Index("ix_student_schedule_student_term", "student_id", "term"),
+    )
+
+    id: Mapped[int] = mapped_column(
+        Integer, primary_key=True, autoincrement=True, comment="主键ID"
+    )
+    student_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("user.id", ondelete="CASCADE"),
+        nullable=False,
+        comment="学生ID",
+    )
+    course_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("course.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+        comment="课程ID",
+    )
+    term: Mapped[str] = mapped_column(String(20), nullable=False, comment="学期")
@@ -34,15 +34,24 @@ class User(Base):
     name: Mapped[str] = mapped_column(String(12), nullable=False, comment="姓名")
     session: Mapped[int] = mapped_column(Integer, nullable=False, comment="届号")
     dept_no: Mapped[str] = mapped_column(
-        String(10), ForeignKey("department.dept_no"), nullable=True, comment="院系ID"
+        String(10),
+        ForeignKey("department.dept_no", ondelete="SET NULL"),
+        nullable=True,
+        comment="院系ID",
     )
     major_no: Mapped[str] = mapped_column(
-        String(10), ForeignKey("major.major_no"), nullable=True, comment="专业ID"
+        String(10),
+        ForeignKey("major.major_no", ondelete="SET NULL"),
+        nullable=True,
+        comment="专业ID",
     )
     class_number: Mapped[int] = mapped_column(Integer, nullable=True, comment="班级ID")
 
     course_selections = relationship(
-        "Selection", back_populates="student", cascade="all, delete-orphan"
+        "Selection",
+        back_populates="student",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
     create_time: Mapped[datetime] = mapped_column(
@@ -1,28 +1,92 @@
-from typing import Optional
+from typing import Any, Optional, Sequence
 
 import fastapi
 from fastapi.exceptions import HTTPException
-from sqlalchemy import func, select
+from sqlalchemy import (
+    Integer,
+    String,
+    and_,
+    bindparam,
+    case,
+    cast,
+    func,
+    insert,
+    literal,
+    select,
+    update,
+)
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
+from app.core.cache import cached, invalidates
 from app.core.logger import logger
+from app.core.tracing import traced_methods
 from app.models.course import Course, CourseDate, CourseType
+from app.models.major import Major
+from app.repositories.course_slot import CourseSlotRepository
+from app.repositories.student_schedule import StudentScheduleRepository
+from app.services.schedule_cache import mark_schedules_stale
 
+COURSE_NO_PREFIX = "CS"
 
+# 预构建的热点查询，复用 SQLAlchemy 编译缓存
+_GET_BY_COURSE_NO = select(Course).where(Course.course_no == bindparam("course_no"))
+
+
+@traced_methods
 class CourseRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def get_by_course_no(self, course_no: str) -> Optional[Course]:
+    def _term_filter(self, course_date_column, term: str):
         """
-        通过课程编号获得课程对象
+        term json 对象过滤器
+        """
+        bind = self.session.get_bind()
+        if bind.dialect.name == "mysql":
+            return course_date_column.op("->>")("$.term") == term
+        elif bind.dialect.name == "sqlite":
+            return func.json_extract(course_date_column, "$.term") == term
+        else:  # pragma: no cover
+            return course_date_column["term"] == term
+
+    async def _allocate_course_nos(self) -> int:
+        """
+        分配课程编号区间
+
+        返回当前最大的课程序号，调用方从该序号 +1 开始连续占用一段编号。
+        使用最大序号而非课程总数，避免删除课程后新编号与已有编号冲突
+
+        :return: 当前最大的课程序号
         """
         result = await self.session.execute(
-            select(Course).where(Course.course_no == course_no)
+            select(
+                func.max(
+                    cast(
+                        func.substr(Course.course_no, len(COURSE_NO_PREFIX) + 1),
+                        Integer,
+                    )
+                )
+            )
         )
+        return result.scalar() or 0
+
+    async def _fetch_by_course_no(self, course_no: str) -> Optional[Course]:
+        """
+        从数据库获得课程对象，修改课程前使用，保证对象由当前会话跟踪
+        """
+        result = await self.session.execute(_GET_BY_COURSE_NO, {"course_no": course_no})
         return result.scalar_one_or_none()
 
+    @cached(Course, ttl=60, negative_ttl=10, stale_ttl=30)
+    async def get_by_course_no(self, course_no: str) -> Optional[Course]:
+        """
+        通过课程编号获得课程对象（只读，可能来自缓存）
+        """
+        return await self._fetch_by_course_no(course_no)
+
+    @invalidates(Course)
     async def create_course(
         self,
         course_name: str,
@@ -52,9 +116,7 @@ class CourseRepository:
 
         :return: 课程对象。失败则返回 None
         """
-        courses = await self.session.execute(select(func.count(Course.id)))
-        total_courses = (courses.scalar() or 0) + 1
-        course_no = f"CS{total_courses:03d}"
+        course_no = f"{COURSE_NO_PREFIX}{await self._allocate_course_nos() + 1:03d}"
         course = Course(
             course_no=course_no,
             course_name=course_name,
@@ -70,6 +132,9 @@ class CourseRepository:
         )
         self.session.add(course)
         try:
+            await self.session.flush()
+            await CourseSlotRepository(self.session).sync_course(course)
+            await StudentScheduleRepository(self.session).refresh(courses=[course.id])
             await self.session.commit()
         except IntegrityError:
             await self.session.rollback()
@@ -79,6 +144,159 @@ class CourseRepository:
             )
         return course
 
+    @invalidates(Course)
+    async def create_courses(
+        self, teacher: int, courses: Sequence[dict[str, Any]]
+    ) -> list[str]:
+        """
+        批量创建课程
+
+        一次性分配连续的课程编号，并通过单条 executemany INSERT 写入所有课程，再批量写入课程时间段
+
+        :param teacher: 任教教师ID
+        :param courses: 课程参数列表，字段与 `create_course` 的参数一致
+
+        :return: 按输入顺序排列的课程编号列表
+
+        :raises HTTPException: 课程编号冲突或专业不存在时抛出
+        """
+        if not courses:
+            return []
+
+        start = await self._allocate_course_nos() + 1
+        rows: list[dict[str, Any]] = []
+        for offset, course in enumerate(courses):
+            rows.append(
+                {
+                    "course_no": f"{COURSE_NO_PREFIX}{start + offset:03d}",
+                    "course_name": course["course_name"],
+                    "teacher": teacher,
+                    "major_no": course["major_no"],
+                    "session": course["session"],
+                    "course_type": course["course_type"],
+                    "credit": course["credit"],
+                    "course_date": course["course_date"],
+                    "is_public": course.get("is_public", True),
+                    "status": course.get("status", 0),
+                    "max_students": course.get("max_students", 50),
+                    "current_students": 0,
+                }
+            )
+
+        try:
+            await self.session.execute(insert(Course), rows)
+            result = await self.session.execute(
+                select(Course.id, Course.course_date).where(
+                    Course.course_no.in_([row["course_no"] for row in rows])
+                )
+            )
+            created = [
+                (course_id, course_date) for course_id, course_date in result.all()
+            ]
+            await CourseSlotRepository(self.session).sync_courses(created)
+            await StudentScheduleRepository(self.session).refresh(
+                courses=[course_id for course_id, _ in created]
+            )
+            await self.session.commit()
+        except IntegrityError:
+            await self.session.rollback()
+            raise HTTPException(
+                status_code=fastapi.status.HTTP_400_BAD_REQUEST,
+                detail="Course already exists or major_no is invalid",
+            )
+
+        return [row["course_no"] for row in rows]
+
+    @invalidates(Course)
+    async def rollover_courses(self, source_term: str, target_term: str) -> int:
+        """
+        学期课程滚动: 将源学期的所有课程复制到目标学期
+
+        通过单条 INSERT ... SELECT 完成复制：改写 `course_date.term`，按课程 ID 顺序分配新的课程编号，
+        并重置已选人数与课程状态(0-隐藏)，随后重建目标学期的课程时间段。目标学期中已存在同名、同教师、同专业、同年级的课程将被跳过，
+        因此重复执行是幂等的
+
+        :param source_term: 源学期
+        :param target_term: 目标学期
+
+        :return: 新建的课程数量
+
+        :raises HTTPException: 源学期与目标学期相同或编号冲突时抛出
+        """
+        if source_term == target_term:
+            raise HTTPException(
+                status_code=fastapi.status.HTTP_400_BAD_REQUEST,
+                detail="Source term and target term must be different",
+            )
+
+        start = await self._allocate_course_nos()
+        existing = aliased(Course)
+        ordinal = start + func.row_number().over(order_by=Course.id)
+        course_no = literal(COURSE_NO_PREFIX) + case(
+            (ordinal < 1000, func.substr(literal("00") + cast(ordinal, String), -3)),
+            else_=cast(ordinal, String),
+        )
+
+        clone_stmt = select(
+            course_no,
+            Course.course_name,
+            Course.teacher,
+            Course.major_no,
+            Course.session,
+            Course.course_type,
+            Course.credit,
+            Course.is_public,
+            literal(0),
+            Course.max_students,
+            literal(0),
+            func.json_set(Course.course_date, "$.term", target_term),
+        ).where(
+            self._term_filter(Course.course_date, source_term),
+            ~select(existing.id)
+            .where(
+                and_(
+                    existing.course_name == Course.course_name,
+                    existing.teacher == Course.teacher,
+                    existing.major_no == Course.major_no,
+                    existing.session == Course.session,
+                    self._term_filter(existing.course_date, target_term),
+                )
+            )
+            .exists(),
+        )
+
+        try:
+            result = await self.session.execute(
+                insert(Course).from_select(
+                    [
+                        Course.course_no,
+                        Course.course_name,
+                        Course.teacher,
+                        Course.major_no,
+                        Course.session,
+                        Course.course_type,
+                        Course.credit,
+                        Course.is_public,
+                        Course.status,
+                        Course.max_students,
+                        Course.current_students,
+                        Course.course_date,
+                    ],
+                    clone_stmt,
+                )
+            )
+            await CourseSlotRepository(self.session).rebuild_term(target_term)
+            await self.session.commit()
+        except IntegrityError:
+            await self.session.rollback()
+            raise HTTPException(
+                status_code=fastapi.status.HTTP_400_BAD_REQUEST,
+                detail="Course number allocation conflict, please retry",
+            )
+
+        return result.rowcount  # type: ignore
+
+    @invalidates(Course, key="course_no")
     async def edit_course(
         self,
         course_no: str,
@@ -110,7 +328,7 @@ class CourseRepository:
 
         :return: 修改后的课程对象。失败则返回 None
         """
-        if not (course := await self.get_by_course_no(course_no)):
+        if not (course := await self._fetch_by_course_no(course_no)):
             return None
 
         course.course_name = course_name or course.course_name
@@ -125,28 +343,36 @@ class CourseRepository:
         course.max_students = max_students or course.max_students
 
         try:
+            if course_date:
+                await CourseSlotRepository(self.session).sync_course(course)
+            await StudentScheduleRepository(self.session).refresh(courses=[course.id])
             await self.session.commit()
         except IntegrityError:
             return None
 
         return course
 
+    @invalidates(Course, key="course_no")
     async def delete_course(self, course_no: str) -> bool:
         """
         删除一个课程
 
+        课程的选课记录由数据库 ON DELETE CASCADE 删除，不会加载到会话中
+
         :param course_no: 课程编号
 
         :return: 是否成功
         """
-        if not (course := await self.get_by_course_no(course_no)):
+        if not (course := await self._fetch_by_course_no(course_no)):
             return False
 
         await self.session.delete(course)
+        mark_schedules_stale(self.session, courses=[course.id])
         await self.session.commit()
 
         return True
 
+    @invalidates(Course, key="course_no")
     async def submit_course_review(self, course_no: str):
         """
         提交课程审核
@@ -157,15 +383,15 @@ class CourseRepository:
 
         :raises HTTPException: 如果课程不存在或状态不符合要求
         """
-        if not (course := await self.get_by_course_no(course_no)):
-            logger.warning(f"课程: {course_no} 不存在，返回 404")
+        if not (course := await self._fetch_by_course_no(course_no)):
+            logger.warning("课程: %s 不存在，返回 404", course_no)
             raise HTTPException(
                 status_code=fastapi.status.HTTP_404_NOT_FOUND,
                 detail="Course not found",
             )
 
         if course.status != 0:
-            logger.warning(f"课程: {course_no} 状态不符合要求，返回 400")
+            logger.warning("课程: %s 状态不符合要求，返回 400", course_no)
             raise HTTPException(
                 status_code=fastapi.status.HTTP_400_BAD_REQUEST,
                 detail="Course is not in a valid state for submission",
@@ -176,6 +402,7 @@ class CourseRepository:
 
         return True
 
+    @invalidates(Course, key="course_no")
     async def set_course_status(
         self, course_no: str, status: int, comment: Optional[str] = None
     ) -> Course:
@@ -188,15 +415,15 @@ class CourseRepository:
 
         :raises HTTPException: 如果状态无效或课程不存在
         """
-        if not (course := await self.get_by_course_no(course_no)):
-            logger.warning(f"课程: {course_no} 不存在，返回 404")
+        if not (course := await self._fetch_by_course_no(course_no)):
+            logger.warning("课程: %s 不存在，返回 404", course_no)
             raise HTTPException(
                 status_code=fastapi.status.HTTP_404_NOT_FOUND,
                 detail="Course not found",
             )
 
         if status not in [1, 2, 3, 4, 0]:
-            logger.warning(f"课程: {course_no} 状态不符合要求，返回 400")
+            logger.warning("课程: %s 状态不符合要求，返回 400", course_no)
             raise HTTPException(
                 status_code=fastapi.status.HTTP_400_BAD_REQUEST,
                 detail="Invalid course status",
@@ -206,14 +433,99 @@ class CourseRepository:
         if comment:
             course.status_comment = comment
 
+        await StudentScheduleRepository(self.session).refresh(courses=[course.id])
         await self.session.commit()
         return course
 
-    async def get_pending_courses(self) -> list[Course]:
+    @invalidates(Course, key="course_nos")
+    async def set_courses_status(
+        self, course_nos: Sequence[str], status: int, comment: Optional[str] = None
+    ) -> int:
+        """
+        批量设置课程状态（批量审核课程）
+
+        使用单条 UPDATE 完成所有课程的状态变更
+
+        :param course_nos: 课程编号列表
+        :param status: 审核状态(1-待审核, 2-通过, 3-不通过, 4-公开, 0-隐藏)
+        :param comment: 状态说明（可选）
+
+        :return: 实际更新的课程数量
+
+        :raises HTTPException: 如果状态无效
+        """
+        if status not in [1, 2, 3, 4, 0]:
+            logger.warning("批量审核状态 %s 不符合要求，返回 400", status)
+            raise HTTPException(
+                status_code=fastapi.status.HTTP_400_BAD_REQUEST,
+                detail="Invalid course status",
+            )
+
+        if not course_nos:
+            return 0
+
+        values: dict[str, Any] = {"status": status}
+        if comment:
+            values["status_comment"] = comment
+
+        result = await self.session.execute(
+            update(Course).where(Course.course_no.in_(course_nos)).values(**values)
+        )
+        await StudentScheduleRepository(self.session).refresh(
+            courses=select(Course.id).where(Course.course_no.in_(course_nos))
+        )
+        await self.session.commit()
+        return result.rowcount  # type: ignore
+
+    async def get_pending_courses(
+        self,
+        cursor: Optional[int] = None,
+        limit: int = 100,
+        dept_no: Optional[str] = None,
+        major_no: Optional[str] = None,
+        teacher: Optional[int] = None,
+    ) -> list[Course]:
         """
-        获取所有待审核的课程
+        获取待审核的课程（游标分页）
+
+        :param cursor: 游标，即上一页最后一门课程的 ID，为空时从头开始
+        :param limit: 最大返回记录
+        :param dept_no: 按院系过滤
+        :param major_no: 按专业过滤
+        :param teacher: 按任教教师ID过滤
 
-        :return: 待审核课程列表
+        :return: 按课程 ID 升序排列的待审核课程列表
         """
-        result = await self.session.execute(select(Course).where(Course.status == 1))
+        stmt = select(Course).where(Course.status == 1)
+
+        if cursor is not None:
+            stmt = stmt.where(Course.id > cursor)
+        if major_no:
+            stmt = stmt.where(Course.major_no == major_no)
+        if dept_no:
+            stmt = stmt.join(Major, Major.major_no == Course.major_no).where(
+                Major.dept_no == dept_no
+            )
+        if teacher is not None:
+            stmt = stmt.where(Course.teacher == teacher)
+
+        result = await self.session.execute(stmt.order_by(Course.id).limit(limit))
         return result.scalars().all()  # type: ignore
+
+    async def get_open_course_seats(self) -> list[tuple[str, int]]:
+        """
+        获取已发布的公开选修课的剩余名额，不限人数的课程不计入
+
+        :return: (课程编号, 剩余名额) 列表
+        """
+        result = await self.session.execute(
+            select(Course.course_no, Course.max_students - Course.current_students)
+            .where(
+                Course.is_public.is_(True),
+                Course.status == 4,
+                Course.course_type == CourseType.ELECTIVE,
+                Course.max_students.is_not(None),
+            )
+            .order_by(Course.id)
+        )
+        return [(course_no, remaining) for course_no, remaining in result.all()]
@@ -0,0 +1,229 @@
+from typing import Any, Mapping, Optional, Sequence
+
+from sqlalchemy import Select, and_, delete, func, insert, select, union
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.core.tracing import traced_methods
+from app.models.course import Course, CourseType
+from app.models.course_slot import CourseSlot
+from app.models.selection import Selection
+from app.models.user import User
+
+
+@traced_methods
+class CourseSlotRepository:
+    """
+    课程时间段仓库
+
+    维护 `course_slot` 表并基于它提供走索引的课表查询。写入方法不提交事务，由调用方与课程的修改一并提交
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    def _term_filter(self, course_date_column, term: str):
+        """
+        term json 对象过滤器
+        """
+        bind = self.session.get_bind()
+        if bind.dialect.name == "mysql":
+            return course_date_column.op("->>")("$.term") == term
+        elif bind.dialect.name == "sqlite":
+            return func.json_extract(course_date_column, "$.term") == term
+        else:  # pragma: no cover
+            return course_date_column["term"] == term
+
+    @staticmethod
+    def slot_rows(
+        course_id: int, course_date: Optional[Mapping[str, Any]]
+    ) -> list[dict[str, Any]]:
+        """
+        将课程时间展开为时间段行，每个节次一行
+
+        :param course_id: 课程ID
+        :param course_date: 课程时间，缺少学期或星期时不生成时间段
+        """
+        if not course_date or not course_date.get("term"):
+            return []
+        if course_date.get("week_day") is None:
+            return []
+
+        start_week = course_date.get("start_week") or 1
+        return [
+            {
+                "course_id": course_id,
+                "term": course_date["term"],
+                "week_day": int(course_date["week_day"]),
+                "section": section,
+                "start_week": start_week,
+                "end_week": course_date.get("end_week") or start_week,
+                "is_double_week": bool(course_date.get("is_double_week")),
+            }
+            for section in sorted({int(s) for s in course_date.get("section") or []})
+        ]
+
+    async def sync_courses(
+        self, courses: Sequence[tuple[int, Optional[Mapping[str, Any]]]]
+    ):
+        """
+        按课程时间重写课程的时间段
+
+        :param courses: (课程ID, 课程时间) 列表
+        """
+        if not courses:
+            return
+
+        await self.session.execute(
+            delete(CourseSlot).where(
+                CourseSlot.course_id.in_([course_id for course_id, _ in courses])
+            )
+        )
+        rows = [row for course in courses for row in self.slot_rows(*course)]
+        if rows:
+            await self.session.execute(insert(CourseSlot), rows)
+
+    async def sync_course(self, course: Course):
+        """
+        按课程时间重写单门课程的时间段
+        """
+        await self.sync_courses([(course.id, course.course_date)])
+
+    async def rebuild_term(self, term: str) -> int:
+        """
+        重建一个学期所有课程的时间段
+
+        :param term: 学期
+
+        :return: 写入的时间段数量
+        """
+        result = await self.session.execute(
+            select(Course.id, Course.course_date).where(
+                self._term_filter(Course.course_date, term)
+            )
+        )
+        courses = [(course_id, course_date) for course_id, course_date in result.all()]
+
+        await self.session.execute(delete(CourseSlot).where(CourseSlot.term == term))
+        rows = [row for course in courses for row in self.slot_rows(*course)]
+        if rows:
+            await self.session.execute(insert(CourseSlot), rows)
+        return len(rows)
+
+    async def get_courses_at(
+        self, term: str, week_day: int, section: int, week: Optional[int] = None
+    ) -> list[Course]:
+        """
+        查询某个时间段上课的课程
+
+        :param term: 学期
+        :param week_day: 星期
+        :param section: 节次
+        :param week: 周次，不指定时返回整个学期内该时间段的课程
+        """
+        stmt = (
+            select(Course)
+            .join(CourseSlot, CourseSlot.course_id == Course.id)
+            .where(
+                CourseSlot.term == term,
+                CourseSlot.week_day == week_day,
+                CourseSlot.section == section,
+            )
+        )
+        if week is not None:
+            stmt = stmt.where(
+                CourseSlot.start_week <= week, CourseSlot.end_week >= week
+            )
+            if week % 2:
+                stmt = stmt.where(CourseSlot.is_double_week.is_(False))
+
+        result = await self.session.execute(stmt.order_by(Course.id))
+        return result.scalars().all()  # type:ignore
+
+    async def get_busy_teachers(
+        self, term: str, week_day: int, section: int
+    ) -> list[int]:
+        """
+        查询某个时间段有课的教师
+
+        :return: 教师ID列表
+        """
+        result = await self.session.execute(
+            select(Course.teacher)
+            .join(CourseSlot, CourseSlot.course_id == Course.id)
+            .where(
+                CourseSlot.term == term,
+                CourseSlot.week_day == week_day,
+                CourseSlot.section == section,
+                Course.teacher.is_not(None),
+            )
+            .distinct()
+        )
+        return [teacher for teacher in result.scalars() if teacher is not None]
+
+    async def _find_conflicts(self, course_id: int, candidates: Select) -> list[Course]:
+        """
+        在候选课程中查找与目标课程时间冲突的课程
+
+        同一学期、星期、节次且周次区间重叠即视为冲突（单双周按保守处理，不区分奇偶）
+        """
+        target = aliased(CourseSlot)
+        other = aliased(CourseSlot)
+        conflicting = (
+            select(other.course_id)
+            .join(
+                target,
+                and_(
+                    target.term == other.term,
+                    target.week_day == other.week_day,
+                    target.section == other.section,
+                    target.start_week <= other.end_week,
+                    other.start_week <= target.end_week,
+                ),
+            )
+            .where(
+                target.course_id == course_id,
+                other.course_id != course_id,
+                other.course_id.in_(candidates),
+            )
+        )
+        result = await self.session.execute(
+            select(Course).where(Course.id.in_(conflicting)).order_by(Course.id)
+        )
+        return result.scalars().all()  # type:ignore
+
+    async def find_student_conflicts(
+        self, student: User, course_id: int
+    ) -> list[Course]:
+        """
+        查找学生课表（本专业年级的必修课与已选的选修课）中与目标课程时间冲突的课程
+
+        :param student: 学生对象
+        :param course_id: 目标课程ID
+        """
+        candidates = union(
+            select(Selection.course_id).where(
+                Selection.student_id == student.id, Selection.status.is_(True)
+            ),
+            select(Course.id).where(
+                Course.major_no == student.major_no,
+                Course.session == student.session,
+                Course.status == 4,
+                Course.is_public.is_(True),
+                Course.course_type == CourseType.CORE,
+            ),
+        )
+        return await self._find_conflicts(course_id, select(candidates.subquery()))
+
+    async def find_teacher_conflicts(
+        self, teacher: int, course_id: int
+    ) -> list[Course]:
+        """
+        查找教师任教的课程中与目标课程时间冲突的课程
+
+        :param teacher: 教师ID
+        :param course_id: 目标课程ID
+        """
+        return await self._find_conflicts(
+            course_id, select(Course.id).where(Course.teacher == teacher)
+        )
@@ -3,22 +3,36 @@ from typing import Optional
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import cached, invalidates
+from app.core.tracing import traced_methods
+from app.models.course import Course
 from app.models.department import Department
+from app.models.major import Major
+from app.repositories.student_schedule import StudentScheduleRepository
 
 
+@traced_methods
 class DepartmentRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def get_by_dept_no(self, dept_no: str) -> Optional[Department]:
+    async def _fetch_by_dept_no(self, dept_no: str) -> Optional[Department]:
         """
-        通过院系编号获得院系对象
+        从数据库获得院系对象，修改院系前使用，保证对象由当前会话跟踪
         """
         result = await self.session.execute(
             select(Department).where(Department.dept_no == dept_no)
         )
         return result.scalar_one_or_none()
 
+    @cached(Department, ttl=3600, negative_ttl=60, stale_ttl=300)
+    async def get_by_dept_no(self, dept_no: str) -> Optional[Department]:
+        """
+        通过院系编号获得院系对象（只读，可能来自缓存）
+        """
+        return await self._fetch_by_dept_no(dept_no)
+
+    @invalidates(Department)
     async def create_department(
         self,
         dept_name: str,
@@ -38,6 +52,7 @@ class DepartmentRepository:
         await self.session.commit()
         return department
 
+    @invalidates(Department, key="dept_no")
     async def edit_department(
         self,
         dept_no: str,
@@ -51,7 +66,7 @@ class DepartmentRepository:
 
         :return: 返回修改后的 Department 对象，若 Department 不存在返回 None
         """
-        if not (department := await self.get_by_dept_no(dept_no)):
+        if not (department := await self._fetch_by_dept_no(dept_no)):
             return None
 
         department.dept_name = dept_name or department.dept_name
@@ -59,18 +74,32 @@ class DepartmentRepository:
         await self.session.commit()
         return department
 
+    @invalidates(Course)
+    @invalidates(Major)
+    @invalidates(Department, key="dept_no")
     async def delete_department(self, dept_no: str) -> bool:
         """
         删除一个院系
 
+        院系下的专业随之删除，删除后刷新这些专业的课程对应的课程表
+
         :param dept_no: 院系编号
 
         :return: 是否成功
         """
-        if not (department := await self.get_by_dept_no(dept_no)):
+        if not (department := await self._fetch_by_dept_no(dept_no)):
             return False
 
+        result = await self.session.execute(
+            select(Course.id)
+            .join(Major, Major.major_no == Course.major_no)
+            .where(Major.dept_no == dept_no)
+        )
+        course_ids = list(result.scalars().all())
+
         await self.session.delete(department)
+        await self.session.flush()
+        await StudentScheduleRepository(self.session).refresh(courses=course_ids)
         await self.session.commit()
 
         return True
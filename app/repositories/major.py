@@ -4,22 +4,35 @@ from sqlalchemy import func, select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import cached, invalidates
+from app.core.tracing import traced_methods
+from app.models.course import Course
 from app.models.major import Major
+from app.repositories.student_schedule import StudentScheduleRepository
 
 
+@traced_methods
 class MajorRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def get_by_major_no(self, major_no: str) -> Optional[Major]:
+    async def _fetch_by_major_no(self, major_no: str) -> Optional[Major]:
         """
-        通过专业编号获得专业对象
+        从数据库获得专业对象，修改专业前使用，保证对象由当前会话跟踪
         """
         result = await self.session.execute(
             select(Major).where(Major.major_no == major_no)
         )
         return result.scalar_one_or_none()
 
+    @cached(Major, ttl=3600, negative_ttl=60, stale_ttl=300)
+    async def get_by_major_no(self, major_no: str) -> Optional[Major]:
+        """
+        通过专业编号获得专业对象（只读，可能来自缓存）
+        """
+        return await self._fetch_by_major_no(major_no)
+
+    @invalidates(Major)
     async def create_major(
         self,
         major_name: str,
@@ -47,6 +60,7 @@ class MajorRepository:
 
         return major
 
+    @invalidates(Major, key="major_no")
     async def edit_major(
         self,
         major_no: str,
@@ -62,7 +76,7 @@ class MajorRepository:
 
         :return: 返回修改后的 Major 对象，若 Major/Department 不存在返回 None
         """
-        if not (major := await self.get_by_major_no(major_no)):
+        if not (major := await self._fetch_by_major_no(major_no)):
             return None
 
         major.major_name = major_name or major.major_name
@@ -75,18 +89,29 @@ class MajorRepository:
 
         return major
 
+    @invalidates(Course)
+    @invalidates(Major, key="major_no")
     async def delete_major(self, major_no: str) -> bool:
         """
         删除一个专业
 
+        专业下的课程与学生的专业被置空，删除后刷新这些课程对应的课程表
+
         :param major_no: 专业编号
 
         :return: 是否成功
         """
-        if not (major := await self.get_by_major_no(major_no)):
+        if not (major := await self._fetch_by_major_no(major_no)):
             return False
 
+        result = await self.session.execute(
+            select(Course.id).where(Course.major_no == major_no)
+        )
+        course_ids = list(result.scalars().all())
+
         await self.session.delete(major)
+        await self.session.flush()
+        await StudentScheduleRepository(self.session).refresh(courses=course_ids)
         await self.session.commit()
 
         return True
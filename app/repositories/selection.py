@@ -2,14 +2,72 @@
 from typing import List, Optional
 
 from fastapi.exceptions import HTTPException
-from sqlalchemy import func, select
+from sqlalchemy import bindparam, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
+from app.core.cache import cached, invalidate_cache, invalidates
+from app.core.metrics import (
+    ENROLLMENT_DESELECTIONS,
+    ENROLLMENT_FULL_REJECTIONS,
+    ENROLLMENT_SELECTIONS,
+)
+from app.core.tracing import traced_methods
 from app.models.course import Course, CourseType
 from app.models.selection import Selection
+from app.repositories.student_schedule import StudentScheduleRepository
 
+# 预构建的热点查询，复用 SQLAlchemy 编译缓存
+_GET_BY_STUDENT_AND_COURSE = select(Selection).where(
+    Selection.student_id == bindparam("student_id"),
+    Selection.course_id == bindparam("course_id"),
+)
+_GET_COURSE_IDS_BY_STUDENT = select(Selection.course_id).where(
+    Selection.student_id == bindparam("student_id")
+)
+# 在数据库中原子地占用/释放名额，并发选课时不会超额或丢失计数
+_TAKE_SEAT = (
+    update(Course)
+    .where(
+        Course.id == bindparam("course_id"),
+        or_(
+            Course.max_students.is_(None),
+            Course.current_students < Course.max_students,
+        ),
+    )
+    .values(current_students=Course.current_students + 1)
+    .execution_options(synchronize_session=False)
+)
+_RELEASE_SEAT = (
+    update(Course)
+    .where(Course.id == bindparam("course_id"))
+    .values(current_students=Course.current_students - 1)
+    .execution_options(synchronize_session=False)
+)
+_DEACTIVATE_SELECTION = (
+    update(Selection)
+    .where(Selection.id == bindparam("selection_id"), Selection.status.is_(True))
+    .values(status=False)
+    .execution_options(synchronize_session=False)
+)
+_REACTIVATE_SELECTION = (
+    update(Selection)
+    .where(Selection.id == bindparam("selection_id"), Selection.status.is_(False))
+    .values(status=True, selection_time=func.now())
+    .execution_options(synchronize_session=False)
+)
 
+
+def _course_full(course: Course) -> HTTPException:
+    ENROLLMENT_FULL_REJECTIONS.inc()
+    return HTTPException(
+        status_code=400,
+        detail=f"Course {course.course_no} is full. Maximum capacity: {course.max_students}",
+    )
+
+
+@traced_methods
 class SelectionRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
@@ -36,9 +94,8 @@ class SelectionRepository:
         常用于查询是否已经选课
         """
         result = await self.session.execute(
-            select(Selection).where(
-                Selection.student_id == student_id, Selection.course_id == course_id
-            )
+            _GET_BY_STUDENT_AND_COURSE,
+            {"student_id": student_id, "course_id": course_id},
         )
         return result.scalars().first()
 
@@ -73,16 +130,14 @@ class SelectionRepository:
         else:  # pragma: no cover
             return course_date_column["term"] == term
 
-    async def get_available_courses(
-        self, student_id: int, term: str, skip: int = 0, limit: int = 100
-    ) -> List[Course]:
+    @cached(Course, ttl=10, negative_ttl=0, stale_ttl=30, many=True)
+    async def _get_public_electives(self, term: str) -> List[Course]:
         """
-        获取学生可选的课程列表
+        获取学期内所有已发布的公开选修课（与学生无关，选课开放时的热点查询）
+
+        选课和退课只使单门课程的缓存失效，列表中的已选人数最多滞后缓存时间
 
-        :param student_id: 学生 ID
         :param term: 学期
-        :param skip: 跳过记录数值（分页）
-        :param limit: 最大返回记录（分页）
         """
         result = await self.session.execute(
             select(Course)
@@ -91,17 +146,32 @@ class SelectionRepository:
                 Course.status == 4,
                 self._term_filter(Course.course_date, term),
                 Course.course_type == CourseType.ELECTIVE,
-                Course.id.not_in(
-                    select(Selection.course_id).where(
-                        Selection.student_id == student_id
-                    )
-                ),
             )
-            .offset(skip)
-            .limit(limit)
+            .order_by(Course.id)
         )
         return result.scalars().all()  # type:ignore
 
+    async def get_available_courses(
+        self, student_id: int, term: str, skip: int = 0, limit: int = 100
+    ) -> List[Course]:
+        """
+        获取学生可选的课程列表
+
+        公开选修课列表可能来自缓存，再排除学生已选的课程
+
+        :param student_id: 学生 ID
+        :param term: 学期
+        :param skip: 跳过记录数值（分页）
+        :param limit: 最大返回记录（分页）
+        """
+        courses = await self._get_public_electives(term)
+        result = await self.session.execute(
+            _GET_COURSE_IDS_BY_STUDENT, {"student_id": student_id}
+        )
+        selected = set(result.scalars().all())
+        available = [course for course in courses if course.id not in selected]
+        return available[skip : skip + limit]
+
     async def get_selections_by_course_id(
         self, course_id: int, skip: int = 0, limit: int = 100
     ) -> List[Selection]:
@@ -121,6 +191,7 @@ class SelectionRepository:
         )
         return result.scalars().all()  # type:ignore
 
+    @invalidates(Course, key="course_no", lists=False)
     async def create_selection(self, student_id: int, course_no: str) -> Selection:
         """
         创建选课对象（选课）
@@ -141,15 +212,12 @@ class SelectionRepository:
                 status_code=404, detail=f"Course with id {course_no} not found"
             )
 
-        # 检查最大选课限制
+        # 检查最大选课限制（已满时不必占用写锁，最终以占用名额的条件更新为准）
         if (
             course.max_students is not None
             and course.current_students >= course.max_students
         ):
-            raise HTTPException(
-                status_code=400,
-                detail=f"Course {course_no} is full. Maximum capacity: {course.max_students}",
-            )
+            raise _course_full(course)
 
         # 检查为什么必修课也得选
         if course.course_type == CourseType.CORE:
@@ -163,23 +231,47 @@ class SelectionRepository:
             student_id=student_id, course_id=course.id
         )
 
+        already_selected = HTTPException(
+            status_code=400,
+            detail=f"Student {student_id} has already an active selection for course {course_no}",
+        )
         if existing_selection and existing_selection.status:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Student {student_id} has already an active selection for course {course_no}",
-            )
+            raise already_selected
 
-        # 更新课程当前选课人数
-        course.current_students += 1
-        self.session.add(course)
+        # 占用名额，期间被其他请求选满时不更新任何行
+        result = await self.session.execute(_TAKE_SEAT, {"course_id": course.id})
+        if result.rowcount == 0:  # type: ignore
+            raise _course_full(course)
 
-        db_selection = Selection(
-            student_id=student_id,
-            course_id=course.id,
-            status=True,
+        # 每个学生与课程只有一条选课记录（唯一索引），并发的重复选课只有一个请求成功
+        if existing_selection:
+            # 退选后再选，恢复原记录
+            result = await self.session.execute(
+                _REACTIVATE_SELECTION, {"selection_id": existing_selection.id}
+            )
+            duplicate = result.rowcount == 0  # type: ignore
+            db_selection = existing_selection
+        else:
+            db_selection = Selection(
+                student_id=student_id,
+                course_id=course.id,
+                status=True,
+            )
+            self.session.add(db_selection)
+            try:
+                await self.session.flush()
+                duplicate = False
+            except IntegrityError:
+                duplicate = True
+        if duplicate:
+            # 已占用的名额随事务回滚
+            await self.session.rollback()
+            raise already_selected
+        await StudentScheduleRepository(self.session).refresh(
+            students=[student_id], courses=[course.id]
         )
-        self.session.add(db_selection)
         await self.session.commit()
+        ENROLLMENT_SELECTIONS.inc()
         await self.session.refresh(db_selection)
         return db_selection
 
@@ -204,9 +296,18 @@ class SelectionRepository:
 
         # 选中 -> 退课
         if (not new_status) and new_status != db_selection.status:
-            course = db_selection.course
-            course.current_students -= 1
-            self.session.add(course)
+            # 只有仍为选中状态时才释放名额，并发重复退课只生效一次
+            result = await self.session.execute(
+                _DEACTIVATE_SELECTION, {"selection_id": selection_id}
+            )
+            if result.rowcount == 0:  # type: ignore
+                raise HTTPException(
+                    status_code=400,
+                    detail="The modified status cannot be the same as the original status!",
+                )
+            await self.session.execute(
+                _RELEASE_SEAT, {"course_id": db_selection.course_id}
+            )
         elif new_status == db_selection.status:
             raise HTTPException(
                 status_code=400,
@@ -219,8 +320,13 @@ class SelectionRepository:
                 "You need to recreate the course selection",
             )
 
-        db_selection.status = new_status
-        self.session.add(db_selection)
+        await StudentScheduleRepository(self.session).refresh(
+            students=[db_selection.student_id], courses=[db_selection.course_id]
+        )
+        # 提交后课程对象可能已被回收，关系需重新懒加载，提前取出课程编号
+        course_no = db_selection.course.course_no
         await self.session.commit()
+        ENROLLMENT_DESELECTIONS.inc()
         await self.session.refresh(db_selection)
+        await invalidate_cache(Course, course_no, lists=False)
         return db_selection
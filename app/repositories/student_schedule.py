@@ -0,0 +1,204 @@
+from typing import Optional, Sequence, Union
+
+from sqlalchemy import (
+    CompoundSelect,
+    Select,
+    and_,
+    bindparam,
+    delete,
+    func,
+    insert,
+    select,
+    union,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.tracing import traced_methods
+from app.models.course import Course, CourseType
+from app.models.selection import Selection
+from app.models.student_schedule import StudentSchedule
+from app.models.user import User, UserRole
+from app.services.schedule_cache import mark_schedules_stale
+
+IdFilter = Union[Sequence[int], Select]
+"""ID 列表，或返回 ID 的子查询"""
+
+# 课程表只需按 (学生, 学期) 走索引查找，与方言无关
+_GET_SCHEDULE = (
+    select(Course)
+    .join(StudentSchedule, StudentSchedule.course_id == Course.id)
+    .where(
+        StudentSchedule.student_id == bindparam("student_id"),
+        StudentSchedule.term == bindparam("term"),
+    )
+    .order_by(Course.id)
+)
+
+
+def _term_expr(dialect: str, course_date_column):
+    """
+    从课程时间中取出学期
+    """
+    if dialect == "mysql":
+        return course_date_column.op("->>")("$.term")
+    elif dialect == "sqlite":
+        return func.json_extract(course_date_column, "$.term")
+    else:  # pragma: no cover
+        return course_date_column["term"].as_string()
+
+
+def schedule_projection(
+    dialect: str,
+    students: Optional[IdFilter] = None,
+    courses: Optional[IdFilter] = None,
+    term: Optional[str] = None,
+) -> CompoundSelect:
+    """
+    构建课程表投影查询，结果列为 (student_id, course_id, term)
+
+    :param dialect: 数据库方言
+    :param students: 只计算这些学生
+    :param courses: 只计算这些课程
+    :param term: 只计算该学期
+    """
+    course_term = _term_expr(dialect, Course.course_date)
+
+    # 必修课
+    core = (
+        select(User.id, Course.id, course_term)
+        .join(
+            Course,
+            and_(Course.major_no == User.major_no, Course.session == User.session),
+        )
+        .where(
+            User.role == UserRole.student,
+            Course.status == 4,
+            Course.is_public.is_(True),
+            Course.course_type == CourseType.CORE,
+            course_term.is_not(None),
+        )
+    )
+
+    # 选修课
+    elective = (
+        select(Selection.student_id, Selection.course_id, course_term)
+        .join(Course, Course.id == Selection.course_id)
+        .where(Selection.status.is_(True), course_term.is_not(None))
+    )
+
+    if students is not None:
+        core = core.where(User.id.in_(students))
+        elective = elective.where(Selection.student_id.in_(students))
+    if courses is not None:
+        core = core.where(Course.id.in_(courses))
+        elective = elective.where(Course.id.in_(courses))
+    if term is not None:
+        core = core.where(course_term == term)
+        elective = elective.where(course_term == term)
+
+    return union(core, elective)
+
+
+@traced_methods
+class StudentScheduleRepository:
+    """
+    学生课程表仓库
+
+    写入方法不提交事务，由调用方与引起变更的修改一并提交，保证课程表与源数据一致
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def _insert_projection(self, projection: CompoundSelect) -> int:
+        result = await self.session.execute(
+            insert(StudentSchedule).from_select(
+                ["student_id", "course_id", "term"], projection
+            )
+        )
+        return result.rowcount  # type: ignore
+
+    async def refresh(
+        self,
+        students: Optional[IdFilter] = None,
+        courses: Optional[IdFilter] = None,
+    ):
+        """
+        重新计算部分学生、部分课程的课程表行
+
+        同时指定时只计算两者的交集，例如选课/退课只需刷新一行
+
+        :param students: 学生ID列表或子查询
+        :param courses: 课程ID列表或子查询
+        """
+        if students is None and courses is None:
+            raise ValueError("students or courses must be specified")
+
+        stmt = delete(StudentSchedule)
+        if students is not None:
+            stmt = stmt.where(StudentSchedule.student_id.in_(students))
+        if courses is not None:
+            stmt = stmt.where(StudentSchedule.course_id.in_(courses))
+        await self.session.execute(stmt)
+
+        dialect = self.session.get_bind().dialect.name
+        await self._insert_projection(
+            schedule_projection(dialect, students=students, courses=courses)
+        )
+        await self._mark_stale(students, courses)
+
+    async def _mark_stale(
+        self, students: Optional[IdFilter], courses: Optional[IdFilter]
+    ):
+        """
+        登记课程表缓存的失效范围
+
+        指定了学生时只需失效这些学生的课程表；只指定课程时，除了包含这些课程的课程表，
+        还需失效课程所属专业年级的课程表（新公开的必修课尚不在任何缓存中）
+        """
+        if students is not None:
+            student_ids: Sequence[int] = (
+                (await self.session.execute(students)).scalars().all()
+                if isinstance(students, Select)
+                else students
+            )
+            mark_schedules_stale(self.session, students=student_ids)
+            return
+
+        result = await self.session.execute(
+            select(Course.id, Course.major_no, Course.session).where(
+                Course.id.in_(courses)  # type: ignore
+            )
+        )
+        rows = result.all()
+        mark_schedules_stale(
+            self.session,
+            courses=[course_id for course_id, _, _ in rows],
+            cohorts=[(major_no, session) for _, major_no, session in rows],
+        )
+
+    async def rebuild_term(self, term: str) -> int:
+        """
+        重建一个学期所有学生的课程表
+
+        :param term: 学期
+
+        :return: 写入的行数
+        """
+        await self.session.execute(
+            delete(StudentSchedule).where(StudentSchedule.term == term)
+        )
+        dialect = self.session.get_bind().dialect.name
+        return await self._insert_projection(schedule_projection(dialect, term=term))
+
+    async def get_courses(self, student_id: int, term: str) -> list[Course]:
+        """
+        获取学生某个学期的课程
+
+        :param student_id: 学生ID
+        :param term: 学期
+        """
+        result = await self.session.execute(
+            _GET_SCHEDULE, {"student_id": student_id, "term": term}
+        )
+        return result.scalars().all()  # type:ignore
@@ -1,15 +1,22 @@
 from typing import Optional
 
-from sqlalchemy import func, select
+from sqlalchemy import bindparam, func, select, update
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import aliased
 
-from app.models.course import Course, CourseType
+from app.core.cache import invalidates
+from app.core.tracing import traced_methods
+from app.models.course import Course
 from app.models.selection import Selection
 from app.models.user import User, UserRole
+from app.repositories.student_schedule import StudentScheduleRepository
 
+# 热点查询预先构建为带绑定参数的语句：语句对象的缓存键只计算一次，
+# 编译结果可在 SQLAlchemy 编译缓存中复用，每次调用只需传入参数
+_GET_BY_NAME = select(User).where(User.username == bindparam("username"))
 
+
+@traced_methods
 class UserRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
@@ -18,9 +25,7 @@ class UserRepository:
         """
         通过用户名获得用户对象
         """
-        result = await self.session.execute(
-            select(User).where(User.username == username)
-        )
+        result = await self.session.execute(_GET_BY_NAME, {"username": username})
         return result.scalar_one_or_none()
 
     async def get_addition_order(self, prefix: str) -> int:
@@ -86,6 +91,11 @@ class UserRepository:
 
         try:
             self.session.add(user)
+            if role == UserRole.student:
+                await self.session.flush()
+                await StudentScheduleRepository(self.session).refresh(
+                    students=[user.id]
+                )
             await self.session.commit()
         except IntegrityError:
             return None
@@ -115,6 +125,7 @@ class UserRepository:
         :param major_no: 专业ID
         :param class_number: 班级ID
         """
+        schedule_key = (user.role, user.session, user.major_no)
         user.name = name or user.name
         user.role = role or user.role
         user.status = status or user.status
@@ -124,12 +135,84 @@ class UserRepository:
         user.class_number = class_number or user.class_number
 
         try:
+            if (user.role, user.session, user.major_no) != schedule_key:
+                await StudentScheduleRepository(self.session).refresh(
+                    students=[user.id]
+                )
             await self.session.commit()
         except IntegrityError:
             return False
 
         return True
 
+    async def update_cohort(
+        self,
+        session: Optional[int] = None,
+        dept_no: Optional[str] = None,
+        major_no: Optional[str] = None,
+        class_number: Optional[int] = None,
+        *,
+        status: Optional[bool] = None,
+        new_major_no: Optional[str] = None,
+        new_class_number: Optional[int] = None,
+    ) -> Optional[list[str]]:
+        """
+        批量修改一个群体（届/院系/专业/班级）内所有用户的信息
+
+        先锁定并取出受影响的用户名（用于吊销 token），再以单条 UPDATE 完成修改
+
+        :param session: 按届号过滤
+        :param dept_no: 按院系ID过滤
+        :param major_no: 按专业ID过滤
+        :param class_number: 按班级ID过滤
+        :param status: 新的用户状态(正常/禁用)
+        :param new_major_no: 新的专业ID
+        :param new_class_number: 新的班级ID
+
+        :return: 受影响的用户名列表。专业不存在导致更新失败时返回 None
+        """
+        filters = []
+        if session is not None:
+            filters.append(User.session == session)
+        if dept_no is not None:
+            filters.append(User.dept_no == dept_no)
+        if major_no is not None:
+            filters.append(User.major_no == major_no)
+        if class_number is not None:
+            filters.append(User.class_number == class_number)
+
+        values: dict = {}
+        if status is not None:
+            values["status"] = status
+        if new_major_no is not None:
+            values["major_no"] = new_major_no
+        if new_class_number is not None:
+            values["class_number"] = new_class_number
+
+        if not filters or not values:
+            return []
+
+        result = await self.session.execute(
+            select(User.username).where(*filters).with_for_update()
+        )
+        usernames = list(result.scalars().all())
+        if not usernames:
+            await self.session.rollback()
+            return []
+
+        try:
+            await self.session.execute(update(User).where(*filters).values(**values))
+            if new_major_no is not None:
+                await StudentScheduleRepository(self.session).refresh(
+                    students=select(User.id).where(User.username.in_(usernames))
+                )
+            await self.session.commit()
+        except IntegrityError:
+            await self.session.rollback()
+            return None
+
+        return usernames
+
     async def change_password(self, user: User, new_password: str):
         """
         修改用户密码
@@ -140,75 +223,37 @@ class UserRepository:
         user.password = new_password
         await self.session.commit()
 
-    def _term_filter(self, course_date_column, term: str):
-        """
-        term json 对象过滤器
-        """
-        bind = self.session.get_bind()
-        if bind.dialect.name == "mysql":
-            return course_date_column.op("->>")("$.term") == term
-        elif bind.dialect.name == "sqlite":
-            return func.json_extract(course_date_column, "$.term") == term
-        else:  # pragma: no cover
-            return course_date_column["term"] == term
-
     async def get_schedule(self, user: User, term: str) -> list[Course]:
         """
         获取用户的课程表
 
+        从物化的 `student_schedule` 中按 (学生, 学期) 查找
+
         :param user: 用户对象
         :param term: 学期
         """
-        major_no = user.major_no
-        session = user.session
-
-        # 获取必修课
-        core_courses_stmt = select(Course).where(
-            Course.major_no == major_no,
-            Course.session == session,
-            self._term_filter(Course.course_date, term),
-            Course.status == 4,
-            Course.is_public.is_(True),
-            Course.course_type == CourseType.CORE,
-        )
-
-        # 获取选修课
-        elective_selections_result = await self.session.execute(
-            select(Selection.course_id).where(
-                Selection.student_id == user.id,
-                Selection.status.is_(True),
-            )
-        )
-        elective_course_ids = elective_selections_result.scalars().all()
-
-        elective_courses_stmt = None
-        if elective_course_ids:
-            elective_courses_stmt = select(Course).where(
-                Course.id.in_(elective_course_ids),
-                self._term_filter(Course.course_date, term),
-            )
-
-        # 组合查询
-        if elective_courses_stmt is not None:
-            combined_stmt = core_courses_stmt.union(elective_courses_stmt)
-        else:
-            combined_stmt = core_courses_stmt
-
-        # 将 union 查询包装在 CTE 中，然后从 CTE 中选择 Course 实体
-        course_schedule_cte = combined_stmt.cte("course_schedule_cte")
-        course_alias = aliased(Course, alias=course_schedule_cte)
-        final_query = select(course_alias)
-
-        result = await self.session.execute(final_query)
-        courses = result.scalars().all()
-
-        return courses  # type:ignore
+        return await StudentScheduleRepository(self.session).get_courses(user.id, term)
 
+    @invalidates(Course)
     async def delete_user(self, user: User):
         """
         删除用户
 
+        用户的选课记录由数据库 ON DELETE CASCADE 删除，
+        删除前以单条 UPDATE 归还该学生在所有课程中占用的名额
+
         :param user: 用户对象
         """
+        await self.session.execute(
+            update(Course)
+            .where(
+                Course.id.in_(
+                    select(Selection.course_id).where(
+                        Selection.student_id == user.id, Selection.status.is_(True)
+                    )
+                )
+            )
+            .values(current_students=Course.current_students - 1)
+        )
         await self.session.delete(user)
         await self.session.commit()
@@ -32,3 +32,13 @@ class RegisterResponse(BaseModel):
     name: str = Field(..., description="用户名")
     username: str = Field(..., description="账号ID")
     password: Optional[str] = Field(default=None, description="密码")
+
+
+class CohortEditRequest(BaseModel):
+    session: Optional[int] = Field(default=None, description="按学年过滤")
+    dept_no: Optional[str] = Field(default=None, description="按院系编号过滤")
+    major_no: Optional[str] = Field(default=None, description="按专业编号过滤")
+    class_number: Optional[int] = Field(default=None, description="按班级号过滤")
+    status: Optional[bool] = Field(default=None, description="新的用户状态")
+    new_major_no: Optional[str] = Field(default=None, description="新的专业编号")
+    new_class_number: Optional[int] = Field(default=None, description="新的班级号")
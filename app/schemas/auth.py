@@ -24,6 +24,8 @@ class Payload:
     """用户名"""
     exp: Optional[int] = None
     """过期时间"""
+    iat: Optional[float] = None
+    """签发时间（精确到毫秒，用于按用户批量吊销 token）"""
     jti: str = field(default_factory=lambda: uuid4().hex)
     """JWT ID"""
 
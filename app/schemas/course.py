@@ -26,3 +26,9 @@ class CourseUpdateRequest(BaseModel):
     credit: Optional[float] = None
     is_public: Optional[bool] = None
     max_students: Optional[int] = None
+
+
+class CourseBatchStatusRequest(BaseModel):
+    course_nos: list[str]
+    status: int
+    reason: Optional[str] = None
@@ -1,17 +1,25 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Callable, Optional, TypeVar
 
 import jwt
 from passlib import pwd
 from passlib.context import CryptContext
 
 from app.core.config import config
+from app.core.metrics import BCRYPT_QUEUE_DEPTH
 from app.models.user import User
 from app.repositories.user import UserRepository
 from app.schemas.auth import Payload
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+_bcrypt_executor = ThreadPoolExecutor(
+    max_workers=config.bcrypt_workers, thread_name_prefix="bcrypt"
+)
+T = TypeVar("T")
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
@@ -30,6 +38,33 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def _run_bcrypt(func: Callable[..., T], *args) -> T:
+    """
+    在线程池中执行 bcrypt（哈希期间释放 GIL），不阻塞事件循环，排队数记入 `bcrypt_queue_depth`
+    """
+    BCRYPT_QUEUE_DEPTH.inc()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(
+            _bcrypt_executor, func, *args
+        )
+    finally:
+        BCRYPT_QUEUE_DEPTH.dec()
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    在线程池中验证密码有效性，请求处理中使用
+    """
+    return await _run_bcrypt(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """
+    在线程池中获得密码哈希，请求处理中使用
+    """
+    return await _run_bcrypt(get_password_hash, password)
+
+
 def create_access_token(
     payload: Payload, expires_delta: Optional[timedelta] = None
 ) -> str:
@@ -39,7 +74,9 @@ def create_access_token(
     :param payload: jwt payload
     :parm expires_delta: 过期时间，默认15分钟
     """
-    expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=15))
+    now = datetime.now(timezone.utc)
+    expire = now + (expires_delta or timedelta(minutes=15))
+    payload.iat = round(now.timestamp(), 3)
     payload.exp = int(expire.timestamp())
     return jwt.encode(payload.to_json(), config.secret_key, algorithm=config.algorithm)
 
@@ -51,7 +88,7 @@ async def authenticate_user(
     登录用户鉴权
     """
     user = await userdb.get_by_name(username)
-    if user and verify_password(password, user.password):
+    if user and await verify_password_async(password, user.password):
         return user
     return None
 
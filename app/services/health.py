@@ -0,0 +1,176 @@
+"""
+存活与就绪检查
+
+存活检查只说明进程与事件循环仍在响应；就绪检查供负载均衡判断是否向该进程转发请求:
+启动预热完成前与开始退出后、数据库或 Redis 探测失败或超时、连接池已满、事件循环延迟过高时均返回未就绪
+"""
+
+import asyncio
+import enum
+import signal
+import time
+from collections.abc import Callable
+from typing import Any, Optional
+
+from sqlalchemy import Connection, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.pool import QueuePool
+
+from app.core.config import config
+from app.core.logger import logger
+from app.core.redis import get_shared_redis_client
+from app.core.sql import pool_status
+
+LOOP_LAG_INTERVAL = 0.5
+"""事件循环延迟的测量间隔（秒）"""
+
+
+class Phase(str, enum.Enum):
+    starting = "starting"
+    ready = "ready"
+    draining = "draining"
+
+
+class HealthState:
+    """
+    进程的生命周期阶段与最近一次测得的事件循环延迟
+    """
+
+    def __init__(self):
+        self.phase = Phase.starting
+        self.loop_lag_ms = 0.0
+
+    def mark_ready(self):
+        self.phase = Phase.ready
+        logger.info("启动完成，开始接受流量")
+
+    def mark_draining(self):
+        self.phase = Phase.draining
+        logger.info("开始退出，就绪检查返回未就绪")
+
+
+health_state = HealthState()
+
+
+def install_drain_handler(
+    delay: float, state: HealthState = health_state
+) -> Callable[[], None]:
+    """
+    接管 SIGTERM：收到后先标记为退出中，`delay` 秒后再交给原处理器（uvicorn 由此停止接受连接）。
+    uvicorn 在关闭阶段才执行 lifespan 的退出部分，此时已不再接受请求，需要在此之前让就绪检查返回未就绪
+
+    :param delay: 标记退出中到停止接受连接的等待时间（秒）
+    :param state: 进程状态
+
+    :return: 恢复原处理器的函数
+    """
+    loop = asyncio.get_running_loop()
+    previous = signal.getsignal(signal.SIGTERM)
+    timer: Optional[asyncio.TimerHandle] = None
+
+    def forward():
+        signal.signal(signal.SIGTERM, previous)
+        signal.raise_signal(signal.SIGTERM)
+
+    def drain():
+        nonlocal timer
+        if timer is None:
+            state.mark_draining()
+            timer = loop.call_later(delay, forward)
+        else:  # 等待期间再次收到 SIGTERM，立即停止
+            timer.cancel()
+            forward()
+
+    def restore():
+        if timer:
+            timer.cancel()
+        signal.signal(signal.SIGTERM, previous)
+
+    # 信号处理函数可能打断持有日志锁的代码，标记与日志交给事件循环执行
+    signal.signal(
+        signal.SIGTERM, lambda signum, frame: loop.call_soon_threadsafe(drain)
+    )
+    return restore
+
+
+async def run_loop_lag_monitor(state: HealthState = health_state):
+    """
+    定时测量事件循环延迟（定时器实际唤醒时间与预期的差值），直到任务被取消
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        state.loop_lag_ms = max(0.0, (loop.time() - start - LOOP_LAG_INTERVAL) * 1000)
+
+
+async def _probe(coro, timeout: float) -> dict[str, Any]:
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(coro, timeout)
+    except asyncio.TimeoutError:
+        return {"ok": False, "error": "timeout"}
+    except Exception as e:
+        return {"ok": False, "error": str(e) or type(e).__name__}
+    return {"ok": True, "latency_ms": round((time.perf_counter() - start) * 1000, 3)}
+
+
+async def check_database(session: AsyncSession, timeout: float) -> dict[str, Any]:
+    """
+    检查连接池是否还有可用连接，并在超时时间内获取连接执行 `SELECT 1`
+    """
+    engine = session.get_bind()
+    if isinstance(engine, Connection):
+        engine = engine.engine
+    pool = engine.pool
+    if (
+        isinstance(pool, QueuePool)
+        and pool._max_overflow >= 0
+        and pool.checkedout() >= pool.size() + pool._max_overflow
+    ):
+        result: dict[str, Any] = {"ok": False, "error": "pool exhausted"}
+    else:
+        result = await _probe(session.execute(text("SELECT 1")), timeout)
+    result["pool"] = pool_status(engine)  # type: ignore
+    return result
+
+
+async def check_redis(timeout: float) -> dict[str, Any]:
+    return await _probe(get_shared_redis_client().ping(), timeout)
+
+
+async def check_loop_lag(state: HealthState) -> dict[str, Any]:
+    """
+    取后台测量值与本次从让出到恢复执行的耗时中的较大值
+    """
+    start = time.perf_counter()
+    await asyncio.sleep(0)
+    lag_ms = max(state.loop_lag_ms, (time.perf_counter() - start) * 1000)
+    return {
+        "ok": lag_ms <= config.health_max_loop_lag_ms,
+        "lag_ms": round(lag_ms, 3),
+    }
+
+
+async def check_readiness(
+    session: AsyncSession, state: HealthState = health_state
+) -> tuple[bool, dict[str, Any]]:
+    """
+    就绪检查
+
+    :param session: 主库会话
+    :param state: 进程状态
+
+    :return: 是否就绪，以及各项检查结果
+    """
+    timeout = config.health_probe_timeout_ms / 1000
+    database, redis, loop_lag = await asyncio.gather(
+        check_database(session, timeout),
+        check_redis(timeout),
+        check_loop_lag(state),
+    )
+    checks = {"database": database, "redis": redis, "loop_lag": loop_lag}
+    ready = state.phase == Phase.ready and all(check["ok"] for check in checks.values())
+    if state.phase == Phase.ready and not ready:
+        logger.warning("就绪检查未通过: %s", checks)
+    return ready, {"phase": state.phase.value, "checks": checks}
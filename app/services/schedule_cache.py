@@ -0,0 +1,216 @@
+"""
+学生课程表缓存
+
+`/api/student/schedule` 的旁路缓存，以 (学生, 学期) 为键保存已序列化的 JSON，命中时跳过 ORM 与序列化。
+每条缓存同时登记到三类反向索引集合中，修改只使依赖它的课程表失效:
+
+- 学生 -> 课程表：学生选课/退课、转专业
+- 课程 -> 课程表：课程修改、删除、状态变更
+- 专业与年级 -> 课程表：必修课新出现在某个专业年级的课程表中
+
+仓库在修改数据时通过 `mark_schedules_stale` 在会话上登记失效范围，事务提交后由
+`ScheduleCacheMiddleware` 在响应发出前统一删除缓存。只读副本延迟等原因写入的旧数据由缓存过期时间兜底
+"""
+
+import json
+from collections.abc import Iterable, Iterator, Sequence
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Optional, Union
+
+from fastapi.encoders import jsonable_encoder
+from redis.asyncio import Redis
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.user import User
+
+SCHEDULE_PREFIX = "schedule:"
+STUDENT_DEPS_PREFIX = "schedule_deps:student:"
+COURSE_DEPS_PREFIX = "schedule_deps:course:"
+COHORT_DEPS_PREFIX = "schedule_deps:cohort:"
+
+Cohort = tuple[Optional[str], int]
+"""(专业编号, 年级)"""
+
+
+@dataclass
+class StaleSchedules:
+    """
+    待失效的课程表范围
+    """
+
+    students: set[int] = field(default_factory=set)
+    """学生ID"""
+    courses: set[int] = field(default_factory=set)
+    """课程ID"""
+    cohorts: set[Cohort] = field(default_factory=set)
+    """(专业编号, 年级)"""
+
+    def update(self, other: "StaleSchedules"):
+        self.students |= other.students
+        self.courses |= other.courses
+        self.cohorts |= other.cohorts
+
+    def clear(self):
+        self.students.clear()
+        self.courses.clear()
+        self.cohorts.clear()
+
+    def dependency_keys(self) -> list[str]:
+        return [
+            *(f"{STUDENT_DEPS_PREFIX}{student_id}" for student_id in self.students),
+            *(f"{COURSE_DEPS_PREFIX}{course_id}" for course_id in self.courses),
+            *(_cohort_key(cohort) for cohort in self.cohorts),
+        ]
+
+    def __bool__(self) -> bool:
+        return bool(self.students or self.courses or self.cohorts)
+
+
+_pending: ContextVar[Optional[StaleSchedules]] = ContextVar(
+    "pending_stale_schedules", default=None
+)
+
+
+def _cohort_key(cohort: Cohort) -> str:
+    major_no, session = cohort
+    return f"{COHORT_DEPS_PREFIX}{major_no or ''}:{session}"
+
+
+def _schedule_key(student_id: int, term: str) -> str:
+    return f"{SCHEDULE_PREFIX}{student_id}:{term}"
+
+
+def mark_schedules_stale(
+    session: Union[AsyncSession, Session],
+    students: Iterable[int] = (),
+    courses: Iterable[int] = (),
+    cohorts: Iterable[Cohort] = (),
+):
+    """
+    在会话上登记待失效的课程表，事务提交后才会生效，回滚则丢弃
+
+    :param students: 学生ID
+    :param courses: 课程ID
+    :param cohorts: (专业编号, 年级)
+    """
+    stale: StaleSchedules = session.info.setdefault("stale_schedules", StaleSchedules())
+    stale.students.update(students)
+    stale.courses.update(courses)
+    stale.cohorts.update(cohorts)
+
+
+@event.listens_for(Session, "after_commit")
+def _collect_on_commit(session: Session):
+    stale = session.info.pop("stale_schedules", None)
+    if stale and (collector := _pending.get()) is not None:
+        collector.update(stale)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session: Session):
+    session.info.pop("stale_schedules", None)
+
+
+@contextmanager
+def collect_stale_schedules() -> Iterator[StaleSchedules]:
+    """
+    收集当前上下文中已提交事务登记的待失效课程表
+    """
+    stale = StaleSchedules()
+    token = _pending.set(stale)
+    try:
+        yield stale
+    finally:
+        _pending.reset(token)
+
+
+def serialize_schedule(courses: Sequence[Any]) -> str:
+    """
+    按 FastAPI 默认的 JSON 响应格式序列化课程表
+    """
+    return json.dumps(
+        jsonable_encoder(courses),
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    )
+
+
+async def get_cached_schedule(
+    redis_client: Redis, student_id: int, term: str
+) -> Optional[str]:
+    """
+    获取缓存的课程表 JSON
+
+    :param student_id: 学生ID
+    :param term: 学期
+    """
+    return await redis_client.get(_schedule_key(student_id, term))
+
+
+async def cache_schedule(
+    redis_client: Redis,
+    student: User,
+    term: str,
+    courses: Sequence[Any],
+    expires_in: int,
+) -> str:
+    """
+    序列化并缓存课程表，同时登记其依赖的学生、课程与专业年级
+
+    缓存与依赖集合在一次 pipeline 往返中写入，依赖集合的过期时间随最新写入的缓存延长
+
+    :param student: 学生对象
+    :param term: 学期
+    :param courses: 课程列表
+    :param expires_in: 过期时间（秒），不大于 0 时只序列化不缓存
+
+    :return: 课程表 JSON
+    """
+    payload = serialize_schedule(courses)
+    if expires_in <= 0:
+        return payload
+
+    member = f"{student.id}:{term}"
+    dependencies = StaleSchedules(
+        students={student.id},
+        courses={course.id for course in courses},
+        cohorts={(student.major_no, student.session)},
+    )
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.set(_schedule_key(student.id, term), payload, ex=expires_in)
+        for key in dependencies.dependency_keys():
+            pipe.sadd(key, member)
+            pipe.expire(key, expires_in)
+        await pipe.execute()
+    return payload
+
+
+async def invalidate_schedules(redis_client: Redis, stale: StaleSchedules) -> int:
+    """
+    删除依赖于给定学生、课程或专业年级的课程表缓存
+
+    先通过一次 pipeline 读取所有依赖集合，再一次性删除缓存与这些依赖集合
+
+    :return: 实际删除的课程表缓存数量
+    """
+    dependency_keys = stale.dependency_keys()
+    if not dependency_keys:
+        return 0
+
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for key in dependency_keys:
+            pipe.smembers(key)
+        results = await pipe.execute()
+
+    members: set[str] = set().union(*results)
+    async with redis_client.pipeline(transaction=False) as pipe:
+        if members:
+            pipe.delete(*(SCHEDULE_PREFIX + member for member in members))
+        pipe.delete(*dependency_keys)
+        results = await pipe.execute()
+    return results[0] if members else 0
@@ -0,0 +1,126 @@
+import asyncio
+import time
+from dataclasses import asdict, dataclass
+
+from sqlalchemy import and_, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import invalidate_cache
+from app.core.logger import logger
+from app.core.sql import async_session, close_db
+from app.models.course import Course
+from app.models.selection import Selection
+
+
+@dataclass
+class ReconcileReport:
+    """
+    选课人数校准结果
+    """
+
+    checked: int
+    """检查的课程数"""
+    drifted: int
+    """计数与实际选课数不一致的课程数"""
+    total_drift: int
+    """所有课程偏差绝对值之和"""
+    max_drift: int
+    """单门课程最大偏差绝对值"""
+    elapsed_ms: float
+    """耗时（毫秒）"""
+
+    def to_json(self):
+        return asdict(self)
+
+
+async def reconcile_seat_counters(session: AsyncSession) -> ReconcileReport:
+    """
+    校准所有课程的 `current_students` 计数
+
+    通过一次 GROUP BY 统计每门课程的有效选课数，并对不一致的课程执行单条批量 UPDATE。
+    UPDATE 使用关联子查询在写入时重新计数，因此校准期间发生的选课/退课不会被覆盖为旧值
+
+    :param session: 数据库会话
+
+    :return: 校准结果
+    """
+    start = time.perf_counter()
+
+    result = await session.execute(
+        select(Course.id, Course.current_students, func.count(Selection.id))
+        .outerjoin(
+            Selection,
+            and_(Selection.course_id == Course.id, Selection.status.is_(True)),
+        )
+        .group_by(Course.id, Course.current_students)
+    )
+
+    checked = 0
+    drifted_ids: list[int] = []
+    total_drift = max_drift = 0
+    for course_id, current_students, active in result.all():
+        checked += 1
+        drift = abs((current_students or 0) - active)
+        if drift:
+            drifted_ids.append(course_id)
+            total_drift += drift
+            max_drift = max(max_drift, drift)
+
+    if drifted_ids:
+        await session.execute(
+            update(Course)
+            .where(Course.id.in_(drifted_ids))
+            .values(
+                current_students=select(func.count(Selection.id))
+                .where(Selection.course_id == Course.id, Selection.status.is_(True))
+                .scalar_subquery()
+            )
+            .execution_options(synchronize_session="fetch")
+        )
+        await session.commit()
+        await invalidate_cache(Course)
+
+    report = ReconcileReport(
+        checked=checked,
+        drifted=len(drifted_ids),
+        total_drift=total_drift,
+        max_drift=max_drift,
+        elapsed_ms=round((time.perf_counter() - start) * 1000, 3),
+    )
+
+    if report.drifted:
+        logger.warning("选课人数校准完成，修正了 %s 门课程: %s", report.drifted, report)
+    else:
+        logger.debug("选课人数校准完成，未发现偏差: %s", report)
+
+    return report
+
+
+async def run_seat_reconciler(interval: int):
+    """
+    定时执行选课人数校准，直到任务被取消
+
+    :param interval: 执行间隔（秒）
+    """
+    logger.info("选课人数校准任务已启动，间隔 %s 秒", interval)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with async_session() as session:
+                await reconcile_seat_counters(session)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("选课人数校准任务执行失败: %s", e)
+
+
+if __name__ == "__main__":
+
+    async def main():
+        async with async_session() as session:
+            report = await reconcile_seat_counters(session)
+        await close_db()
+        return report
+
+    report = asyncio.run(main())
+    logger.info("选课人数校准结果: %s", report.to_json())
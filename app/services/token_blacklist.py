@@ -1,6 +1,10 @@
+import time
+from typing import Iterable, Optional
+
 from redis.asyncio import Redis
 
 BLACKLIST_PREFIX = "token_blacklist:"
+REVOKED_BEFORE_PREFIX = "token_revoked_before:"
 
 
 async def add_token_to_blacklist(redis_client: Redis, jti: str, expires_in: int):
@@ -22,3 +26,51 @@ async def is_token_blacklisted(redis_client: Redis, jti: str) -> bool:
     """
     key = BLACKLIST_PREFIX + jti
     return await redis_client.exists(key) == 1
+
+
+async def revoke_user_tokens(
+    redis_client: Redis, usernames: Iterable[str], expires_in: int
+) -> int:
+    """
+    吊销指定用户在此刻之前签发的所有 token
+
+    为每个用户记录一个吊销时间戳，所有写入通过一次 pipeline 往返完成
+
+    :param usernames: 用户名列表
+    :param expires_in: 吊销记录的过期时间（秒），应不小于 token 的有效期
+
+    :return: 被吊销的用户数量
+    """
+    revoked_at = str(time.time())
+    count = 0
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for username in usernames:
+            pipe.set(REVOKED_BEFORE_PREFIX + username, revoked_at, ex=expires_in)
+            count += 1
+        if count:
+            await pipe.execute()
+    return count
+
+
+async def is_token_revoked(
+    redis_client: Redis, jti: str, username: str, issued_at: Optional[float]
+) -> bool:
+    """
+    检查 token 是否已登出或已被按用户吊销
+
+    黑名单与吊销时间戳在同一次 pipeline 往返中查询
+
+    :param jti: jwt secret
+    :param username: token 所属用户名
+    :param issued_at: token 签发时间，缺失时视为早于任意吊销记录
+    """
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.exists(BLACKLIST_PREFIX + jti)
+        pipe.get(REVOKED_BEFORE_PREFIX + username)
+        blacklisted, revoked_before = await pipe.execute()
+
+    if blacklisted:
+        return True
+    if revoked_before is None:
+        return False
+    return issued_at is None or issued_at <= float(revoked_before)
@@ -0,0 +1,110 @@
+"""
+日志对请求吞吐的影响
+
+用一个与业务接口相同日志量（每个请求 3 条 INFO）的最小 FastAPI 应用，通过 ASGI 直接发起请求（不经过网络），
+对比不记录日志、同步写文件（旧写法，处理器在事件循环中执行）与队列 + 后台线程写文件三种情况下的每秒请求数。
+本地临时目录写入通常只落到页缓存，可以用 `--latency` 模拟磁盘繁忙或网络文件系统上每次写入的延迟
+
+用法: python -m benchmarks.logging_throughput [-n 3000] [--latency 0.5]
+"""
+
+import argparse
+import asyncio
+import logging
+import queue
+import tempfile
+import time
+from logging.handlers import QueueListener
+from pathlib import Path
+
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.core.logger import BoundedQueueHandler
+
+FORMAT = "[%(asctime)s] [%(name)s] [%(levelname)s] %(funcName)s: %(message)s"
+
+bench_logger = logging.getLogger("bench")
+bench_logger.setLevel(logging.DEBUG)
+bench_logger.propagate = False
+
+app = FastAPI()
+
+
+@app.post("/select")
+async def select_course(course_no: str):
+    bench_logger.info("收到学生选课请求: %s, 课程编号: %s", "bench", course_no)
+    bench_logger.info("选课成功: %s", course_no)
+    bench_logger.info("学生选课请求处理成功")
+    return {"msg": "ok"}
+
+
+async def _run(number: int) -> float:
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(50):
+            await client.post("/select", params={"course_no": "CS001"})
+
+        start = time.perf_counter()
+        for _ in range(number):
+            await client.post("/select", params={"course_no": "CS001"})
+        return number / (time.perf_counter() - start)
+
+
+class _SlowFileHandler(logging.FileHandler):
+    def __init__(self, path: Path, latency: float):
+        super().__init__(path, encoding="utf-8")
+        self.latency = latency
+
+    def emit(self, record: logging.LogRecord):
+        super().emit(record)
+        if self.latency:
+            time.sleep(self.latency)
+
+
+def _file_handler(path: Path, latency: float) -> logging.Handler:
+    handler = _SlowFileHandler(path, latency)
+    handler.setFormatter(logging.Formatter(FORMAT))
+    return handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", "--number", type=int, default=3000, help="每组请求数")
+    parser.add_argument(
+        "--latency", type=float, default=0, help="模拟每次写入的延迟（毫秒）"
+    )
+    args = parser.parse_args()
+    latency = args.latency / 1000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = []
+
+        bench_logger.disabled = True
+        results.append(("off", asyncio.run(_run(args.number))))
+        bench_logger.disabled = False
+
+        handler = _file_handler(Path(tmp) / "sync.log", latency)
+        bench_logger.addHandler(handler)
+        results.append(("sync file", asyncio.run(_run(args.number))))
+        bench_logger.removeHandler(handler)
+        handler.close()
+
+        log_queue: queue.Queue = queue.Queue(maxsize=10000)
+        handler = _file_handler(Path(tmp) / "queued.log", latency)
+        listener = QueueListener(log_queue, handler)
+        listener.start()
+        queue_handler = BoundedQueueHandler(log_queue, block=True)
+        bench_logger.addHandler(queue_handler)
+        results.append(("queued", asyncio.run(_run(args.number))))
+        bench_logger.removeHandler(queue_handler)
+        listener.stop()
+        handler.close()
+
+    print(f"{'logging':<12}{'req/s':>10}{'vs off':>10}")
+    for name, rps in results:
+        print(f"{name:<12}{rps:>10.0f}{rps / results[0][1]:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,930 @@
+"""
+仓库方法的基准与回归比较
+
+在 `tests/database.py` 的测试数据库（内存 SQLite，迁移建表）中按选课记录数 1k / 100k / 1m 生成一个学期的数据，
+逐个调用 `UserRepository`、`CourseRepository`、`SelectionRepository`、`MajorRepository`、`DepartmentRepository`
+的每个公开方法，记录耗时（中位数、p95、最小值）与每次调用执行的 SQL 条数，结果可保存为 JSON 基线。
+
+每次调用使用新的会话（与一个请求相同），准备数据（如待删除的课程）不计入耗时。
+运行期间关闭仓库缓存，测量的是查询本身而不是缓存命中。
+`compare` 比较两份结果，中位数变慢超过阈值或 SQL 条数增加的方法视为回归，存在回归时以非零状态退出
+
+用法:
+    python -m benchmarks.repositories run [--size 100k] [-n 20] [-o current.json]
+    python -m benchmarks.repositories run --size 1k --baseline benchmarks/baselines/1k.json
+    python -m benchmarks.repositories compare benchmarks/baselines/1k.json current.json [--threshold 0.2]
+"""
+
+import argparse
+import asyncio
+import inspect
+import json
+import logging
+import math
+import platform
+import statistics
+import sys
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional
+
+import sqlalchemy
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import config
+from app.core.query_stats import collect_queries
+from app.models.course import Course, CourseType
+from app.models.department import Department
+from app.models.major import Major
+from app.models.selection import Selection
+from app.models.user import User, UserRole
+from app.repositories.course import CourseRepository
+from app.repositories.course_slot import CourseSlotRepository
+from app.repositories.department import DepartmentRepository
+from app.repositories.major import MajorRepository
+from app.repositories.selection import SelectionRepository
+from app.repositories.student_schedule import StudentScheduleRepository
+from app.repositories.user import UserRepository
+
+# 与 tests/conftest.py 一样以顶层模块导入测试数据库，同一文件只对应一个模块名
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tests"))
+from database import async_session, close_db, init_test_db, test_engine  # noqa: E402
+
+SIZES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+"""数据规模名称 -> 选课记录数"""
+
+REPOSITORIES = (
+    UserRepository,
+    CourseRepository,
+    SelectionRepository,
+    MajorRepository,
+    DepartmentRepository,
+)
+
+TERM = "2024-2025-1"
+ROLLOVER_TERM = "2025-2026-1"
+SESSION = 24
+PASSWORD = "$2b$04$" + "x" * 53
+SECTIONS = ([1, 2], [3, 4], [5, 6], [7, 8], [9, 10])
+DEPARTMENTS = 8
+MAJORS_PER_DEPARTMENT = 5
+STUDENTS_PER_CLASS = 40
+SELECTIONS_PER_STUDENT = 10
+BATCH_SIZE = 50_000
+BATCH = 20
+"""批量方法（批量创建、批量审核）每次处理的课程数"""
+
+
+@dataclass
+class Dataset:
+    """
+    生成的数据，列表均按生成顺序排列
+    """
+
+    size: str
+    departments: list[str]
+    majors: list[str]
+    teachers: list[int]
+    student_ids: list[int]
+    usernames: list[str]
+    electives: list[int]
+    """已公开的选修课 ID"""
+    elective_nos: list[str]
+    drafts: list[str]
+    """未提交审核的课程编号"""
+    courses: int
+    selections: int
+
+    def summary(self) -> dict[str, int]:
+        return {
+            "departments": len(self.departments),
+            "majors": len(self.majors),
+            "students": len(self.student_ids),
+            "courses": self.courses,
+            "selections": self.selections,
+        }
+
+
+def _pick(items: list, i: int):
+    """
+    按迭代序号分散地取一个元素，相邻迭代不会落在相邻的行上
+    """
+    return items[i * 7919 % len(items)]
+
+
+def _course_date(i: int, term: str = TERM) -> dict[str, Any]:
+    return {
+        "term": term,
+        "start_week": 1,
+        "end_week": 16,
+        "is_double_week": False,
+        "week_day": i % 7 + 1,
+        "section": SECTIONS[i // 7 % len(SECTIONS)],
+    }
+
+
+def _selected_electives(student: int, electives: int) -> list[int]:
+    """
+    学生所选选修课在选修课列表中的下标，学生依次错开，使各课程人数均匀
+    """
+    start = student * SELECTIONS_PER_STUDENT % electives
+    return [(start + j) % electives for j in range(SELECTIONS_PER_STUDENT)]
+
+
+async def _insert_batches(session: AsyncSession, model: type, rows: list[dict]):
+    for offset in range(0, len(rows), BATCH_SIZE):
+        await session.execute(insert(model), rows[offset : offset + BATCH_SIZE])
+
+
+async def seed(session: AsyncSession, size: str) -> Dataset:
+    """
+    生成一个学期的数据: 学生每人选 `SELECTIONS_PER_STUDENT` 门选修课（约 2% 已退课），
+    课程数为选课记录数的 1/200（至少 50 门），其中 10% 为必修课，各 5% 未提交审核或待审核
+
+    :param session: 数据库会话
+    :param size: 数据规模名称
+    """
+    selections = SIZES[size]
+    students = selections // SELECTIONS_PER_STUDENT
+    courses = max(50, selections // 200)
+
+    departments = [f"DP{d:03d}" for d in range(1, DEPARTMENTS + 1)]
+    majors = [f"MA{m:03d}" for m in range(1, DEPARTMENTS * MAJORS_PER_DEPARTMENT + 1)]
+    await _insert_batches(
+        session,
+        Department,
+        [
+            {"dept_no": dept_no, "dept_name": f"院系{dept_no}"}
+            for dept_no in departments
+        ],
+    )
+    await _insert_batches(
+        session,
+        Major,
+        [
+            {
+                "major_no": major_no,
+                "major_name": f"专业{major_no}",
+                "dept_no": departments[m // MAJORS_PER_DEPARTMENT],
+            }
+            for m, major_no in enumerate(majors)
+        ],
+    )
+
+    # 每个专业一名教师，账号格式与 UserRepository.create_user 一致
+    teacher_rows = [
+        {
+            "username": f"{SESSION:02d}{m // MAJORS_PER_DEPARTMENT + 1:03d}{m + 1:04d}",
+            "password": PASSWORD,
+            "name": f"教师{m}",
+            "role": UserRole.teacher,
+            "session": SESSION,
+            "dept_no": departments[m // MAJORS_PER_DEPARTMENT],
+        }
+        for m in range(len(majors))
+    ]
+    student_rows = []
+    for k in range(students):
+        m = k % len(majors)
+        class_number, order = divmod(k // len(majors), STUDENTS_PER_CLASS)
+        dept = m // MAJORS_PER_DEPARTMENT + 1
+        student_rows.append(
+            {
+                "username": f"{SESSION:02d}{dept:03d}{m + 1:02d}{class_number + 1:02d}{order + 1:02d}",
+                "password": PASSWORD,
+                "name": f"学生{k}",
+                "role": UserRole.student,
+                "session": SESSION,
+                "dept_no": departments[dept - 1],
+                "major_no": majors[m],
+                "class_number": class_number + 1,
+            }
+        )
+    await _insert_batches(session, User, teacher_rows + student_rows)
+    result = await session.execute(
+        select(User.id, User.username, User.role).order_by(User.id)
+    )
+    users = result.all()
+    teachers = [user_id for user_id, _, role in users if role == UserRole.teacher]
+    student_ids = [user_id for user_id, _, role in users if role == UserRole.student]
+    usernames = [username for _, username, role in users if role == UserRole.student]
+
+    electives_count = sum(1 for i in range(courses) if i % 10 and i % 20 not in (1, 2))
+    capacity = 2 * math.ceil(selections / electives_count) + 100
+    course_rows = []
+    for i in range(courses):
+        m = i % len(majors)
+        course_rows.append(
+            {
+                "course_no": f"CS{i + 1:03d}",
+                "course_name": f"课程{i}",
+                "teacher": teachers[m],
+                "major_no": majors[m],
+                "session": SESSION,
+                "course_type": CourseType.ELECTIVE if i % 10 else CourseType.CORE,
+                "credit": 2,
+                "is_public": True,
+                "status": {1: 0, 2: 1}.get(i % 20, 4),
+                "max_students": capacity,
+                "current_students": 0,
+                "course_date": _course_date(i),
+            }
+        )
+    await _insert_batches(session, Course, course_rows)
+    result = await session.execute(
+        select(Course.id, Course.course_no, Course.course_type, Course.status).order_by(
+            Course.id
+        )
+    )
+    rows = result.all()
+    electives = [
+        (course_id, course_no)
+        for course_id, course_no, course_type, status in rows
+        if course_type == CourseType.ELECTIVE and status == 4
+    ]
+    drafts = [course_no for _, course_no, _, status in rows if status == 0]
+
+    selection_rows = [
+        {
+            "student_id": student_id,
+            "course_id": electives[index][0],
+            "status": not (k % 5 == 0 and j == SELECTIONS_PER_STUDENT - 1),
+        }
+        for k, student_id in enumerate(student_ids)
+        for j, index in enumerate(_selected_electives(k, len(electives)))
+    ]
+    await _insert_batches(session, Selection, selection_rows)
+    await session.execute(
+        update(Course).values(
+            current_students=select(func.count(Selection.id))
+            .where(Selection.course_id == Course.id, Selection.status.is_(True))
+            .scalar_subquery()
+        )
+    )
+
+    await CourseSlotRepository(session).rebuild_term(TERM)
+    await StudentScheduleRepository(session).rebuild_term(TERM)
+    await session.commit()
+
+    return Dataset(
+        size=size,
+        departments=departments,
+        majors=majors,
+        teachers=teachers,
+        student_ids=student_ids,
+        usernames=usernames,
+        electives=[course_id for course_id, _ in electives],
+        elective_nos=[course_no for _, course_no in electives],
+        drafts=drafts,
+        courses=courses,
+        selections=len(selection_rows),
+    )
+
+
+async def _insert_student(session: AsyncSession, data: Dataset, tag: str) -> User:
+    """
+    插入一名选了 `SELECTIONS_PER_STUDENT` 门课的学生，供删除类方法使用
+    """
+    user = User(
+        username=tag,
+        password=PASSWORD,
+        name=tag,
+        role=UserRole.student,
+        session=SESSION,
+        dept_no=data.departments[0],
+        major_no=data.majors[0],
+        class_number=99,
+    )
+    session.add(user)
+    await session.flush()
+    course_ids = [
+        data.electives[index]
+        for index in _selected_electives(len(data.student_ids), len(data.electives))
+    ]
+    await session.execute(
+        insert(Selection),
+        [{"student_id": user.id, "course_id": course_id} for course_id in course_ids],
+    )
+    await session.execute(
+        update(Course)
+        .where(Course.id.in_(course_ids))
+        .values(current_students=Course.current_students + 1)
+    )
+    await StudentScheduleRepository(session).refresh(students=[user.id])
+    await session.commit()
+    return user
+
+
+async def _insert_courses(
+    session: AsyncSession, data: Dataset, major_no: str, tag: str, count: int
+) -> list[int]:
+    """
+    插入若干门已有学生选课的课程，供删除类方法使用；编号前缀与业务课程不同，不影响课程编号分配
+    """
+    await session.execute(
+        insert(Course),
+        [
+            {
+                "course_no": f"{tag}{j:02d}",
+                "course_name": tag,
+                "teacher": data.teachers[0],
+                "major_no": major_no,
+                "session": SESSION,
+                "course_type": CourseType.ELECTIVE,
+                "credit": 2,
+                "status": 4,
+                "current_students": SELECTIONS_PER_STUDENT,
+                "course_date": _course_date(j),
+            }
+            for j in range(count)
+        ],
+    )
+    result = await session.execute(
+        select(Course.id).where(Course.course_no.startswith(tag))
+    )
+    course_ids = list(result.scalars().all())
+    await session.execute(
+        insert(Selection),
+        [
+            {"student_id": _pick(data.student_ids, j), "course_id": course_id}
+            for course_id in course_ids
+            for j in range(SELECTIONS_PER_STUDENT)
+        ],
+    )
+    await StudentScheduleRepository(session).refresh(courses=course_ids)
+    await session.commit()
+    return course_ids
+
+
+Prepare = Callable[[AsyncSession, Dataset, int], Awaitable[Callable[[], Awaitable]]]
+"""准备一次调用（不计时），返回被计时的调用"""
+
+CASES: dict[str, Prepare] = {}
+
+
+def benchmark(method: Callable):
+    """
+    登记仓库方法的基准，名称为 `类名.方法名`
+
+    :param method: 被测的仓库方法
+    """
+
+    def decorator(prepare: Prepare) -> Prepare:
+        CASES[method.__qualname__] = prepare
+        return prepare
+
+    return decorator
+
+
+def missing_cases() -> list[str]:
+    """
+    没有登记基准的公开异步方法
+    """
+    return [
+        f"{cls.__name__}.{name}"
+        for cls in REPOSITORIES
+        for name, attr in vars(cls).items()
+        if not name.startswith("_")
+        and inspect.iscoroutinefunction(attr)
+        and f"{cls.__name__}.{name}" not in CASES
+    ]
+
+
+# UserRepository
+
+
+@benchmark(UserRepository.get_by_name)
+async def bench_get_by_name(session: AsyncSession, data: Dataset, i: int):
+    repo = UserRepository(session)
+    username = _pick(data.usernames, i)
+    return lambda: repo.get_by_name(username)
+
+
+@benchmark(UserRepository.get_addition_order)
+async def bench_get_addition_order(session: AsyncSession, data: Dataset, i: int):
+    repo = UserRepository(session)
+    prefix = _pick(data.usernames, i)[:-2]
+    return lambda: repo.get_addition_order(prefix)
+
+
+@benchmark(UserRepository.create_user)
+async def bench_create_user(session: AsyncSession, data: Dataset, i: int):
+    repo = UserRepository(session)
+    return lambda: repo.create_user(
+        name=f"新生{i}",
+        password=PASSWORD,
+        role=UserRole.student,
+        session=SESSION + 1,
+        dept_no=data.departments[0],
+        major_no=data.majors[0],
+        class_number=1,
+    )
+
+
+@benchmark(UserRepository.edit_info)
+async def bench_edit_info(session: AsyncSession, data: Dataset, i: int):
+    repo = UserRepository(session)
+    user = await session.get(User, _pick(data.student_ids, i))
+    assert user is not None
+    return lambda: repo.edit_info(user, name=f"改名{i}")
+
+
+@benchmark(UserRepository.update_cohort)
+async def bench_update_cohort(session: AsyncSession, data: Dataset, i: int):
+    repo = UserRepository(session)
+    user = await session.get(User, _pick(data.student_ids, i))
+    assert user is not None
+    return lambda: repo.update_cohort(
+        session=SESSION,
+        major_no=user.major_no,
+        class_number=user.class_number,
+        status=True,
+    )
+
+
+@benchmark(UserRepository.change_password)
+async def bench_change_password(session: AsyncSession, data: Dataset, i: int):
+    repo = UserRepository(session)
+    user = await session.get(User, _pick(data.student_ids, i))
+    assert user is not None
+    # 与原密码不同，每次都会写入
+    return lambda: repo.change_password(user, f"{PASSWORD[:-6]}{i:06d}")
+
+
+@benchmark(UserRepository.get_schedule)
+async def bench_get_schedule(session: AsyncSession, data: Dataset, i: int):
+    repo = UserRepository(session)
+    user = await session.get(User, _pick(data.student_ids, i))
+    assert user is not None
+    return lambda: repo.get_schedule(user, TERM)
+
+
+@benchmark(UserRepository.delete_user)
+async def bench_delete_user(session: AsyncSession, data: Dataset, i: int):
+    repo = UserRepository(session)
+    user = await _insert_student(session, data, f"del{i:06d}")
+    return lambda: repo.delete_user(user)
+
+
+# CourseRepository
+
+
+def _new_course(data: Dataset, i: int) -> dict[str, Any]:
+    return {
+        "course_name": f"新课{i}",
+        "major_no": _pick(data.majors, i),
+        "session": SESSION,
+        "course_type": CourseType.ELECTIVE,
+        "credit": 2.0,
+        "course_date": _course_date(i),
+        "is_public": True,
+        "status": 0,
+        "max_students": 50,
+    }
+
+
+@benchmark(CourseRepository.get_by_course_no)
+async def bench_get_by_course_no(session: AsyncSession, data: Dataset, i: int):
+    repo = CourseRepository(session)
+    course_no = _pick(data.elective_nos, i)
+    return lambda: repo.get_by_course_no(course_no)
+
+
+@benchmark(CourseRepository.get_pending_courses)
+async def bench_get_pending_courses(session: AsyncSession, data: Dataset, i: int):
+    repo = CourseRepository(session)
+    dept_no = _pick(data.departments, i)
+    return lambda: repo.get_pending_courses(dept_no=dept_no)
+
+
+@benchmark(CourseRepository.get_open_course_seats)
+async def bench_get_open_course_seats(session: AsyncSession, data: Dataset, i: int):
+    repo = CourseRepository(session)
+    return repo.get_open_course_seats
+
+
+@benchmark(CourseRepository.create_course)
+async def bench_create_course(session: AsyncSession, data: Dataset, i: int):
+    repo = CourseRepository(session)
+    course = _new_course(data, i)
+    return lambda: repo.create_course(teacher=_pick(data.teachers, i), **course)
+
+
+@benchmark(CourseRepository.create_courses)
+async def bench_create_courses(session: AsyncSession, data: Dataset, i: int):
+    repo = CourseRepository(session)
+    courses = [_new_course(data, i * BATCH + j) for j in range(BATCH)]
+    return lambda: repo.create_courses(_pick(data.teachers, i), courses)
+
+
+@benchmark(CourseRepository.rollover_courses)
+async def bench_rollover_courses(session: AsyncSession, data: Dataset, i: int):
+    repo = CourseRepository(session)
+    await session.execute(
+        delete(Course).where(
+            func.json_extract(Course.course_date, "$.term") == ROLLOVER_TERM
+        )
+    )
+    await session.commit()
+    return lambda: repo.rollover_courses(TERM, ROLLOVER_TERM)
+
+
+@benchmark(CourseRepository.edit_course)
+async def bench_edit_course(session: AsyncSession, data: Dataset, i: int):
+    repo = CourseRepository(session)
+    course_no = _pick(data.elective_nos, i)
+    return lambda: repo.edit_course(course_no, course_name=f"改名{i}")
+
+
+@benchmark(CourseRepository.delete_course)
+async def bench_delete_course(session: AsyncSession, data: Dataset, i: int):
+    repo = CourseRepository(session)
+    tag = f"DC{i:04d}"
+    await _insert_courses(session, data, data.majors[0], tag, 1)
+    return lambda: repo.delete_course(f"{tag}00")
+
+
+@benchmark(CourseRepository.submit_course_review)
+async def bench_submit_course_review(session: AsyncSession, data: Dataset, i: int):
+    repo = CourseRepository(session)
+    course_no = _pick(data.drafts, i)
+    await session.execute(
+        update(Course).where(Course.course_no == course_no).values(status=0)
+    )
+    await session.commit()
+    return lambda: repo.submit_course_review(course_no)
+
+
+@benchmark(CourseRepository.set_course_status)
+async def bench_set_course_status(session: AsyncSession, data: Dataset, i: int):
+    repo = CourseRepository(session)
+    course_no = _pick(data.drafts, i)
+    return lambda: repo.set_course_status(course_no, 0, comment="基准测试")
+
+
+@benchmark(CourseRepository.set_courses_status)
+async def bench_set_courses_status(session: AsyncSession, data: Dataset, i: int):
+    repo = CourseRepository(session)
+    course_nos = [_pick(data.drafts, i * BATCH + j) for j in range(BATCH)]
+    return lambda: repo.set_courses_status(course_nos, 0, comment="基准测试")
+
+
+# SelectionRepository
+
+
+@benchmark(SelectionRepository.get_selection_by_id)
+async def bench_get_selection_by_id(session: AsyncSession, data: Dataset, i: int):
+    repo = SelectionRepository(session)
+    selection_id = i * 7919 % data.selections + 1
+    return lambda: repo.get_selection_by_id(selection_id)
+
+
+@benchmark(SelectionRepository.get_selection_by_student_and_course)
+async def bench_get_selection_by_student_and_course(
+    session: AsyncSession, data: Dataset, i: int
+):
+    repo = SelectionRepository(session)
+    selection = await session.get(Selection, i * 7919 % data.selections + 1)
+    assert selection is not None
+    student_id, course_id = selection.student_id, selection.course_id
+    return lambda: repo.get_selection_by_student_and_course(student_id, course_id)
+
+
+@benchmark(SelectionRepository.get_selections_by_student_id)
+async def bench_get_selections_by_student_id(
+    session: AsyncSession, data: Dataset, i: int
+):
+    repo = SelectionRepository(session)
+    student_id = _pick(data.student_ids, i)
+    return lambda: repo.get_selections_by_student_id(student_id)
+
+
+@benchmark(SelectionRepository.get_available_courses)
+async def bench_get_available_courses(session: AsyncSession, data: Dataset, i: int):
+    repo = SelectionRepository(session)
+    student_id = _pick(data.student_ids, i)
+    return lambda: repo.get_available_courses(student_id, TERM)
+
+
+@benchmark(SelectionRepository.get_selections_by_course_id)
+async def bench_get_selections_by_course_id(
+    session: AsyncSession, data: Dataset, i: int
+):
+    repo = SelectionRepository(session)
+    course_id = _pick(data.electives, i)
+    return lambda: repo.get_selections_by_course_id(course_id)
+
+
+@benchmark(SelectionRepository.create_selection)
+async def bench_create_selection(session: AsyncSession, data: Dataset, i: int):
+    repo = SelectionRepository(session)
+    k = i * 7919 % len(data.student_ids)
+    # 紧接学生已选课程之后的一门，学生尚未选过
+    index = _selected_electives(k, len(data.electives))[-1] + 1
+    course_no = data.elective_nos[index % len(data.electives)]
+    return lambda: repo.create_selection(data.student_ids[k], course_no)
+
+
+@benchmark(SelectionRepository.update_selection_status)
+async def bench_update_selection_status(session: AsyncSession, data: Dataset, i: int):
+    repo = SelectionRepository(session)
+    # 每名学生的第一条选课均为选中状态
+    k = (i * 7919 + 1) % len(data.student_ids)
+    selection_id = k * SELECTIONS_PER_STUDENT + 1
+    return lambda: repo.update_selection_status(selection_id, False)
+
+
+# MajorRepository
+
+
+@benchmark(MajorRepository.get_by_major_no)
+async def bench_get_by_major_no(session: AsyncSession, data: Dataset, i: int):
+    repo = MajorRepository(session)
+    major_no = _pick(data.majors, i)
+    return lambda: repo.get_by_major_no(major_no)
+
+
+@benchmark(MajorRepository.create_major)
+async def bench_create_major(session: AsyncSession, data: Dataset, i: int):
+    repo = MajorRepository(session)
+    dept_no = _pick(data.departments, i)
+    return lambda: repo.create_major(f"新专业{i}", dept_no)
+
+
+@benchmark(MajorRepository.edit_major)
+async def bench_edit_major(session: AsyncSession, data: Dataset, i: int):
+    repo = MajorRepository(session)
+    major_no = _pick(data.majors, i)
+    return lambda: repo.edit_major(major_no, f"改名{i}", None)
+
+
+@benchmark(MajorRepository.delete_major)
+async def bench_delete_major(session: AsyncSession, data: Dataset, i: int):
+    repo = MajorRepository(session)
+    major_no = f"DM{i:04d}"
+    session.add(
+        Major(major_no=major_no, major_name=major_no, dept_no=data.departments[0])
+    )
+    await session.flush()
+    await _insert_courses(session, data, major_no, major_no, 5)
+    return lambda: repo.delete_major(major_no)
+
+
+# DepartmentRepository
+
+
+@benchmark(DepartmentRepository.get_by_dept_no)
+async def bench_get_by_dept_no(session: AsyncSession, data: Dataset, i: int):
+    repo = DepartmentRepository(session)
+    dept_no = _pick(data.departments, i)
+    return lambda: repo.get_by_dept_no(dept_no)
+
+
+@benchmark(DepartmentRepository.create_department)
+async def bench_create_department(session: AsyncSession, data: Dataset, i: int):
+    repo = DepartmentRepository(session)
+    return lambda: repo.create_department(f"新院系{i}")
+
+
+@benchmark(DepartmentRepository.edit_department)
+async def bench_edit_department(session: AsyncSession, data: Dataset, i: int):
+    repo = DepartmentRepository(session)
+    dept_no = _pick(data.departments, i)
+    return lambda: repo.edit_department(dept_no, f"改名{i}")
+
+
+@benchmark(DepartmentRepository.delete_department)
+async def bench_delete_department(session: AsyncSession, data: Dataset, i: int):
+    repo = DepartmentRepository(session)
+    dept_no = f"DD{i:04d}"
+    session.add(Department(dept_no=dept_no, dept_name=dept_no))
+    session.add(Major(major_no=dept_no, major_name=dept_no, dept_no=dept_no))
+    await session.flush()
+    await _insert_courses(session, data, dept_no, dept_no, 5)
+    return lambda: repo.delete_department(dept_no)
+
+
+@dataclass
+class CaseResult:
+    median_ms: float
+    p95_ms: float
+    min_ms: float
+    queries: int
+    """单次调用执行的 SQL 条数（各次调用中的最大值）"""
+
+    @classmethod
+    def from_samples(cls, elapsed: list[float], queries: list[int]) -> "CaseResult":
+        ordered = sorted(elapsed)
+        return cls(
+            median_ms=round(statistics.median(ordered), 4),
+            p95_ms=round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4),
+            min_ms=round(ordered[0], 4),
+            queries=max(queries),
+        )
+
+
+async def run_case(prepare: Prepare, data: Dataset, repeat: int) -> CaseResult:
+    """
+    预热一次后调用 `repeat` 次，每次使用新的会话
+
+    :param prepare: 基准
+    :param data: 生成的数据
+    :param repeat: 计时的调用次数
+    """
+    elapsed: list[float] = []
+    queries: list[int] = []
+    for i in range(repeat + 1):
+        async with async_session() as session:
+            call = await prepare(session, data, i)
+            with collect_queries() as stats:
+                start = time.perf_counter()
+                await call()
+                duration = (time.perf_counter() - start) * 1000
+        if i:
+            elapsed.append(duration)
+            queries.append(stats.count)
+    return CaseResult.from_samples(elapsed, queries)
+
+
+def _print_results(results: dict[str, CaseResult]):
+    width = max(len(name) for name in results)
+    print(
+        f"{'method':<{width}}{'median ms':>12}{'p95 ms':>12}{'min ms':>12}{'queries':>9}"
+    )
+    for name, result in results.items():
+        print(
+            f"{name:<{width}}{result.median_ms:>12.3f}{result.p95_ms:>12.3f}"
+            f"{result.min_ms:>12.3f}{result.queries:>9}"
+        )
+
+
+async def run(size: str, repeat: int, only: Optional[str] = None) -> dict[str, Any]:
+    """
+    生成数据并运行所有基准
+
+    :param size: 数据规模名称
+    :param repeat: 每个方法计时的调用次数
+    :param only: 只运行名称包含该字符串的基准
+
+    :return: 可保存为基线的结果
+    """
+    # 测量查询本身，不经过缓存；关闭测试引擎的 SQL 回显与慢查询等日志
+    config.cache_enabled = False
+    test_engine.sync_engine.echo = False
+    logging.getLogger("app").setLevel(logging.ERROR)
+
+    await init_test_db()
+    try:
+        start = time.perf_counter()
+        async with async_session() as session:
+            data = await seed(session, size)
+        print(
+            f"生成数据 {data.summary()} 耗时 {time.perf_counter() - start:.1f}s",
+            file=sys.stderr,
+        )
+
+        results: dict[str, CaseResult] = {}
+        for name, prepare in CASES.items():
+            if only and only not in name:
+                continue
+            results[name] = await run_case(prepare, data, repeat)
+            print(f"{name}: {results[name].median_ms:.3f} ms", file=sys.stderr)
+    finally:
+        await close_db()
+
+    return {
+        "size": size,
+        "dataset": data.summary(),
+        "repeat": repeat,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "platform": platform.platform(),
+        },
+        "results": {name: asdict(result) for name, result in results.items()},
+    }
+
+
+def compare(
+    baseline: dict[str, Any],
+    current: dict[str, Any],
+    threshold: float,
+    min_delta_ms: float,
+) -> list[str]:
+    """
+    比较两份结果并打印对比表
+
+    :param baseline: 基线结果
+    :param current: 本次结果
+    :param threshold: 中位数变慢超过该比例视为回归
+    :param min_delta_ms: 中位数变慢不足该毫秒数时不视为回归，避免亚毫秒方法的抖动
+
+    :return: 回归的方法及原因
+    """
+    if baseline["size"] != current["size"]:
+        raise ValueError(
+            f"数据规模不同: 基线 {baseline['size']}，本次 {current['size']}"
+        )
+
+    regressions = []
+    width = max(len(name) for name in current["results"])
+    print(
+        f"{'method':<{width}}{'base ms':>12}{'current ms':>12}{'change':>10}"
+        f"{'queries':>10}"
+    )
+    for name, cur in current["results"].items():
+        if (base := baseline["results"].get(name)) is None:
+            print(f"{name:<{width}}  无基线")
+            continue
+
+        change = cur["median_ms"] / base["median_ms"] - 1 if base["median_ms"] else 0
+        reasons = []
+        if change > threshold and cur["median_ms"] - base["median_ms"] >= min_delta_ms:
+            reasons.append(f"耗时 +{change:.0%}")
+        if cur["queries"] > base["queries"]:
+            reasons.append(f"SQL {base['queries']} -> {cur['queries']} 条")
+        if reasons:
+            regressions.append(f"{name}: {'，'.join(reasons)}")
+
+        flag = " 回归" if reasons else (" 改善" if change < -threshold else "")
+        print(
+            f"{name:<{width}}{base['median_ms']:>12.3f}{cur['median_ms']:>12.3f}"
+            f"{change:>+10.0%}{base['queries']:>5} -> {cur['queries']:<3}{flag}"
+        )
+
+    if skipped := len(baseline["results"].keys() - current["results"].keys()):
+        print(f"基线中另有 {skipped} 个方法本次未运行")
+    return regressions
+
+
+def _load(path: str) -> dict[str, Any]:
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="运行基准")
+    run_parser.add_argument("--size", choices=SIZES, default="100k", help="数据规模")
+    run_parser.add_argument(
+        "-n", "--repeat", type=int, default=20, help="每个方法的调用次数"
+    )
+    run_parser.add_argument("-k", "--only", help="只运行名称包含该字符串的基准")
+    run_parser.add_argument("-o", "--output", help="把结果保存为 JSON 基线")
+    run_parser.add_argument("--baseline", help="运行后与该基线比较")
+
+    compare_parser = subparsers.add_parser("compare", help="比较基线与本次结果")
+    compare_parser.add_argument("baseline", help="基线 JSON")
+    compare_parser.add_argument("current", help="本次结果 JSON")
+
+    for sub in (run_parser, compare_parser):
+        sub.add_argument(
+            "--threshold", type=float, default=0.2, help="中位数变慢超过该比例视为回归"
+        )
+        sub.add_argument(
+            "--min-delta-ms",
+            type=float,
+            default=0.2,
+            help="中位数变慢不足该毫秒数时不视为回归",
+        )
+    args = parser.parse_args()
+
+    if args.command == "run":
+        if missing := missing_cases():
+            parser.error(f"以下仓库方法没有基准: {', '.join(missing)}")
+        current = asyncio.run(run(args.size, args.repeat, args.only))
+        _print_results(
+            {name: CaseResult(**r) for name, r in current["results"].items()}
+        )
+        if args.output:
+            Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+            Path(args.output).write_text(
+                json.dumps(current, ensure_ascii=False, indent=2) + "\n",
+                encoding="utf-8",
+            )
+        if not args.baseline:
+            return
+        baseline = _load(args.baseline)
+    else:
+        baseline, current = _load(args.baseline), _load(args.current)
+
+    try:
+        regressions = compare(baseline, current, args.threshold, args.min_delta_ms)
+    except ValueError as e:
+        parser.error(str(e))
+    if regressions:
+        print(f"\n{len(regressions)} 个方法回归:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("\n没有回归")
+
+
+if __name__ == "__main__":
+    main()
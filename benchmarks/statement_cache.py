@@ -0,0 +1,151 @@
+"""
+热点查询语句缓存的微基准
+
+对比每次调用重新构建 `select()`（旧写法）与复用预构建语句（新写法）的单次调用耗时。
+使用同步内存 SQLite，排除网络与事件循环的影响，差值即为 Python 侧构建语句与计算缓存键的开销。
+课程表的新写法为从物化的 `student_schedule` 按 (学生, 学期) 查找
+
+用法: python -m benchmarks.statement_cache [-n 5000]
+"""
+
+import argparse
+import timeit
+from typing import Union
+
+from sqlalchemy import CompoundSelect, Select, create_engine, func, insert, select
+from sqlalchemy.orm import Session, aliased
+
+from app.core.sql import Base
+from app.models.course import Course, CourseType
+from app.models.selection import Selection
+from app.models.student_schedule import StudentSchedule
+from app.models.user import User, UserRole
+from app.repositories.student_schedule import _GET_SCHEDULE, schedule_projection
+from app.repositories.user import _GET_BY_NAME
+
+TERM = "2024-2025-1"
+
+
+def _prepare(session: Session) -> User:
+    student = User(
+        username="bench_student",
+        password="x",
+        name="bench",
+        role=UserRole.student,
+        session=24,
+        major_no="MA001",
+    )
+    session.add(student)
+    session.flush()
+    session.add_all(
+        Course(
+            course_no=f"CS{i:03d}",
+            course_name=f"course_{i}",
+            teacher=student.id,
+            major_no="MA001",
+            course_type=CourseType.ELECTIVE if i % 2 else CourseType.CORE,
+            credit=2,
+            session=24,
+            status=4,
+            course_date={"term": TERM},
+        )
+        for i in range(1, 21)
+    )
+    session.flush()
+    # 选修 3 门选修课（课程 id 为奇数的是选修课）
+    session.add_all(
+        Selection(student_id=student.id, course_id=course_id, status=True)
+        for course_id in (1, 3, 5)
+    )
+    session.execute(
+        insert(StudentSchedule).from_select(
+            ["student_id", "course_id", "term"], schedule_projection("sqlite")
+        )
+    )
+    session.commit()
+    return student
+
+
+def get_by_name_before(session: Session, username: str):
+    return session.execute(
+        select(User).where(User.username == username)
+    ).scalar_one_or_none()
+
+
+def get_by_name_after(session: Session, username: str):
+    return session.execute(_GET_BY_NAME, {"username": username}).scalar_one_or_none()
+
+
+def get_schedule_before(session: Session, user: User):
+    term_filter = func.json_extract(Course.course_date, "$.term") == TERM
+    core_courses_stmt = select(Course).where(
+        Course.major_no == user.major_no,
+        Course.session == user.session,
+        term_filter,
+        Course.status == 4,
+        Course.is_public.is_(True),
+        Course.course_type == CourseType.CORE,
+    )
+    elective_course_ids = (
+        session.execute(
+            select(Selection.course_id).where(
+                Selection.student_id == user.id, Selection.status.is_(True)
+            )
+        )
+        .scalars()
+        .all()
+    )
+    combined_stmt: Union[Select, CompoundSelect] = core_courses_stmt
+    if elective_course_ids:
+        combined_stmt = core_courses_stmt.union(
+            select(Course).where(Course.id.in_(elective_course_ids), term_filter)
+        )
+    cte = combined_stmt.cte("course_schedule_cte")
+    return session.execute(select(aliased(Course, alias=cte))).scalars().all()
+
+
+def get_schedule_after(session: Session, user: User):
+    return (
+        session.execute(_GET_SCHEDULE, {"student_id": user.id, "term": TERM})
+        .scalars()
+        .all()
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", "--number", type=int, default=5000, help="每组调用次数")
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        student = _prepare(session)
+        cases = [
+            ("get_by_name", get_by_name_before, get_by_name_after, student.username),
+            ("get_schedule", get_schedule_before, get_schedule_after, student),
+        ]
+
+        print(f"{'query':<14}{'before (us)':>14}{'after (us)':>14}{'speedup':>10}")
+        for name, before, after, arg in cases:
+            # 预热，使两种写法的编译结果都进入缓存
+            before(session, arg)
+            after(session, arg)
+
+            results = []
+            for func_ in (before, after):
+                elapsed = min(
+                    timeit.repeat(
+                        lambda: func_(session, arg), number=args.number, repeat=3
+                    )
+                )
+                results.append(elapsed / args.number * 1e6)
+            print(
+                f"{name:<14}{results[0]:>14.1f}{results[1]:>14.1f}"
+                f"{results[0] / results[1]:>9.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,57 @@
+import atexit
+import shutil
+import tempfile
 from collections.abc import AsyncGenerator
 
-import pytest_asyncio
-from database import close_db, get_db, init_test_db
-from httpx import ASGITransport, AsyncClient
-from sqlalchemy.ext.asyncio import AsyncSession
-
-from app.deps.sql import get_db as get_sql_db
-from app.main import app
-from app.models.user import User, UserRole
-from app.repositories.course import CourseRepository
-from app.repositories.department import DepartmentRepository
-from app.repositories.major import MajorRepository
-from app.repositories.user import UserRepository
-from app.services.auth_service import get_password_hash
+from app.core.config import config
+
+# 以下配置在导入其他应用模块时读取，需在此之前设置
+# 日志写入临时目录
+config.log_dir = tempfile.mkdtemp(prefix="course-selection-logs-")
+atexit.register(shutil.rmtree, config.log_dir, ignore_errors=True)
+# 追踪默认关闭，测试中开启（tests/test_tracing.py）
+config.tracing_enabled = True
+
+import pytest_asyncio  # noqa: E402
+from database import close_db, get_db, init_test_db  # noqa: E402
+from httpx import ASGITransport, AsyncClient  # noqa: E402
+from redis.asyncio import Redis  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession  # noqa: E402
+
+from app.core.cache import CACHE_PREFIX, VERSION_PREFIX, repository_cache  # noqa: E402
+from app.deps.sql import get_db as get_sql_db  # noqa: E402
+from app.deps.sql import get_read_db  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.user import User, UserRole  # noqa: E402
+from app.repositories.course import CourseRepository  # noqa: E402
+from app.repositories.department import DepartmentRepository  # noqa: E402
+from app.repositories.major import MajorRepository  # noqa: E402
+from app.repositories.user import UserRepository  # noqa: E402
+from app.services.auth_service import get_password_hash  # noqa: E402
+from app.services.schedule_cache import SCHEDULE_PREFIX  # noqa: E402
+
+
+async def clear_schedule_cache():
+    """
+    测试数据库每次重新创建，清除上次运行遗留的课程表缓存与仓库缓存
+    """
+    redis = Redis(host=config.redis_host, port=config.redis_port)
+    try:
+        keys = [key async for key in redis.scan_iter(f"{SCHEDULE_PREFIX}*")]
+        keys += [key async for key in redis.scan_iter("schedule_deps:*")]
+        keys += [key async for key in redis.scan_iter(f"{CACHE_PREFIX}*")]
+        keys += [key async for key in redis.scan_iter(f"{VERSION_PREFIX}*")]
+        if keys:
+            await redis.delete(*keys)
+    finally:
+        await redis.aclose()
+    repository_cache.evict_local()
 
 
 @pytest_asyncio.fixture(scope="session")
 async def database() -> AsyncGenerator[AsyncSession, None]:
     await init_test_db()
+    await clear_schedule_cache()
     try:
         async for db in get_db():
             yield db
@@ -31,6 +65,7 @@ async def async_client(database: AsyncSession) -> AsyncGenerator[AsyncClient, No
         yield database
 
     app.dependency_overrides[get_sql_db] = override_get_session
+    app.dependency_overrides[get_read_db] = override_get_session
 
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as client:
@@ -87,7 +122,20 @@ async def test_admin(user_repo: UserRepository) -> User:
 
 
 @pytest_asyncio.fixture
-async def test_student(user_repo: UserRepository) -> User:
+async def reference_data(
+    department_repo: DepartmentRepository, major_repo: MajorRepository
+):
+    """
+    确保学生/教师所引用的院系 DP001 与专业 MA001 存在（外键约束）
+    """
+    if not await department_repo.get_by_dept_no("DP001"):
+        await department_repo.create_department("计算机学院")
+    if not await major_repo.get_by_major_no("MA001"):
+        await major_repo.create_major("计算机科学与技术", "DP001")
+
+
+@pytest_asyncio.fixture
+async def test_student(user_repo: UserRepository, reference_data) -> User:
     hashed_password = get_password_hash("123456")
     user = await user_repo.create_user(
         name="test_student",
@@ -103,7 +151,7 @@ async def test_student(user_repo: UserRepository) -> User:
 
 
 @pytest_asyncio.fixture
-async def test_teacher(user_repo: UserRepository) -> User:
+async def test_teacher(user_repo: UserRepository, reference_data) -> User:
     hashed_password = get_password_hash("123456")
     user = await user_repo.create_user(
         name="test_teacher",
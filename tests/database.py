@@ -2,11 +2,17 @@ from typing import AsyncGenerator
 
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
-from app.core.sql import Base
+from app.core.query_stats import instrument_engine
+from app.core.sql import enable_sqlite_foreign_keys
+from app.core.tracing import trace_engine
+from app.migrations import upgrade
 
 TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:?cache=shared"
 
 test_engine = create_async_engine(TEST_DATABASE_URL, echo=True, future=True)
+enable_sqlite_foreign_keys(test_engine)
+instrument_engine(test_engine)
+trace_engine(test_engine)
 
 async_session = async_sessionmaker(
     test_engine, class_=AsyncSession, expire_on_commit=False
@@ -14,8 +20,7 @@ async_session = async_sessionmaker(
 
 
 async def init_test_db():
-    async with test_engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    await upgrade(test_engine)
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
@@ -0,0 +1,27 @@
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from app.core.query_stats import QueryStats, collect_queries
+
+
+@contextmanager
+def query_budget(
+    max_queries: int, max_repeats: Optional[int] = None
+) -> Iterator[QueryStats]:
+    """
+    断言代码块（通常是一次接口调用）执行的 SQL 不超过预算
+
+    :param max_queries: 允许执行的最大语句数
+    :param max_repeats: 同一语句允许执行的最大次数，用于发现 N+1 查询
+    """
+    with collect_queries() as stats:
+        yield stats
+
+    assert (
+        stats.count <= max_queries
+    ), f"执行了 {stats.count} 条 SQL，超出预算 {max_queries}:\n" + "\n".join(
+        f"{n} x {s}" for s, n in stats.statements.most_common()
+    )
+    if max_repeats is not None:
+        repeated = stats.repeated(max_repeats)
+        assert not repeated, f"同一语句执行次数超过 {max_repeats}: {repeated}"
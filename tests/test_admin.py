@@ -1,13 +1,17 @@
 from database import async_session
 from httpx import AsyncClient
+from sqlalchemy import func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.course import CourseType
+from app.models.course import Course, CourseType
+from app.models.selection import Selection
 from app.models.user import User, UserRole
 from app.repositories.course import CourseRepository
 from app.repositories.department import DepartmentRepository
 from app.repositories.major import MajorRepository
+from app.repositories.selection import SelectionRepository
 from app.repositories.user import UserRepository
+from app.services.auth_service import get_password_hash
 
 TEST_USERS: list[str] = []
 
@@ -187,6 +191,324 @@ async def test_course(
         assert course.status_comment == "测试课程审核"
 
 
+async def test_course_batch_review(
+    admin_client: AsyncClient, course_repo: CourseRepository, test_teacher: User
+):
+    course_nos = await course_repo.create_courses(
+        teacher=test_teacher.id,
+        courses=[
+            {
+                "course_name": f"待审核课程{i}",
+                "major_no": "MA001",
+                "session": 25,
+                "course_type": CourseType.ELECTIVE,
+                "credit": 1.0,
+                "course_date": {
+                    "term": "2024-2025-1",
+                    "start_week": 1,
+                    "end_week": 16,
+                    "is_double_week": False,
+                    "week_day": 2,
+                    "section": [1, 2],
+                },
+                "status": 1,
+            }
+            for i in range(3)
+        ],
+    )
+
+    # 游标分页获取待审核课程
+    response = await admin_client.post(
+        "/api/admin/course/get_pending",
+        params={"teacher": test_teacher.id, "dept_no": "DP001", "limit": 2},
+    )
+    assert response.status_code == 200
+    first_page = [course["course_no"] for course in response.json()]
+    assert first_page == course_nos[:2]
+    next_cursor = response.headers["X-Next-Cursor"]
+
+    response = await admin_client.post(
+        "/api/admin/course/get_pending",
+        params={"teacher": test_teacher.id, "limit": 2, "cursor": next_cursor},
+    )
+    assert response.status_code == 200
+    assert [course["course_no"] for course in response.json()] == course_nos[2:]
+    assert "X-Next-Cursor" not in response.headers
+
+    # 批量审核
+    response = await admin_client.post(
+        "/api/admin/course/batch_set_status",
+        json={"course_nos": course_nos, "status": 2, "reason": "批量审核通过"},
+    )
+    assert response.status_code == 200
+    assert response.json()["count"] == 3
+
+    response = await admin_client.post(
+        "/api/admin/course/get_pending", params={"teacher": test_teacher.id}
+    )
+    assert response.status_code == 404
+
+    async with async_session() as session:
+        new_repo = CourseRepository(session)
+        for course_no in course_nos:
+            course = await new_repo.get_by_course_no(course_no)
+            assert course is not None
+            assert course.status == 2
+            assert course.status_comment == "批量审核通过"
+
+    response = await admin_client.post(
+        "/api/admin/course/batch_set_status",
+        json={"course_nos": course_nos, "status": 9},
+    )
+    assert response.status_code == 400
+
+
+async def test_course_rollover(admin_client: AsyncClient):
+    source_term, target_term = "2024-2025-2", "2025-2026-2"
+
+    async def courses_by_term() -> dict[str, list[Course]]:
+        async with async_session() as session:
+            result = await session.execute(select(Course).order_by(Course.id))
+            courses: dict[str, list[Course]] = {}
+            for course in result.scalars():
+                courses.setdefault(course.course_date["term"], []).append(course)
+            return courses
+
+    before = await courses_by_term()
+    sources = before[source_term]
+    assert sources and target_term not in before
+
+    response = await admin_client.post(
+        "/api/admin/course/rollover",
+        params={"source_term": source_term, "target_term": target_term},
+    )
+    assert response.status_code == 200
+    assert response.json()["count"] == len(sources)
+
+    after = await courses_by_term()
+    cloned = after[target_term]
+    assert [
+        (c.course_name, c.teacher, c.major_no, c.session, c.max_students)
+        for c in cloned
+    ] == [
+        (c.course_name, c.teacher, c.major_no, c.session, c.max_students)
+        for c in sources
+    ]
+    for course in cloned:
+        assert course.status == 0
+        assert course.current_students == 0
+        assert course.course_date["term"] == target_term
+    # 新课程编号互不重复，也不与已有课程重复
+    existing_nos = {c.course_no for courses in before.values() for c in courses}
+    cloned_nos = {c.course_no for c in cloned}
+    assert len(cloned_nos) == len(cloned)
+    assert not cloned_nos & existing_nos
+
+    # 重复执行不会再次复制
+    response = await admin_client.post(
+        "/api/admin/course/rollover",
+        params={"source_term": source_term, "target_term": target_term},
+    )
+    assert response.status_code == 200
+    assert response.json()["count"] == 0
+    assert len((await courses_by_term())[target_term]) == len(cloned)
+
+
+async def test_delete_cascade(
+    admin_client: AsyncClient,
+    course_repo: CourseRepository,
+    user_repo: UserRepository,
+    test_teacher: User,
+    database: AsyncSession,
+):
+    (elective_no,) = await course_repo.create_courses(
+        teacher=test_teacher.id,
+        courses=[
+            {
+                "course_name": "级联删除测试课程",
+                "major_no": "MA001",
+                "session": 25,
+                "course_type": CourseType.ELECTIVE,
+                "credit": 1.0,
+                "course_date": {
+                    "term": "2024-2025-1",
+                    "start_week": 1,
+                    "end_week": 16,
+                    "is_double_week": False,
+                    "week_day": 4,
+                    "section": [1, 2],
+                },
+                "status": 4,
+            }
+        ],
+    )
+    elective = await course_repo.get_by_course_no(elective_no)
+    assert elective
+
+    students = []
+    selection_repo = SelectionRepository(database)
+    for i in range(3):
+        student = await user_repo.create_user(
+            name=f"test_cascade{i}",
+            password="",
+            role=UserRole.student,
+            session=87,
+            dept_no="DP001",
+            major_no="MA001",
+            class_number=1,
+        )
+        assert student
+        await selection_repo.create_selection(student.id, elective_no)
+        students.append(student)
+
+    await database.refresh(elective)
+    assert elective.current_students == 3
+
+    # 删除学生: 选课记录级联删除，课程名额同步归还
+    await user_repo.delete_user(students[0])
+    await database.refresh(elective)
+    assert elective.current_students == 2
+    result = await database.execute(
+        select(func.count(Selection.id)).where(Selection.student_id == students[0].id)
+    )
+    assert result.scalar() == 0
+
+    # 按学期重建课程表: 剩余两名学生的选修课
+    response = await admin_client.post(
+        "/api/admin/course/rebuild_schedules", params={"term": "2024-2025-1"}
+    )
+    assert response.status_code == 200
+    assert response.json()["count"] >= 2
+
+    # 删除课程: 选课记录级联删除
+    assert await course_repo.delete_course(elective_no)
+    result = await database.execute(
+        select(func.count(Selection.id)).where(Selection.course_id == elective.id)
+    )
+    assert result.scalar() == 0
+
+    # 删除教师: 课程保留，教师置空
+    teacher = await user_repo.create_user(
+        name="test_cascade_t", password="", role=UserRole.teacher, session=87
+    )
+    assert teacher
+    (course_no,) = await course_repo.create_courses(
+        teacher=teacher.id,
+        courses=[
+            {
+                "course_name": "教师删除测试课程",
+                "major_no": "MA001",
+                "session": 25,
+                "course_type": CourseType.CORE,
+                "credit": 1.0,
+                "course_date": {
+                    "term": "2024-2025-1",
+                    "start_week": 1,
+                    "end_week": 16,
+                    "is_double_week": False,
+                    "week_day": 5,
+                    "section": [1, 2],
+                },
+            }
+        ],
+    )
+    await user_repo.delete_user(teacher)
+    course = await course_repo.get_by_course_no(course_no)
+    assert course
+    await database.refresh(course)
+    assert course.teacher is None
+
+
+async def test_reconcile_seats(
+    admin_client: AsyncClient,
+    course_repo: CourseRepository,
+    user_repo: UserRepository,
+    test_teacher: User,
+    database: AsyncSession,
+):
+    course_nos = await course_repo.create_courses(
+        teacher=test_teacher.id,
+        courses=[
+            {
+                "course_name": f"名额校准测试课程{i}",
+                "major_no": "MA001",
+                "session": 25,
+                "course_type": CourseType.ELECTIVE,
+                "credit": 1.0,
+                "course_date": {
+                    "term": "2024-2025-1",
+                    "start_week": 1,
+                    "end_week": 16,
+                    "is_double_week": False,
+                    "week_day": 6,
+                    "section": [2 * i + 1, 2 * i + 2],
+                },
+                "status": 4,
+            }
+            for i in range(2)
+        ],
+    )
+    selection_repo = SelectionRepository(database)
+    for i in range(2):
+        student = await user_repo.create_user(
+            name=f"test_reconcile{i}",
+            password="",
+            role=UserRole.student,
+            session=88,
+            dept_no="DP001",
+            major_no="MA001",
+            class_number=1,
+        )
+        assert student
+        await selection_repo.create_selection(student.id, course_nos[0])
+
+    async def current_students(course_no: str) -> int:
+        current = await database.scalar(
+            select(Course.current_students).where(Course.course_no == course_no)
+        )
+        assert current is not None
+        return current
+
+    # 先校准其他测试可能遗留的偏差
+    response = await admin_client.post("/api/admin/course/reconcile_seats")
+    assert response.status_code == 200
+
+    # 第一门课程实际 2 人，第二门实际 0 人
+    await database.execute(
+        update(Course)
+        .where(Course.course_no == course_nos[0])
+        .values(current_students=5)
+    )
+    await database.execute(
+        update(Course)
+        .where(Course.course_no == course_nos[1])
+        .values(current_students=3)
+    )
+    await database.commit()
+
+    response = await admin_client.post("/api/admin/course/reconcile_seats")
+    assert response.status_code == 200
+    report = response.json()
+    assert report["drifted"] == 2
+    assert report["total_drift"] == 6
+    assert report["max_drift"] == 3
+    assert await current_students(course_nos[0]) == 2
+    assert await current_students(course_nos[1]) == 0
+
+    response = await admin_client.post("/api/admin/course/reconcile_seats")
+    assert response.json()["drifted"] == 0
+    assert response.json()["total_drift"] == 0
+
+
+async def test_pool_stats(admin_client: AsyncClient):
+    response = await admin_client.post("/api/admin/system/pool_stats")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["primary"]["pool"] == "InstrumentedQueuePool"
+    assert "checked_out" in data["primary"]
+    assert data["replicas"] == []
+
+
 async def test_register(admin_client: AsyncClient, user_repo: UserRepository):
     response = await admin_client.post(
         "/api/admin/user/register",
@@ -248,6 +570,76 @@ async def test_edit(admin_client, test_user, user_repo, database: AsyncSession):
     assert edited_user.session == 25
 
 
+async def test_cohort_edit(
+    admin_client: AsyncClient, async_client: AsyncClient, user_repo: UserRepository
+):
+    students = []
+    for i in range(2):
+        student = await user_repo.create_user(
+            name=f"test_cohort{i}",
+            password=get_password_hash("123456"),
+            role=UserRole.student,
+            session=88,
+            dept_no="DP001",
+            major_no="MA001",
+            class_number=7,
+        )
+        assert student
+        students.append(student)
+
+    async with AsyncClient(
+        transport=async_client._transport, base_url="http://test"
+    ) as student_client:
+        response = await student_client.post(
+            "/api/auth/login",
+            data={"username": students[0].username, "password": "123456"},
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+        )
+        student_client.headers.update(
+            {"Authorization": f"Bearer {response.json()['access_token']}"}
+        )
+        response = await student_client.post("/api/student/info")
+        assert response.status_code == 200
+
+        # 禁用整个班级
+        response = await admin_client.post(
+            "/api/admin/user/cohort_edit",
+            json={"session": 88, "class_number": 7, "status": False},
+        )
+        assert response.status_code == 200
+        assert response.json()["count"] == 2
+
+        response = await student_client.post("/api/student/info")
+        assert response.status_code == 401
+
+        async with async_session() as session:
+            for student in students:
+                user = await UserRepository(session).get_by_name(student.username)
+                assert user is not None
+                assert user.status is False
+
+        # 重新启用后，吊销前签发的 token 依然无效
+        response = await admin_client.post(
+            "/api/admin/user/cohort_edit",
+            json={
+                "session": 88,
+                "class_number": 7,
+                "status": True,
+                "new_class_number": 8,
+            },
+        )
+        assert response.status_code == 200
+        assert response.json()["count"] == 2
+
+        response = await student_client.post("/api/student/info")
+        assert response.status_code == 401
+
+    response = await admin_client.post(
+        "/api/admin/user/cohort_edit", json={"status": False}
+    )
+    assert response.status_code == 400
+
+
 async def test_info(admin_client: AsyncClient, test_user):
     response = await admin_client.post(
         "/api/admin/user/info",
@@ -0,0 +1,237 @@
+import asyncio
+import json
+import time
+
+from redis.asyncio import Redis
+
+import app.core.cache as cache_module
+from app.core.cache import (
+    CACHE_PREFIX,
+    LOCK_PREFIX,
+    TwoTierCache,
+    invalidate_cache,
+    repository_cache,
+)
+from app.core.redis import close_shared_redis_client, get_shared_redis_client
+from app.models.course import Course
+from app.models.department import Department
+from app.repositories.department import DepartmentRepository
+from app.repositories.selection import (  # noqa: F401 注册课程列表缓存
+    SelectionRepository,
+)
+
+
+class _Loader:
+    def __init__(self, value, delay: float = 0):
+        self.value = value
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.value
+
+
+async def test_two_tier_cache():
+    namespace = "test_two_tier"
+    cache, other = TwoTierCache(), TwoTierCache()
+    try:
+        await cache.invalidate(namespace)
+        loader = _Loader({"name": "a"})
+
+        assert await cache.get_or_load(namespace, "1", loader, ttl=60) == {"name": "a"}
+        assert await cache.get_or_load(namespace, "1", loader, ttl=60) == {"name": "a"}
+        # 其他进程命中 Redis
+        assert await other.get_or_load(namespace, "1", loader, ttl=60) == {"name": "a"}
+        assert loader.calls == 1
+        stats = cache.stats[namespace]
+        assert (stats.misses, stats.local_hits) == (1, 1)
+        assert other.stats[namespace].redis_hits == 1
+
+        # 失效单个键，其他进程通过失效消息清理进程内缓存
+        await cache.invalidate(namespace, "1")
+        other.handle_eviction(json.dumps({"namespace": namespace, "keys": ["1"]}))
+        loader.value = {"name": "b"}
+        assert await other.get_or_load(namespace, "1", loader, ttl=60) == {"name": "b"}
+        assert loader.calls == 2
+
+        # 负缓存，新增后整个命名空间失效
+        missing = _Loader(None)
+        assert (
+            await cache.get_or_load(namespace, "2", missing, ttl=60, negative_ttl=10)
+            is None
+        )
+        assert (
+            await other.get_or_load(namespace, "2", missing, ttl=60, negative_ttl=10)
+            is None
+        )
+        assert missing.calls == 1
+
+        await cache.invalidate(namespace)
+        version = cache._versions[namespace]
+        other.handle_eviction(json.dumps({"namespace": namespace, "version": version}))
+        missing.value = {"name": "c"}
+        assert await other.get_or_load(namespace, "2", missing, ttl=60) == {"name": "c"}
+        assert await cache.get_or_load(namespace, "1", loader, ttl=60) == {"name": "b"}
+        assert (missing.calls, loader.calls) == (2, 3)
+    finally:
+        await close_shared_redis_client()
+
+
+async def test_invalidate_during_load():
+    namespace = "test_invalidate_race"
+    cache, other = TwoTierCache(), TwoTierCache()
+    try:
+        await cache.invalidate(namespace)
+
+        async def stale_loader():
+            # 回源读到旧值后、写入缓存前，其他进程修改记录并失效
+            await other.invalidate(namespace, "1")
+            return {"name": "old"}
+
+        for _ in range(2):
+            # 第一次条目不存在，第二次条目为上一次失效写入的墓碑
+            assert await cache.get_or_load(namespace, "1", stale_loader, ttl=60) == {
+                "name": "old"
+            }
+            cache.evict_local(namespace, "1")
+            loader = _Loader({"name": "new"})
+            assert await other.get_or_load(namespace, "1", loader, ttl=60) == {
+                "name": "new"
+            }
+            assert loader.calls == 1
+            await cache.invalidate(namespace, "1")
+
+        # 回源期间未被失效时正常写入
+        loader = _Loader({"name": "new"})
+        assert await cache.get_or_load(namespace, "1", loader, ttl=60) == {
+            "name": "new"
+        }
+        assert await other.get_or_load(namespace, "1", loader, ttl=60) == {
+            "name": "new"
+        }
+        assert loader.calls == 1
+    finally:
+        await close_shared_redis_client()
+
+
+async def test_single_flight():
+    namespace = "test_single_flight"
+    cache, other = TwoTierCache(), TwoTierCache()
+    loader = _Loader({"name": "a"}, delay=0.1)
+    try:
+        await cache.invalidate(namespace)
+
+        # 同一进程内的并发查询合并为一次
+        results = await asyncio.gather(
+            *(cache.get_or_load(namespace, "1", loader, ttl=60) for _ in range(10))
+        )
+        assert results == [{"name": "a"}] * 10
+        assert loader.calls == 1
+        assert cache.stats[namespace].coalesced == 9
+
+        # 其他进程等待持锁者写入缓存
+        await cache.invalidate(namespace)
+        other._set_version(namespace, cache._versions[namespace])
+        results = await asyncio.gather(
+            cache.get_or_load(namespace, "1", loader, ttl=60),
+            other.get_or_load(namespace, "1", loader, ttl=60),
+        )
+        assert results == [{"name": "a"}] * 2
+        assert loader.calls == 2
+        assert (
+            cache.stats[namespace].lock_waits + other.stats[namespace].lock_waits == 1
+        )
+    finally:
+        await close_shared_redis_client()
+
+
+async def test_stale_while_revalidate():
+    namespace = "test_stale"
+    cache = TwoTierCache()
+    client = get_shared_redis_client()
+    loader = _Loader({"name": "new"})
+    try:
+        await cache.invalidate(namespace)
+        version = cache._versions[namespace]
+        expired = {"v": version, "exp": time.time() - 1, "value": {"name": "old"}}
+        await client.set(f"{CACHE_PREFIX}{namespace}:1", json.dumps(expired), ex=60)
+
+        # 其他进程正在回源时返回旧值
+        lock = client.lock(f"{LOCK_PREFIX}{namespace}:1", timeout=5)
+        assert await lock.acquire(blocking=False)
+        assert await cache.get_or_load(
+            namespace, "1", loader, ttl=60, stale_ttl=30
+        ) == {"name": "old"}
+        assert cache.stats[namespace].stale_hits == 1
+        await lock.release()
+
+        # 获得锁后刷新
+        assert await cache.get_or_load(
+            namespace, "1", loader, ttl=60, stale_ttl=30
+        ) == {"name": "new"}
+        assert loader.calls == 1
+        assert await client.ttl(f"{CACHE_PREFIX}{namespace}:1") > 60
+    finally:
+        await close_shared_redis_client()
+
+
+async def test_redis_unavailable(monkeypatch):
+    broken = Redis(host="127.0.0.1", port=1, socket_connect_timeout=0.1)
+    monkeypatch.setattr(cache_module, "get_shared_redis_client", lambda: broken)
+    cache = TwoTierCache()
+    loader = _Loader({"name": "a"})
+    try:
+        # Redis 不可用时直接查询数据库，也不写入进程内缓存
+        for _ in range(2):
+            assert await cache.get_or_load("test_broken", "1", loader, ttl=60) == {
+                "name": "a"
+            }
+        await cache.invalidate("test_broken")
+    finally:
+        await broken.aclose()
+
+    assert loader.calls == 2
+    assert cache.stats["test_broken"].errors == 3
+
+
+async def test_repository_cache(department_repo: DepartmentRepository):
+    department = await department_repo.create_department("缓存测试学院")
+    dept_no = department.dept_no
+    stats = repository_cache.stats
+    misses = stats["department"].misses if "department" in stats else 0
+
+    first = await department_repo.get_by_dept_no(dept_no)
+    department_repo.session.expunge(first)  # type: ignore
+    cached = await department_repo.get_by_dept_no(dept_no)
+    assert stats["department"].misses == misses + 1
+    assert isinstance(cached, Department)
+    assert cached is not first and cached.dept_name == "缓存测试学院"
+    assert cached not in department_repo.session
+
+    # 修改后立即读到新值
+    await department_repo.edit_department(dept_no, "缓存测试学院2")
+    updated = await department_repo.get_by_dept_no(dept_no)
+    assert updated and updated.dept_name == "缓存测试学院2"
+
+    assert await department_repo.delete_department(dept_no)
+    assert await department_repo.get_by_dept_no(dept_no) is None
+
+
+async def test_invalidate_without_lists(monkeypatch):
+    calls = []
+    invalidate = repository_cache.invalidate
+
+    async def record(namespace, *keys):
+        calls.append((namespace, keys))
+        await invalidate(namespace, *keys)
+
+    monkeypatch.setattr(repository_cache, "invalidate", record)
+    # 选课只改变已选人数，不使公开选修课列表失效
+    await invalidate_cache(Course, "CS001", lists=False)
+    assert calls == [("course", ("CS001",))]
+
+    calls.clear()
+    await invalidate_cache(Course, "CS001")
+    assert calls == [("course", ("CS001",)), ("course:list", ())]
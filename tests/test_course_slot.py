@@ -0,0 +1,163 @@
+from pathlib import Path
+
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import config
+from app.core.sql import Base, create_db_engine
+from app.models.course import CourseType
+from app.models.course_slot import CourseSlot
+from app.models.selection import Selection
+from app.models.user import UserRole
+from app.repositories.course import CourseRepository
+from app.repositories.course_slot import CourseSlotRepository
+from app.repositories.department import DepartmentRepository
+from app.repositories.major import MajorRepository
+from app.repositories.user import UserRepository
+
+TERM = "2025-2026-1"
+
+
+def _course_date(week_day: int, section: list[int], start_week=1, end_week=16):
+    return {
+        "term": TERM,
+        "start_week": start_week,
+        "end_week": end_week,
+        "is_double_week": False,
+        "week_day": week_day,
+        "section": section,
+    }
+
+
+@pytest_asyncio.fixture
+async def session(tmp_path: Path, monkeypatch):
+    # 独立的数据库，不读写与共享测试数据库同名的缓存
+    monkeypatch.setattr(config, "cache_enabled", False)
+    engine = create_db_engine(f"sqlite+aiosqlite:///{tmp_path / 'slot.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        await DepartmentRepository(session).create_department("计算机学院")
+        await MajorRepository(session).create_major("计算机科学与技术", "DP001")
+        yield session
+    await engine.dispose()
+
+
+async def _slots(session: AsyncSession, course_id: int) -> list[tuple]:
+    result = await session.execute(
+        select(CourseSlot.week_day, CourseSlot.section)
+        .where(CourseSlot.course_id == course_id)
+        .order_by(CourseSlot.section)
+    )
+    return [tuple(row) for row in result.all()]
+
+
+async def test_sync_on_create_and_edit(session: AsyncSession):
+    user_repo = UserRepository(session)
+    teacher = await user_repo.create_user(
+        name="slot_teacher", password="", role=UserRole.teacher, session=24
+    )
+    assert teacher
+    course_repo = CourseRepository(session)
+
+    course = await course_repo.create_course(
+        course_name="数据结构",
+        teacher=teacher.id,
+        major_no="MA001",
+        session=25,
+        course_type=CourseType.CORE,
+        credit=3,
+        course_date=_course_date(2, [3, 4]),  # type: ignore
+    )
+    assert await _slots(session, course.id) == [(2, 3), (2, 4)]
+
+    await course_repo.edit_course(
+        course.course_no, course_date=_course_date(3, [1])  # type: ignore
+    )
+    assert await _slots(session, course.id) == [(3, 1)]
+
+    course_nos = await course_repo.create_courses(
+        teacher.id,
+        [
+            {
+                "course_name": "操作系统",
+                "major_no": "MA001",
+                "session": 25,
+                "course_type": CourseType.ELECTIVE,
+                "credit": 2,
+                "course_date": _course_date(3, [1, 2], start_week=9),
+            }
+        ],
+    )
+    elective = await course_repo.get_by_course_no(course_nos[0])
+    assert elective
+    assert await _slots(session, elective.id) == [(3, 1), (3, 2)]
+
+    # 滚动到新学期时重建目标学期的时间段
+    assert await course_repo.rollover_courses(TERM, "2025-2026-2") == 2
+    result = await session.execute(
+        select(CourseSlot.id).where(CourseSlot.term == "2025-2026-2")
+    )
+    assert len(result.all()) == 3
+
+    slot_repo = CourseSlotRepository(session)
+    courses = await slot_repo.get_courses_at(TERM, 3, 1)
+    assert [c.id for c in courses] == [course.id, elective.id]
+    courses = await slot_repo.get_courses_at(TERM, 3, 1, week=2)
+    assert [c.id for c in courses] == [course.id]
+    assert await slot_repo.get_busy_teachers(TERM, 3, 1) == [teacher.id]
+    assert await slot_repo.get_busy_teachers(TERM, 3, 5) == []
+
+
+async def test_conflicts(session: AsyncSession):
+    user_repo = UserRepository(session)
+    teacher = await user_repo.create_user(
+        name="conflict_teacher", password="", role=UserRole.teacher, session=24
+    )
+    student = await user_repo.create_user(
+        name="conflict_student",
+        password="",
+        role=UserRole.student,
+        session=25,
+        dept_no="DP001",
+        major_no="MA001",
+    )
+    assert teacher and student
+    course_repo = CourseRepository(session)
+
+    async def create(name, course_type, course_date, status=4):
+        return await course_repo.create_course(
+            course_name=name,
+            teacher=teacher.id,
+            major_no="MA001",
+            session=25,
+            course_type=course_type,
+            credit=2,
+            course_date=course_date,
+            status=status,
+        )
+
+    core = await create("高等数学", CourseType.CORE, _course_date(1, [1, 2]))
+    elective = await create("电影鉴赏", CourseType.ELECTIVE, _course_date(4, [5]))
+    hidden_core = await create("线性代数", CourseType.CORE, _course_date(4, [5]), 0)
+    later = await create("网球", CourseType.ELECTIVE, _course_date(1, [2], 17, 18))
+    target = await create("篮球", CourseType.ELECTIVE, _course_date(1, [2]))
+    other = await create("游泳", CourseType.ELECTIVE, _course_date(4, [5]))
+    session.add(Selection(student_id=student.id, course_id=elective.id))
+    await session.commit()
+
+    slot_repo = CourseSlotRepository(session)
+    # 与必修课冲突；周次不重叠的课程不冲突
+    assert [
+        c.id for c in await slot_repo.find_student_conflicts(student, target.id)
+    ] == [core.id]
+    # 与已选的选修课冲突；未公开的必修课不在学生课表中
+    assert [
+        c.id for c in await slot_repo.find_student_conflicts(student, other.id)
+    ] == [elective.id]
+    assert await slot_repo.find_student_conflicts(student, later.id) == []
+
+    conflicts = await slot_repo.find_teacher_conflicts(teacher.id, other.id)
+    assert [c.id for c in conflicts] == [elective.id, hidden_core.id]
@@ -0,0 +1,89 @@
+import asyncio
+import signal
+
+from httpx import AsyncClient
+from redis.asyncio import Redis
+
+import app.services.health as health_module
+from app.services.health import Phase, health_state, install_drain_handler
+
+
+async def test_healthz(async_client: AsyncClient):
+    response = await async_client.get("/healthz")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+
+async def test_readyz(async_client: AsyncClient, monkeypatch):
+    # 启动完成前未就绪
+    monkeypatch.setattr(health_state, "phase", Phase.starting)
+    response = await async_client.get("/readyz")
+    assert response.status_code == 503
+    assert response.json()["phase"] == "starting"
+
+    health_state.mark_ready()
+    response = await async_client.get("/readyz")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "ready"
+    assert body["checks"]["database"]["ok"]
+    assert body["checks"]["redis"]["latency_ms"] >= 0
+    assert body["checks"]["loop_lag"]["ok"]
+
+    # 事件循环延迟过高
+    monkeypatch.setattr(health_state, "loop_lag_ms", 10_000.0)
+    response = await async_client.get("/readyz")
+    assert response.status_code == 503
+    assert not response.json()["checks"]["loop_lag"]["ok"]
+    monkeypatch.setattr(health_state, "loop_lag_ms", 0.0)
+
+    # Redis 不可用
+    broken = Redis(host="127.0.0.1", port=1, socket_connect_timeout=0.1)
+    monkeypatch.setattr(health_module, "get_shared_redis_client", lambda: broken)
+    try:
+        response = await async_client.get("/readyz")
+    finally:
+        await broken.aclose()
+    assert response.status_code == 503
+    checks = response.json()["checks"]
+    assert not checks["redis"]["ok"] and checks["database"]["ok"]
+    monkeypatch.undo()
+
+    # 开始退出后未就绪
+    health_state.mark_draining()
+    response = await async_client.get("/readyz")
+    assert response.status_code == 503
+    assert response.json()["phase"] == "draining"
+    health_state.phase = Phase.starting
+
+
+async def test_drain_on_sigterm(async_client: AsyncClient):
+    received = []
+    previous = signal.signal(signal.SIGTERM, lambda signum, frame: received.append(1))
+    restore = install_drain_handler(0.5)
+    health_state.mark_ready()
+    try:
+        # 收到 SIGTERM 后立即未就绪，等待一段时间后才交给原处理器停止接受连接
+        signal.raise_signal(signal.SIGTERM)
+        await asyncio.sleep(0.01)
+        response = await async_client.get("/readyz")
+        assert response.status_code == 503
+        assert response.json()["phase"] == "draining"
+        assert received == []
+        await asyncio.sleep(0.6)
+        assert received == [1]
+
+        # 等待期间再次收到 SIGTERM 时立即停止，之后不再重复转发
+        restore = install_drain_handler(0.2)
+        health_state.mark_ready()
+        signal.raise_signal(signal.SIGTERM)
+        await asyncio.sleep(0.01)
+        signal.raise_signal(signal.SIGTERM)
+        await asyncio.sleep(0.01)
+        assert received == [1, 1]
+        await asyncio.sleep(0.3)
+        assert received == [1, 1]
+    finally:
+        restore()
+        signal.signal(signal.SIGTERM, previous)
+        health_state.phase = Phase.starting
@@ -0,0 +1,193 @@
+import gzip
+import json
+import logging
+import queue
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from httpx import ASGITransport, AsyncClient
+from starlette.responses import PlainTextResponse
+
+from app.core.config import config
+from app.core.logger import (
+    BoundedQueueHandler,
+    DailyRotatingFileHandler,
+    _compress,
+    access_logger,
+    init_logger,
+    log_archiver,
+)
+from app.middleware.access_log import AccessLogMiddleware
+
+
+def _record(msg: str, *args) -> logging.LogRecord:
+    return logging.LogRecord("app", logging.INFO, __file__, 1, msg, args, None)
+
+
+def test_bounded_queue_drop():
+    log_queue: queue.Queue = queue.Queue(maxsize=2)
+    handler = BoundedQueueHandler(log_queue)
+
+    for i in range(3):
+        handler.handle(_record("第 %s 条", i))
+    assert handler.dropped == 1
+
+    first = log_queue.get_nowait()
+    assert (first.msg, first.args) == ("第 0 条", None)
+    log_queue.get_nowait()
+
+    # 队列有空位后补记丢弃数量
+    handler.handle(_record("第 %s 条", 3))
+    assert log_queue.get_nowait().getMessage() == "第 3 条"
+    notice = log_queue.get_nowait()
+    assert notice.levelno == logging.WARNING
+    assert notice.getMessage() == "日志队列已满，丢弃了 1 条日志"
+
+
+def test_exception_formatted_before_enqueue():
+    log_queue: queue.Queue = queue.Queue()
+    handler = BoundedQueueHandler(log_queue)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = logging.LogRecord(
+            "app", logging.ERROR, __file__, 1, "失败", None, sys.exc_info()
+        )
+    handler.handle(record)
+
+    queued = log_queue.get_nowait()
+    assert queued.exc_info is None
+    assert "ValueError: boom" in queued.exc_text
+
+
+def test_logger_level_from_handlers(monkeypatch):
+    monkeypatch.setattr(config, "log_level", "WARNING")
+    monkeypatch.setattr(config, "file_log_level", "INFO")
+    try:
+        logger = init_logger()
+        assert logger.level == logging.INFO
+        # 两个处理器都不输出的记录在调用处丢弃，不进入队列
+        assert not logger.isEnabledFor(logging.DEBUG)
+    finally:
+        monkeypatch.undo()
+        init_logger()
+
+
+def _wait_for_archiver():
+    log_archiver.submit(lambda: None).result()
+
+
+def test_rotate_by_size(tmp_path: Path):
+    handler = DailyRotatingFileHandler(tmp_path, suffix=".1", max_bytes=100)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    try:
+        for i in range(5):
+            handler.handle(_record("%s", str(i) * 40))
+    finally:
+        handler.close()
+    _wait_for_archiver()
+
+    today = date.today().isoformat()
+    names = sorted(path.name for path in tmp_path.iterdir())
+    assert names == [
+        f"{today}.1.1.log.gz",
+        f"{today}.1.2.log.gz",
+        f"{today}.1.log",
+    ]
+    with gzip.open(tmp_path / f"{today}.1.1.log.gz", "rt") as f:
+        assert f.read() == f"{'0' * 40}\n{'1' * 40}\n"
+    assert (tmp_path / f"{today}.1.log").read_text() == f"{'4' * 40}\n"
+
+
+def test_rotate_by_day(tmp_path: Path):
+    expired = tmp_path / "2000-01-01.log.gz"
+    expired.touch()
+    (tmp_path / "slow_query.log").touch()
+
+    handler = DailyRotatingFileHandler(tmp_path, backup_days=7)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    yesterday = date.today() - timedelta(days=1)
+    handler._date = yesterday
+    handler.baseFilename = str(handler._path())
+    try:
+        handler.handle(_record("昨天"))
+        handler._next_rollover = time.time()
+        handler.handle(_record("今天"))
+    finally:
+        handler.close()
+    _wait_for_archiver()
+
+    names = sorted(path.name for path in tmp_path.iterdir())
+    assert names == [
+        f"{yesterday.isoformat()}.log.gz",
+        f"{date.today().isoformat()}.log",
+        "slow_query.log",
+    ]
+
+
+def test_compress_failure(tmp_path: Path, capsys):
+    # 压缩失败只输出到标准错误，不写入经队列归档的应用日志
+    _compress(tmp_path / "missing.log")
+    assert "压缩日志" in capsys.readouterr().err
+    assert list(tmp_path.iterdir()) == []
+
+
+class _RecordHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records: list[dict] = []
+
+    def emit(self, record: logging.LogRecord):
+        self.records.append(json.loads(record.getMessage()))
+
+
+def _capture() -> _RecordHandler:
+    handler = _RecordHandler()
+    access_logger.addHandler(handler)
+    return handler
+
+
+async def test_access_log(student_client: AsyncClient):
+    handler = _capture()
+    try:
+        response = await student_client.post(
+            "/api/student/info", headers={"X-Request-ID": "req-test-1"}
+        )
+    finally:
+        access_logger.removeHandler(handler)
+
+    assert response.status_code == 200
+    assert response.headers["X-Request-ID"] == "req-test-1"
+
+    (record,) = handler.records
+    assert record["request_id"] == "req-test-1"
+    assert record["route"] == "/api/student/info"
+    assert (record["status"], record["role"]) == (200, "student")
+    assert record["db_queries"] >= 1 and record["redis_commands"] >= 1
+    assert record["duration_ms"] >= record["auth_ms"] > 0
+
+
+async def test_sampling():
+    async def app(scope, receive, send):
+        status = 500 if scope["path"] == "/error" else 200
+        await PlainTextResponse("ok", status_code=status)(scope, receive, send)
+
+    handler = _capture()
+    transport = ASGITransport(app=AccessLogMiddleware(app, sample_rate=0))
+    try:
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            ok = await client.get("/ok", headers={"X-Request-ID": "bad id!"})
+            await client.get("/error")
+    finally:
+        access_logger.removeHandler(handler)
+
+    # 成功的请求不记录，出错的请求总是记录；非法的请求 ID 被替换
+    assert len(ok.headers["X-Request-ID"]) == 32
+    (record,) = handler.records
+    assert (record["path"], record["status"], record["sample_rate"]) == (
+        "/error",
+        500,
+        1.0,
+    )
@@ -0,0 +1,55 @@
+from httpx import AsyncClient
+
+from app.models.course import CourseType
+from app.models.user import User
+from app.repositories.course import CourseRepository
+
+
+async def test_metrics(
+    async_client: AsyncClient,
+    course_repo: CourseRepository,
+    test_teacher: User,
+    reference_data,
+):
+    course = await course_repo.create_course(
+        course_name="test_metrics_course",
+        teacher=test_teacher.id,
+        major_no="MA001",
+        session=2024,
+        course_type=CourseType.ELECTIVE,
+        credit=1.0,
+        course_date={
+            "term": "2030-2031-1",
+            "start_week": 1,
+            "end_week": 16,
+            "is_double_week": False,
+            "week_day": 3,
+            "section": [1, 2],
+        },
+        is_public=True,
+        status=4,
+        max_students=30,
+    )
+    assert await course_repo.get_by_course_no(course.course_no)
+
+    response = await async_client.get("/api/not_found")
+    assert response.status_code == 404
+
+    response = await async_client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+
+    assert (
+        'http_request_duration_seconds_count{method="GET",route="unmatched",status="404"}'
+        in text
+    )
+    # 抓取请求本身不计入
+    assert 'route="/metrics"' not in text
+    assert "http_requests_in_flight" in text
+    assert "bcrypt_queue_depth" in text
+    assert 'cache_lookups_total{namespace="course",result="misses"}' in text
+    assert f'enrollment_seats_remaining{{course_no="{course.course_no}"}} 30.0' in text
+    assert "enrollment_full_rejections_total" in text
+
+    await course_repo.delete_course(course.course_no)
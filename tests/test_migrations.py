@@ -0,0 +1,139 @@
+from pathlib import Path
+
+import pytest_asyncio
+from sqlalchemy import Connection, inspect, text
+
+from app.core.sql import Base, create_db_engine
+from app.migrations import current_version, downgrade, head_revision, upgrade
+from app.migrations.versions import v0001_baseline
+
+
+@pytest_asyncio.fixture
+async def engine(tmp_path: Path):
+    engine = create_db_engine(f"sqlite+aiosqlite:///{tmp_path / 'migrate.db'}")
+    yield engine
+    await engine.dispose()
+
+
+def _schema(conn: Connection) -> dict:
+    inspector = inspect(conn)
+    return {
+        table: {
+            "columns": {
+                column["name"]: column["nullable"]
+                for column in inspector.get_columns(table)
+            },
+            "indexes": {index["name"] for index in inspector.get_indexes(table)},
+            "foreign_keys": {
+                (
+                    tuple(fk["constrained_columns"]),
+                    fk["referred_table"],
+                    fk["options"].get("ondelete"),
+                )
+                for fk in inspector.get_foreign_keys(table)
+            },
+        }
+        for table in inspector.get_table_names()
+        if table != "schema_version"
+    }
+
+
+async def test_upgrade_matches_models(engine, tmp_path: Path):
+    assert await current_version(engine) == 0
+    assert await upgrade(engine) == head_revision()
+    assert await current_version(engine) == head_revision()
+
+    # 迁移得到的表结构与 ORM 模型 create_all 的结果一致
+    reference = create_db_engine(f"sqlite+aiosqlite:///{tmp_path / 'models.db'}")
+    async with reference.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        expected = await conn.run_sync(_schema)
+    await reference.dispose()
+
+    async with engine.connect() as conn:
+        assert await conn.run_sync(_schema) == expected
+
+
+async def test_downgrade(engine):
+    await upgrade(engine)
+
+    assert await downgrade(engine, 2) == 2
+    async with engine.connect() as conn:
+        schema = await conn.run_sync(_schema)
+    # 回退外键动作时保留版本 2 添加的索引
+    assert "ix_course_status" in schema["course"]["indexes"]
+    assert all(fk[2] is None for fk in schema["selection"]["foreign_keys"])
+
+    assert await downgrade(engine, 0) == 0
+    async with engine.connect() as conn:
+        assert await conn.run_sync(_schema) == {}
+
+    assert await upgrade(engine) == head_revision()
+
+
+async def test_upgrade_legacy_database(engine):
+    # 未纳入版本管理、由 create_all 创建的旧数据库
+    async with engine.begin() as conn:
+        await conn.run_sync(v0001_baseline.metadata.create_all)
+        for sql in [
+            "INSERT INTO department (dept_no, dept_name) VALUES ('DP001', 'dept')",
+            "INSERT INTO major (major_no, major_name, dept_no) VALUES ('MA001', 'major', 'DP001')",
+            "INSERT INTO user (id, username, password, role, status, name, session) "
+            "VALUES (1, 'teacher', '', 'teacher', 1, 'teacher', 25), "
+            "(2, 'student', '', 'student', 1, 'student', 25), "
+            "(3, 'withdrawn', '', 'student', 1, 'withdrawn', 25)",
+            "INSERT INTO course (id, course_no, course_name, teacher, major_no, session, course_type, "
+            "credit, is_public, status, current_students, course_date) "
+            "VALUES (1, 'CS001', 'course', 1, 'MA001', 25, 'ELECTIVE', 1, 1, 4, 2, "
+            '\'{"term": "2025-2026-1", "start_week": 1, "end_week": 16, '
+            '"is_double_week": false, "week_day": 2, "section": [3, 4]}\')',
+            # 退选后再选与并发重复选课留下的重复记录
+            "INSERT INTO selection (id, student_id, course_id, status) "
+            "VALUES (1, 2, 1, 0), (2, 2, 1, 1), (3, 2, 1, 1), (4, 3, 1, 0), (5, 3, 1, 0)",
+        ]:
+            await conn.execute(text(sql))
+
+    await upgrade(engine, 5)
+    async with engine.begin() as conn:
+        # 版本 5 回填课程表之后偏离选课记录的条目
+        await conn.execute(text("DELETE FROM student_schedule"))
+        await conn.execute(
+            text(
+                "INSERT INTO student_schedule (student_id, course_id, term) "
+                "VALUES (3, 1, '2025-2026-1')"
+            )
+        )
+
+    await upgrade(engine)
+
+    async with engine.begin() as conn:
+        # 每组只保留最新的选中记录，没有选中记录时保留最新的退选记录
+        assert (
+            await conn.execute(text("SELECT id, status FROM selection ORDER BY id"))
+        ).all() == [(3, True), (5, False)]
+        # 重复选中多计的已选人数按保留的记录重新统计
+        assert (
+            await conn.execute(text("SELECT current_students FROM course"))
+        ).scalar() == 1
+        schema = await conn.run_sync(_schema)
+        assert "ix_course_status" in schema["course"]["indexes"]
+        # 从 course_date 回填的时间段
+        assert (
+            await conn.execute(text("SELECT section FROM course_slot ORDER BY section"))
+        ).scalars().all() == [3, 4]
+        # 按保留的选课记录重建的课程表
+        assert (
+            await conn.execute(
+                text("SELECT student_id, course_id, term FROM student_schedule")
+            )
+        ).all() == [(2, 1, "2025-2026-1")]
+
+        # 重建后的外键动作生效
+        await conn.execute(text("DELETE FROM user WHERE id = 1"))
+        await conn.execute(text("DELETE FROM course WHERE id = 1"))
+        assert (
+            await conn.execute(text("SELECT count(*) FROM selection"))
+        ).scalar() == 0
+        assert (
+            await conn.execute(text("SELECT count(*) FROM course_slot"))
+        ).scalar() == 0
@@ -0,0 +1,61 @@
+from pathlib import Path
+
+from sqlalchemy import text
+
+from app.core.config import config
+from app.core.sql import (
+    InstrumentedQueuePool,
+    create_db_engine,
+    pool_status,
+    warm_up_pool,
+)
+
+
+async def test_pool_options(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(config, "db_pool_size", 3)
+    monkeypatch.setattr(config, "db_max_overflow", 1)
+    engine = create_db_engine(f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}")
+
+    assert isinstance(engine.pool, InstrumentedQueuePool)
+    assert await warm_up_pool(engine, 10) == 3
+
+    status = pool_status(engine)
+    assert status["size"] == 3
+    assert status["checked_in"] == 3
+    assert status["checked_out"] == 0
+    assert status["checkouts"] == 3
+
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+        assert pool_status(engine)["checked_out"] == 1
+
+    # dispose 重建连接池后累计统计保留
+    await engine.dispose()
+    status = pool_status(engine)
+    assert status["checked_in"] == 0
+    assert status["checkouts"] == 4
+    await engine.dispose()
+
+
+async def test_idle_pre_ping(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(config, "db_pool_pre_ping", "idle")
+    monkeypatch.setattr(config, "db_pool_ping_idle_seconds", 0)
+    engine = create_db_engine(f"sqlite+aiosqlite:///{tmp_path / 'ping.db'}")
+
+    # 新建的连接不探活，归还后再次检出时探活
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    assert pool_status(engine)["pings"] == 0
+
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    status = pool_status(engine)
+    assert status["pings"] == 1
+    assert status["stale"] == 0
+    await engine.dispose()
+
+
+async def test_memory_sqlite_static_pool():
+    engine = create_db_engine("sqlite+aiosqlite:///:memory:")
+    assert pool_status(engine)["pool"] == "StaticPool"
+    await engine.dispose()
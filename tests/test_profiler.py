@@ -0,0 +1,84 @@
+import asyncio
+import time
+from collections import Counter
+
+from httpx import AsyncClient
+
+import app.api.admin.system as system_api
+from app.core.profiler import ProfilerSettings, SamplingProfiler, request_profiler
+
+
+def _busy(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+async def _handler():
+    _busy(0.05)
+    await asyncio.sleep(0.05)
+
+
+async def test_sampling_profiler():
+    profiler = SamplingProfiler(interval=0.001)
+    assert not profiler.should_sample()
+
+    profiler.apply(ProfilerSettings(until=time.time() + 60))
+    samples: Counter[str] = Counter()
+    try:
+        with profiler.track(samples):
+            await _handler()
+    finally:
+        profiler.apply(None)
+
+    stacks = list(samples)
+    # 执行中记录线程调用栈，挂起时记录协程链
+    assert any(
+        stack.endswith("test_profiler.py:_handler;test_profiler.py:_busy")
+        for stack in stacks
+    )
+    assert any(
+        ":_handler;" in stack and stack.endswith(":sleep;[await]") for stack in stacks
+    )
+    assert all(
+        stack.split(";")[0].endswith(":test_sampling_profiler") for stack in stacks
+    )
+
+    # 过期后自动关闭
+    profiler.apply(ProfilerSettings(until=time.time() - 1))
+    assert not profiler.enabled
+
+
+async def test_profiler_api(admin_client: AsyncClient, monkeypatch):
+    monkeypatch.setattr(request_profiler, "interval", 0.001)
+    monkeypatch.setattr(system_api, "get_cache_stats", lambda: _busy(0.02) or {})
+
+    response = await admin_client.post(
+        "/api/admin/system/profiler/start", params={"route": "/api/not_found"}
+    )
+    assert response.status_code == 400
+
+    response = await admin_client.post(
+        "/api/admin/system/profiler/start",
+        params={"route": "/api/admin/system/cache_stats", "duration": 60},
+    )
+    assert response.status_code == 200
+    assert request_profiler.enabled
+    try:
+        for _ in range(3):
+            assert (await admin_client.post("/api/admin/system/cache_stats")).is_success
+            assert (await admin_client.post("/api/admin/system/pool_stats")).is_success
+    finally:
+        response = await admin_client.post("/api/admin/system/profiler/stop")
+    assert response.status_code == 200
+    assert not request_profiler.enabled
+
+    response = await admin_client.post("/api/admin/system/profiler/profile")
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert lines
+    # 只保存指定路由的结果
+    assert all(line.startswith("POST /api/admin/system/cache_stats;") for line in lines)
+    assert any("test_profiler.py:_busy " in line for line in lines)
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
@@ -0,0 +1,32 @@
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.query_stats import collect_queries
+from app.models.user import User
+
+
+async def test_response_headers(admin_client: AsyncClient):
+    response = await admin_client.post("/api/admin/system/pool_stats")
+    assert response.status_code == 200
+    # 鉴权时查询一次用户
+    assert response.headers["X-DB-Queries"] == "1"
+    assert float(response.headers["X-DB-Time"]) >= float(
+        response.headers["X-DB-Slowest"]
+    )
+    assert "X-DB-Repeated" not in response.headers
+
+
+async def test_repeated_statements(database: AsyncSession):
+    with collect_queries() as outer:
+        with collect_queries() as stats:
+            for user_id in range(12):
+                await database.execute(select(User).where(User.id == user_id))
+            await database.execute(select(User).limit(1))
+
+    assert stats.count == outer.count == 13
+    assert stats.slowest_statement
+    (statement, times), *others = stats.repeated(10)
+    assert times == 12 and not others
+    assert "WHERE user.id" in statement
+    assert stats.repeated(12) == []
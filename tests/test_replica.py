@@ -0,0 +1,104 @@
+import asyncio
+from pathlib import Path
+from typing import Optional
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import insert, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.redis import get_shared_redis_client
+from app.core.sql import READ_YOUR_WRITES_PREFIX, Base, ReplicaRouter, create_db_engine
+from app.models.department import Department
+
+
+async def _create_db(path: Path, dept_name: str) -> AsyncEngine:
+    engine = create_db_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            insert(Department).values(dept_no="DP001", dept_name=dept_name)
+        )
+    return engine
+
+
+@pytest_asyncio.fixture
+async def engines(tmp_path: Path):
+    primary = await _create_db(tmp_path / "primary.db", "primary")
+    replicas = [
+        await _create_db(tmp_path / "replica1.db", "replica1"),
+        await _create_db(tmp_path / "replica2.db", "replica2"),
+    ]
+    yield primary, replicas
+    for engine in [primary, *replicas]:
+        await engine.dispose()
+
+
+async def _read_dept_name(router: ReplicaRouter, subject: Optional[str] = None) -> str:
+    async with router.session(subject) as session:
+        result = await session.execute(
+            select(Department.dept_name).where(Department.dept_no == "DP001")
+        )
+        return result.scalar_one()
+
+
+async def test_round_robin(engines):
+    primary, replicas = engines
+    router = ReplicaRouter(primary, replicas)
+
+    names = [await _read_dept_name(router) for _ in range(4)]
+    assert names == ["replica1", "replica2", "replica1", "replica2"]
+
+
+async def test_read_your_writes(engines):
+    primary, replicas = engines
+    # 两个路由器模拟两个 worker 进程，只通过 Redis 共享写入记录
+    writer = ReplicaRouter(primary, replicas, sticky_seconds=60)
+    reader = ReplicaRouter(primary, replicas, sticky_seconds=60)
+    try:
+        writer.mark_write("test_sticky")
+        assert await _read_dept_name(writer, "test_sticky") == "primary"
+
+        # 写入记录在后台写入 Redis
+        for _ in range(100):
+            if await reader.is_sticky("test_sticky"):
+                break
+            await asyncio.sleep(0.01)
+        assert await _read_dept_name(reader, "test_sticky") == "primary"
+        assert await _read_dept_name(reader, "test_other") in ("replica1", "replica2")
+    finally:
+        await get_shared_redis_client().delete(f"{READ_YOUR_WRITES_PREFIX}test_sticky")
+
+
+async def test_least_loaded(engines):
+    primary, replicas = engines
+    router = ReplicaRouter(primary, replicas, strategy="least_loaded")
+
+    async with replicas[0].connect():
+        assert router.choose() is replicas[1]
+        assert await _read_dept_name(router) == "replica2"
+
+
+async def test_unhealthy_fallback(engines, tmp_path: Path):
+    primary, replicas = engines
+    broken = create_db_engine(f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'x.db'}")
+    router = ReplicaRouter(primary, [broken])
+
+    # 副本连接失败时当前请求改用主库重试，不会报错
+    assert await _read_dept_name(router) == "primary"
+
+    # 副本被标记为不可用后直接路由到主库
+    assert router.healthy_replicas() == []
+    assert router.choose() is primary
+    assert await _read_dept_name(router) == "primary"
+    await broken.dispose()
+
+
+async def test_primary_failure_not_retried(tmp_path: Path):
+    broken = create_db_engine(f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'x.db'}")
+    router = ReplicaRouter(broken, [])
+
+    with pytest.raises(OperationalError):
+        await _read_dept_name(router)
+    await broken.dispose()
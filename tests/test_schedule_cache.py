@@ -0,0 +1,112 @@
+from types import SimpleNamespace
+
+from httpx import AsyncClient
+from redis.asyncio import Redis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import config
+from app.models.course import CourseType
+from app.models.user import User
+from app.repositories.course import CourseRepository
+from app.services.schedule_cache import (
+    StaleSchedules,
+    cache_schedule,
+    collect_stale_schedules,
+    get_cached_schedule,
+    invalidate_schedules,
+    mark_schedules_stale,
+)
+
+TERM = "2031-2032-1"
+
+
+async def test_invalidate_by_dependency():
+    redis_client = Redis(
+        host=config.redis_host, port=config.redis_port, decode_responses=True
+    )
+    try:
+        await _check_invalidation(redis_client)
+    finally:
+        await redis_client.aclose()
+
+
+async def _check_invalidation(redis_client: Redis):
+    first = SimpleNamespace(id=900001, major_no="MA900", session=25)
+    second = SimpleNamespace(id=900002, major_no="MA900", session=25)
+    course_a = SimpleNamespace(id=900101, course_name="a")
+    course_b = SimpleNamespace(id=900102, course_name="b")
+
+    payload = await cache_schedule(redis_client, first, TERM, [course_a, course_b], 60)  # type: ignore
+    assert (
+        payload == '[{"id":900101,"course_name":"a"},{"id":900102,"course_name":"b"}]'
+    )
+    await cache_schedule(redis_client, second, TERM, [course_b], 60)  # type: ignore
+    assert await get_cached_schedule(redis_client, first.id, TERM) == payload
+
+    # 只失效包含该课程的课程表
+    assert (
+        await invalidate_schedules(redis_client, StaleSchedules(courses={900101})) == 1
+    )
+    assert await get_cached_schedule(redis_client, first.id, TERM) is None
+    assert await get_cached_schedule(redis_client, second.id, TERM)
+
+    # 专业年级
+    stale = StaleSchedules(cohorts={("MA900", 25)})
+    assert await invalidate_schedules(redis_client, stale) == 1
+    assert await get_cached_schedule(redis_client, second.id, TERM) is None
+
+    # 学生
+    await cache_schedule(redis_client, first, TERM, [course_a], 60)  # type: ignore
+    stale = StaleSchedules(students={first.id})
+    assert await invalidate_schedules(redis_client, stale) == 1
+    assert await get_cached_schedule(redis_client, first.id, TERM) is None
+
+
+async def test_collect_after_commit(database: AsyncSession):
+    with collect_stale_schedules() as stale:
+        await database.execute(select(1))
+        mark_schedules_stale(database, students=[1])
+        await database.rollback()
+        assert not stale
+
+        await database.execute(select(1))
+        mark_schedules_stale(database, students=[1], cohorts=[("MA001", 25)])
+        await database.commit()
+        assert stale.students == {1}
+        assert stale.cohorts == {("MA001", 25)}
+
+
+async def test_schedule_cache_hit(
+    student_client: AsyncClient,
+    course_repo: CourseRepository,
+    test_student: User,
+    test_teacher: User,
+):
+    await course_repo.session.refresh(test_student)
+    await course_repo.create_course(
+        course_name="test_cached_course",
+        teacher=test_teacher.id,
+        major_no=test_student.major_no,
+        session=test_student.session,
+        course_type=CourseType.CORE,
+        credit=1.0,
+        course_date={
+            "term": TERM,
+            "start_week": 1,
+            "end_week": 16,
+            "is_double_week": False,
+            "week_day": 5,
+            "section": [3],
+        },
+        status=4,
+    )
+
+    miss = await student_client.post("/api/student/schedule", params={"term": TERM})
+    assert miss.status_code == 200
+    hit = await student_client.post("/api/student/schedule", params={"term": TERM})
+    assert hit.status_code == 200
+    assert hit.content == miss.content
+    assert [course["course_name"] for course in hit.json()] == ["test_cached_course"]
+    # 命中缓存时只剩鉴权查询
+    assert int(hit.headers["X-DB-Queries"]) < int(miss.headers["X-DB-Queries"])
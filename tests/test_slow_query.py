@@ -0,0 +1,82 @@
+import json
+import logging
+from pathlib import Path
+
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.logger import slow_query_logger
+from app.core.slow_query import REDACTED, SlowQueryLog
+from app.core.sql import Base, create_db_engine
+from app.models.user import UserRole
+from app.repositories.user import UserRepository
+from app.services.auth_service import get_password_hash
+
+
+class _RecordHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records: list[dict] = []
+
+    def emit(self, record: logging.LogRecord):
+        self.records.append(json.loads(record.getMessage()))
+
+
+@pytest_asyncio.fixture
+async def slow_log(tmp_path: Path):
+    engine = create_db_engine(f"sqlite+aiosqlite:///{tmp_path / 'slow.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    handler = _RecordHandler()
+    slow_query_logger.addHandler(handler)
+    try:
+        yield SlowQueryLog(engine, threshold_ms=0), handler.records
+    finally:
+        slow_query_logger.removeHandler(handler)
+        await engine.dispose()
+
+
+async def test_slow_query_log(slow_log):
+    log, records = slow_log
+    password = get_password_hash("123456")
+
+    async with AsyncSession(log.engine, expire_on_commit=False) as session:
+        repo = UserRepository(session)
+        user = await repo.create_user(
+            name="slow", password=password, role=UserRole.admin, session=0
+        )
+        assert user
+        await log.drain()
+        records.clear()
+        assert await repo.get_by_name(user.username)
+    await log.drain()
+
+    (record,) = records
+    assert record["caller"] == "app.repositories.user.UserRepository.get_by_name"
+    assert record["parameters"] == [user.username]
+    assert record["plan"] and "detail" in record["plan"][0]
+
+    # 同一语句在间隔内不重复获取执行计划，敏感参数被隐藏
+    async with AsyncSession(log.engine) as session:
+        repo = UserRepository(session)
+        same_user = await repo.get_by_name(user.username)
+        assert same_user
+        new_password = get_password_hash("654321")
+        await repo.change_password(same_user, new_password)
+    await log.drain()
+
+    select_record, update_record = records[1:]
+    assert "plan" not in select_record
+    assert REDACTED in update_record["parameters"]
+    assert new_password not in json.dumps(update_record)
+
+
+async def test_below_threshold(slow_log):
+    log, records = slow_log
+    log.threshold_ms = 60_000
+
+    async with AsyncSession(log.engine) as session:
+        assert await UserRepository(session).get_by_name("nobody") is None
+    await log.drain()
+    assert records == []
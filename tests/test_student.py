@@ -1,11 +1,16 @@
+import pytest
+from fastapi import HTTPException
 from httpx import AsyncClient
+from query_budget import query_budget
+from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy.orm.attributes import set_committed_value
 
-from app.models.course import CourseType
-from app.models.user import User
+from app.models.course import Course, CourseType
+from app.models.user import User, UserRole
 from app.repositories.course import CourseRepository
-from app.repositories.selection import Selection
+from app.repositories.selection import Selection, SelectionRepository
 from app.repositories.user import UserRepository
 
 TEST_USERS: list[str] = []
@@ -146,11 +151,14 @@ async def test_elective_course(
     assert any(course["course_name"] == "test_elective_course" for course in schedule)
 
     # 取消选修课
-    response = await student_client.post(
-        "/api/student/deselect",
-        params={"course_no": elective_courses[0]["course_no"]},
-    )
+    # 鉴权 1 条 + 查课程/选课 3 条 + 预加载 2 条 + 更新 2 条 + 课程表 2 条 + 刷新 1 条
+    with query_budget(11, max_repeats=1):
+        response = await student_client.post(
+            "/api/student/deselect",
+            params={"course_no": elective_courses[0]["course_no"]},
+        )
     assert response.status_code == 200
+    assert response.headers["X-DB-Queries"] == "11"
 
     # 验证课程已取消选中
     selection_result = await course_repo.session.execute(
@@ -174,3 +182,96 @@ async def test_elective_course(
 
     result = any(course["course_name"] == "test_elective_course" for course in schedule)
     assert not result
+
+
+async def test_concurrent_seat_updates(
+    course_repo: CourseRepository,
+    user_repo: UserRepository,
+    test_teacher: User,
+    database: AsyncSession,
+    monkeypatch,
+):
+    (course_no,) = await course_repo.create_courses(
+        teacher=test_teacher.id,
+        courses=[
+            {
+                "course_name": "名额并发测试课程",
+                "major_no": "MA001",
+                "session": 25,
+                "course_type": CourseType.ELECTIVE,
+                "credit": 1.0,
+                "max_students": 2,
+                "course_date": {
+                    "term": "2024-2025-1",
+                    "start_week": 1,
+                    "end_week": 16,
+                    "is_double_week": False,
+                    "week_day": 7,
+                    "section": [1, 2],
+                },
+                "status": 4,
+            }
+        ],
+    )
+    student = await user_repo.create_user(
+        name="test_seat_race",
+        password="",
+        role=UserRole.student,
+        session=89,
+        dept_no="DP001",
+        major_no="MA001",
+        class_number=1,
+    )
+    assert student
+    student_id = student.id
+    selection_repo = SelectionRepository(database)
+    course = (
+        await database.execute(select(Course).where(Course.course_no == course_no))
+    ).scalar_one()
+
+    # 其他请求在名额检查之后选满了课程：占用名额的条件更新不匹配任何行
+    await database.execute(
+        update(Course)
+        .where(Course.id == course.id)
+        .values(current_students=2)
+        .execution_options(synchronize_session=False)
+    )
+    assert course.current_students == 0
+    with pytest.raises(HTTPException) as exc_info:
+        await selection_repo.create_selection(student_id, course_no)
+    assert exc_info.value.status_code == 400
+    assert "is full" in exc_info.value.detail
+    await database.rollback()
+
+    selection = await selection_repo.create_selection(student_id, course_no)
+    selection_id = selection.id
+    await database.refresh(course)
+    assert course.current_students == 1
+
+    # 重复退课：第二个请求读到的仍是选中状态，只有一个请求释放名额
+    await selection_repo.update_selection_status(selection_id, False)
+    set_committed_value(selection, "status", True)
+    with pytest.raises(HTTPException) as exc_info:
+        await selection_repo.update_selection_status(selection_id, False)
+    assert exc_info.value.status_code == 400
+    await database.rollback()
+    await database.refresh(course)
+    assert course.current_students == 0
+
+    # 退选后再选恢复原记录
+    selection = await selection_repo.create_selection(student_id, course_no)
+    assert selection.id == selection_id and selection.status is True
+
+    # 并发的重复选课：检查时还没有选课记录，插入时由唯一索引拒绝并回滚占用的名额
+    async def not_selected_yet(student_id: int, course_id: int):
+        return None
+
+    monkeypatch.setattr(
+        selection_repo, "get_selection_by_student_and_course", not_selected_yet
+    )
+    with pytest.raises(HTTPException) as exc_info:
+        await selection_repo.create_selection(student_id, course_no)
+    assert exc_info.value.status_code == 400
+    assert "already" in exc_info.value.detail
+    await database.refresh(course)
+    assert course.current_students == 1
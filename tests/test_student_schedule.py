@@ -0,0 +1,149 @@
+from pathlib import Path
+
+import pytest_asyncio
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import config
+from app.core.sql import Base, create_db_engine
+from app.models.course import CourseType
+from app.models.student_schedule import StudentSchedule
+from app.models.user import UserRole
+from app.repositories.course import CourseRepository
+from app.repositories.department import DepartmentRepository
+from app.repositories.major import MajorRepository
+from app.repositories.selection import SelectionRepository
+from app.repositories.student_schedule import StudentScheduleRepository
+from app.repositories.user import UserRepository
+
+TERM = "2025-2026-1"
+COURSE_DATE = {
+    "term": TERM,
+    "start_week": 1,
+    "end_week": 16,
+    "is_double_week": False,
+    "week_day": 1,
+    "section": [1, 2],
+}
+
+
+@pytest_asyncio.fixture
+async def session(tmp_path: Path, monkeypatch):
+    # 独立的数据库，不读写与共享测试数据库同名的缓存
+    monkeypatch.setattr(config, "cache_enabled", False)
+    engine = create_db_engine(f"sqlite+aiosqlite:///{tmp_path / 'schedule.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        await DepartmentRepository(session).create_department("计算机学院")
+        await MajorRepository(session).create_major("计算机科学与技术", "DP001")
+        await MajorRepository(session).create_major("软件工程", "DP001")
+        yield session
+    await engine.dispose()
+
+
+async def _rows(session: AsyncSession) -> set[tuple]:
+    result = await session.execute(
+        select(
+            StudentSchedule.student_id, StudentSchedule.course_id, StudentSchedule.term
+        )
+    )
+    return {tuple(row) for row in result.all()}
+
+
+async def test_incremental_maintenance(session: AsyncSession):
+    user_repo = UserRepository(session)
+    course_repo = CourseRepository(session)
+    teacher = await user_repo.create_user(
+        name="teacher", password="", role=UserRole.teacher, session=24
+    )
+    assert teacher
+
+    async def create(name, course_type, major_no="MA001"):
+        return await course_repo.create_course(
+            course_name=name,
+            teacher=teacher.id,
+            major_no=major_no,
+            session=25,
+            course_type=course_type,
+            credit=2,
+            course_date=COURSE_DATE,  # type: ignore
+        )
+
+    core = await create("高等数学", CourseType.CORE)
+    other_core = await create("软件工程导论", CourseType.CORE, "MA002")
+    elective = await create("电影鉴赏", CourseType.ELECTIVE)
+    await course_repo.set_courses_status(
+        [core.course_no, other_core.course_no, elective.course_no], 4
+    )
+
+    # 新建的学生立即获得本专业年级的必修课
+    student = await user_repo.create_user(
+        name="student",
+        password="",
+        role=UserRole.student,
+        session=25,
+        dept_no="DP001",
+        major_no="MA001",
+    )
+    assert student
+    assert await _rows(session) == {(student.id, core.id, TERM)}
+
+    # 选课 / 退课
+    selection_repo = SelectionRepository(session)
+    selection = await selection_repo.create_selection(student.id, elective.course_no)
+    assert (student.id, elective.id, TERM) in await _rows(session)
+    await selection_repo.update_selection_status(selection.id, False)
+    assert await _rows(session) == {(student.id, core.id, TERM)}
+
+    # 课程隐藏或改学期
+    await course_repo.set_course_status(core.course_no, 0)
+    assert await _rows(session) == set()
+    await course_repo.set_course_status(core.course_no, 4)
+    await course_repo.edit_course(
+        core.course_no, course_date={**COURSE_DATE, "term": "2025-2026-2"}  # type: ignore
+    )
+    assert await _rows(session) == {(student.id, core.id, "2025-2026-2")}
+
+    # 转专业
+    await user_repo.edit_info(student, major_no="MA002")
+    assert await _rows(session) == {(student.id, other_core.id, TERM)}
+
+    schedule = await user_repo.get_schedule(student, TERM)
+    assert [course.id for course in schedule] == [other_core.id]
+
+    # 删除专业后其必修课不再属于任何学生
+    assert await MajorRepository(session).delete_major("MA002")
+    assert await _rows(session) == set()
+
+
+async def test_rebuild_term(session: AsyncSession):
+    user_repo = UserRepository(session)
+    student = await user_repo.create_user(
+        name="rebuild",
+        password="",
+        role=UserRole.student,
+        session=25,
+        dept_no="DP001",
+        major_no="MA001",
+    )
+    assert student
+    course = await CourseRepository(session).create_course(
+        course_name="线性代数",
+        teacher=student.id,
+        major_no="MA001",
+        session=25,
+        course_type=CourseType.CORE,
+        credit=2,
+        course_date=COURSE_DATE,  # type: ignore
+        status=4,
+    )
+    expected = await _rows(session)
+    assert expected == {(student.id, course.id, TERM)}
+
+    repo = StudentScheduleRepository(session)
+    await session.execute(delete(StudentSchedule))
+    assert await repo.rebuild_term(TERM) == 1
+    await session.commit()
+    assert await _rows(session) == expected
@@ -32,6 +32,41 @@ async def test_add_course(teacher_client: AsyncClient):
     test_course = response.json()["course_no"]
 
 
+async def test_batch_add_course(
+    teacher_client: AsyncClient, course_repo: CourseRepository
+):
+    course_date = {
+        "term": "2024-2025-2",
+        "start_week": 1,
+        "end_week": 16,
+        "is_double_week": False,
+        "week_day": 3,
+        "section": [1, 2],
+    }
+    response = await teacher_client.post(
+        "/api/course/batch_add",
+        json=[
+            {
+                "course_name": f"批量课程{i}",
+                "session": 24,
+                "major_no": "MA001",
+                "course_type": 1,
+                "course_date": course_date,
+                "credit": 2.0,
+                "is_public": True,
+            }
+            for i in range(3)
+        ],
+    )
+    assert response.status_code == 200
+    course_nos = response.json()["course_nos"]
+    assert len(course_nos) == len(set(course_nos)) == 3
+    for i, course_no in enumerate(course_nos):
+        course = await course_repo.get_by_course_no(course_no)
+        assert course is not None
+        assert course.course_name == f"批量课程{i}"
+
+
 async def test_info(teacher_client: AsyncClient):
     response = await teacher_client.post(
         "/api/course/info", params={"course_no": test_course}
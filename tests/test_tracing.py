@@ -0,0 +1,76 @@
+from typing import Optional
+
+from httpx import AsyncClient
+from opentelemetry.sdk.trace import ReadableSpan
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+
+from app.core.config import config
+from app.core.tracing import tracer_provider
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+# 追踪默认关闭，tests/conftest.py 在导入应用之前开启
+assert config.tracing_enabled
+exporter = InMemorySpanExporter()
+assert tracer_provider is not None
+tracer_provider.add_span_processor(SimpleSpanProcessor(exporter))
+
+
+def parent_id(span: ReadableSpan) -> Optional[int]:
+    return span.parent.span_id if span.parent is not None else None
+
+
+async def test_tracing(admin_client: AsyncClient, reference_data):
+    exporter.clear()
+    response = await admin_client.post(
+        "/api/admin/department/info",
+        params={"dept_no": "DP001"},
+        headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"},
+    )
+    assert response.status_code == 200
+
+    spans = exporter.get_finished_spans()
+    assert spans
+    assert all(format(span.context.trace_id, "032x") == TRACE_ID for span in spans)
+    by_name = {span.name: span for span in spans}
+
+    # 请求 span 沿用上游的追踪上下文
+    server = by_name["POST /api/admin/department/info"]
+    assert format(parent_id(server), "016x") == PARENT_ID
+    attributes = server.attributes or {}
+    assert attributes["http.response.status_code"] == 200
+    assert attributes["request.id"] == response.headers["X-Request-ID"]
+
+    # 鉴权依赖 -> 仓库方法 -> SQL 语句
+    role_check = by_name["check_and_get_current_role(admin)"]
+    auth = by_name["get_current_user"]
+    user_lookup = by_name["UserRepository.get_by_name"]
+    assert parent_id(role_check) == server.context.span_id
+    assert parent_id(auth) == role_check.context.span_id
+    assert parent_id(by_name["jwt.decode"]) == auth.context.span_id
+    assert parent_id(user_lookup) == auth.context.span_id
+    assert any(
+        (span.attributes or {}).get("db.system") == "sqlite"
+        and parent_id(span) == user_lookup.context.span_id
+        for span in spans
+    )
+    assert any(
+        (span.attributes or {}).get("db.system") == "redis"
+        and parent_id(span) == auth.context.span_id
+        for span in spans
+    )
+    assert "DepartmentRepository.get_by_dept_no" in by_name
+
+    # 上游未采样时不记录
+    exporter.clear()
+    response = await admin_client.post(
+        "/api/admin/department/info",
+        params={"dept_no": "DP001"},
+        headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-00"},
+    )
+    assert response.status_code == 200
+    assert not exporter.get_finished_spans()